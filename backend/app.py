@@ -1,15 +1,28 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 import uvicorn
+import asyncio
+import logging
 import os
 import re
-from typing import Optional
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional, Tuple
 from context_manager import context_manager, ConversationContext
+from database import EnergyDatabase
+from utils.address_client import address_client
+from utils.routing import RoutingCache
+from utils.intent_classifier import routing_classifier, mentions_address
+from utils.metrics import METRICS_CONTENT_TYPE, register_cache, render_metrics, timed_node
+from utils.sse import SSE_HEADERS, sse_event, chunk_text
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 try:
-    from langchain_aws import ChatBedrock
     from langchain_core.messages import HumanMessage, SystemMessage
+    from utils.llm_clients import HAIKU, get_chat_model, warm_up
     BEDROCK_AVAILABLE = True
 except ImportError:
     BEDROCK_AVAILABLE = False
@@ -21,22 +34,49 @@ class ChatRequest(BaseModel):
     has_file: Optional[bool] = False
     file_name: Optional[str] = None
 
-app = FastAPI()
+db = EnergyDatabase()
 
-# Initialize Bedrock if available
-llm = None
-if BEDROCK_AVAILABLE and os.getenv('AWS_BEARER_TOKEN_BEDROCK'):
-    try:
-        llm = ChatBedrock(
-            model_id="anthropic.claude-3-haiku-20240307-v1:0",
-            region_name="ap-southeast-2",
-        )
-        print("Bedrock initialized successfully")
-    except Exception as e:
-        print(f"Bedrock initialization failed: {e}")
-        llm = None
-else:
-    print("Using fallback mode (no Bedrock)")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    background = [
+        asyncio.create_task(context_manager.run_sweeper()),
+        asyncio.create_task(context_manager.run_flusher())
+    ]
+    if llm_enabled and LLM_WARM_UP:
+        background.append(asyncio.create_task(asyncio.to_thread(warm_up, [LLM_MODEL])))
+    await address_client.start()
+    yield
+    for task in background:
+        task.cancel()
+    await address_client.close()
+    context_manager.close()
+    db.close()
+
+app = FastAPI(lifespan=lifespan)
+
+# Bedrock clients are created on first use (or by the startup warm-up), not at import
+llm_enabled = BEDROCK_AVAILABLE and bool(os.getenv('AWS_BEARER_TOKEN_BEDROCK') or os.getenv('BEDROCK_ENDPOINT_URL'))
+logger.info("Bedrock enabled" if llm_enabled else "Using fallback mode (no Bedrock)")
+LLM_MODEL = (HAIKU, "ap-southeast-2", "invoke") if BEDROCK_AVAILABLE else None
+LLM_WARM_UP = os.getenv('LLM_WARM_UP', 'true').lower() == 'true'
+
+def chat_model():
+    return get_chat_model(*LLM_MODEL)
+
+# Bound in-flight model calls so one worker can't flood Bedrock, and give up on
+# slow completions so the keyword fallback can answer instead
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '8'))
+LLM_TIMEOUT_SECONDS = float(os.getenv('LLM_TIMEOUT_SECONDS', '20'))
+llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+# Supervisor decisions for repeated intents, so they skip the model round-trip
+routing_cache = RoutingCache()
+register_cache("routing", routing_cache)
+
+async def invoke_llm(messages: list):
+    """Call the model without blocking the event loop, capped and time-limited"""
+    async with llm_semaphore:
+        return await asyncio.wait_for(chat_model().ainvoke(messages), timeout=LLM_TIMEOUT_SECONDS)
 
 app.add_middleware(
     CORSMiddleware,
@@ -48,7 +88,22 @@ app.add_middleware(
 
 @app.get("/health")
 async def health():
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "routing_cache": routing_cache.stats(),
+        "customer_cache": db.customer_cache.stats(),
+        "address_client": address_client.stats(),
+        "sessions": context_manager.stats()
+    }
+
+@app.get("/metrics")
+async def metrics():
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+ROUTING_REASONS = {
+    "CURRENT_CUSTOMER": "Billing/account query",
+    "NEW_CUSTOMER": "New customer inquiry"
+}
 
 def extract_info_from_query(query: str, context: ConversationContext):
     """Extract customer number and address from query and update context"""
@@ -58,10 +113,11 @@ def extract_info_from_query(query: str, context: ConversationContext):
         context.update_customer_number(customer_match.group())
     
     # Extract address
-    if any(word in query.lower() for word in ['street', 'st', 'road', 'rd', 'avenue', 'ave']) and not context.address:
+    if mentions_address(query) and not context.address:
         context.update_address(query)
 
-def supervisor_agent(query: str, context: ConversationContext) -> dict:
+@timed_node("supervisor")
+async def supervisor_agent(query: str, context: ConversationContext) -> dict:
     """Routes query to appropriate agent with context awareness"""
     # Extract info from current query
     extract_info_from_query(query, context)
@@ -70,7 +126,20 @@ def supervisor_agent(query: str, context: ConversationContext) -> dict:
     if context.current_agent and context.customer_number:
         return {"agent": context.current_agent, "reasoning": "Continuing with established context"}
     
-    if llm:
+    # Confident keyword match routes without a model call
+    intent = routing_classifier.classify(query)
+    if intent.intent in ROUTING_REASONS and intent.confident():
+        return {"agent": intent.intent, "reasoning": ROUTING_REASONS[intent.intent]}
+    
+    routing_flags = {
+        "customer_number_known": bool(context.customer_number),
+        "address_known": bool(context.address)
+    }
+    cached_routing = routing_cache.lookup(query, **routing_flags)
+    if cached_routing:
+        return cached_routing
+    
+    if llm_enabled:
         try:
             context_info = f"Customer number: {context.customer_number or 'None'}, Address: {context.address or 'None'}"
             system_prompt = f"""You are a Supervisor Agent for an energy retailer. 
@@ -86,104 +155,190 @@ def supervisor_agent(query: str, context: ConversationContext) -> dict:
                 SystemMessage(content=system_prompt),
                 HumanMessage(content=query)
             ]
-            response = llm.invoke(messages)
+            response = await invoke_llm(messages)
             agent_type = response.content.strip()
             
-            if "CURRENT_CUSTOMER" in agent_type:
-                return {"agent": "CURRENT_CUSTOMER", "reasoning": "Billing/account query"}
-            else:
-                return {"agent": "NEW_CUSTOMER", "reasoning": "New customer inquiry"}
-        except:
-            pass
+            agent = "CURRENT_CUSTOMER" if "CURRENT_CUSTOMER" in agent_type else "NEW_CUSTOMER"
+            routing = {"agent": agent, "reasoning": ROUTING_REASONS[agent]}
+            routing_cache.store(query, routing, **routing_flags)
+            return routing
+        except asyncio.TimeoutError:
+            logger.warning(f"LLM call timed out after {LLM_TIMEOUT_SECONDS}s, using fallback")
+        except Exception as e:
+            logger.warning(f"LLM call failed, using fallback: {e}")
     
     # Fallback routing with context awareness
-    if context.customer_number or any(word in query.lower() for word in ['bill', 'account', 'payment', 'usage']):
-        return {"agent": "CURRENT_CUSTOMER", "reasoning": "Billing/account query"}
-    return {"agent": "NEW_CUSTOMER", "reasoning": "New customer inquiry"}
+    if context.customer_number or routing_classifier.matches(query, "CURRENT_CUSTOMER"):
+        return {"agent": "CURRENT_CUSTOMER", "reasoning": ROUTING_REASONS["CURRENT_CUSTOMER"]}
+    return {"agent": "NEW_CUSTOMER", "reasoning": ROUTING_REASONS["NEW_CUSTOMER"]}
 
-def current_customer_agent(query: str, context: ConversationContext) -> str:
-    """Handles current customer queries with shared context"""
+async def complete(messages: Optional[list], fallback: str) -> str:
+    """Full model reply, or the fallback text when the model is unavailable or slow"""
+    if llm_enabled and messages:
+        try:
+            response = await invoke_llm(messages)
+            return response.content
+        except asyncio.TimeoutError:
+            logger.warning(f"LLM call timed out after {LLM_TIMEOUT_SECONDS}s, using fallback")
+        except Exception as e:
+            logger.warning(f"LLM call failed, using fallback: {e}")
+    return fallback
+
+class StreamTruncated(Exception):
+    """The model stream failed after part of the reply had been sent"""
+
+async def read_stream(messages: list, chunks: asyncio.Queue):
+    """Drain the model stream into chunks, ending with None or the error that stopped it.
+
+    The semaphore is held only while the model is producing, not while a slow
+    client reads the reply.
+    """
+    failure = None
+    try:
+        async with llm_semaphore:
+            stream = chat_model().astream(messages)
+            try:
+                iterator = stream.__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(iterator.__anext__(), timeout=LLM_TIMEOUT_SECONDS)
+                    except StopAsyncIteration:
+                        break
+                    text = chunk_text(chunk.content)
+                    if text:
+                        chunks.put_nowait(text)
+            finally:
+                await stream.aclose()
+    except asyncio.TimeoutError as e:
+        failure = e
+        logger.warning(f"LLM stream stalled for {LLM_TIMEOUT_SECONDS}s")
+    except Exception as e:
+        failure = e
+        logger.warning(f"LLM stream failed: {e}")
+    finally:
+        chunks.put_nowait(failure)
+
+async def stream_completion(messages: Optional[list], fallback: str) -> AsyncIterator[str]:
+    """Model reply as it is generated; falls back if nothing arrives in time.
+
+    Raises StreamTruncated when the model fails after some of the reply was yielded.
+    """
+    if llm_enabled and messages:
+        chunks: asyncio.Queue = asyncio.Queue()
+        reader = asyncio.create_task(read_stream(messages, chunks))
+        streamed = False
+        try:
+            while isinstance(item := await chunks.get(), str):
+                streamed = True
+                yield item
+        finally:
+            # The client went away before the reply finished
+            reader.cancel()
+        if streamed and item is not None:
+            reason = f"stalled for {LLM_TIMEOUT_SECONDS}s" if isinstance(item, asyncio.TimeoutError) else str(item)
+            raise StreamTruncated(f"Reply cut off: model stream {reason}") from item
+        if streamed:
+            return
+    yield fallback
+
+async def current_customer_prompt(query: str, context: ConversationContext) -> Tuple[Optional[list], str]:
+    """Model messages and fallback reply for a current customer"""
     if not context.customer_number:
-        return "I can help with your energy account. Please provide your customer number so I can access your account information."
+        return None, "I can help with your energy account. Please provide your customer number so I can access your account information."
     
-    # Mock customer data lookup
+    # Look the customer up once per session, falling back to mock data without a database
     if not context.customer_data:
-        mock_data = {
-            "name": "Customer",
-            "current_bill": 450.50,
-            "usage_kwh": 850,
-            "account_status": "active"
-        }
-        context.update_customer_data(mock_data)
+        customer_data = await db.aget_customer_by_number(context.customer_number)
+        if not customer_data:
+            customer_data = {
+                "name": "Customer",
+                "current_bill": 450.50,
+                "usage_kwh": 850,
+                "account_status": "active"
+            }
+        context.update_customer_data(customer_data)
     
-    if llm:
-        try:
-            system_prompt = f"""You are a Current Customer Agent for an energy retailer.
+    system_prompt = f"""You are a Current Customer Agent for an energy retailer.
             Customer #{context.customer_number}: {context.customer_data}
             
             Help with billing, account questions, and usage inquiries using the customer data."""
-            
-            messages = [
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=query)
-            ]
-            response = llm.invoke(messages)
-            return response.content
-        except:
-            pass
     
-    return f"Hi! I can see your account #{context.customer_number}. Your current bill is ${context.customer_data['current_bill']}. How can I help you today?"
+    messages = [
+        SystemMessage(content=system_prompt),
+        HumanMessage(content=query)
+    ] if llm_enabled else None
+    return messages, f"Hi! I can see your account #{context.customer_number}. Your current bill is ${context.customer_data['current_bill']}. How can I help you today?"
 
-def new_customer_agent(query: str, context: ConversationContext) -> str:
-    """Handles new customer queries with shared context"""
-    if llm:
-        try:
-            address_info = f"Address: {context.address}" if context.address else "No address provided yet"
-            system_prompt = f"""You are a New Customer Agent for an energy retailer.
+async def new_customer_prompt(query: str, context: ConversationContext) -> Tuple[Optional[list], str]:
+    """Model messages and fallback reply for a new customer"""
+    messages = None
+    coverage = await address_client.check_address(context.address) if context.address else None
+    if llm_enabled:
+        address_info = f"Address: {context.address}. {coverage['message']}" if coverage else "No address provided yet"
+        system_prompt = f"""You are a New Customer Agent for an energy retailer.
             Context: {address_info}
             
             Help customers switch providers or set up new connections.
             If no address, ask for it to check service availability."""
-            
-            messages = [
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=query)
-            ]
-            response = llm.invoke(messages)
-            return response.content
-        except:
-            pass
+        
+        messages = [
+            SystemMessage(content=system_prompt),
+            HumanMessage(content=query)
+        ]
+    
+    if coverage and coverage['available']:
+        return messages, f"Hi! {coverage['message']}, so I can help you with energy services at {context.address}. What would you like to know about switching or setting up a new connection?"
+    if coverage:
+        return messages, f"{coverage['message']} What else can I help you with?"
+    return messages, "I can help you switch energy providers or set up a new connection. Could you provide your address so I can check service availability?"
+
+@timed_node("current_customer")
+async def current_customer_agent(query: str, context: ConversationContext) -> str:
+    """Handles current customer queries with shared context"""
+    return await complete(*await current_customer_prompt(query, context))
+
+@timed_node("new_customer")
+async def new_customer_agent(query: str, context: ConversationContext) -> str:
+    """Handles new customer queries with shared context"""
+    return await complete(*await new_customer_prompt(query, context))
+
+def resolve_session(session_id: Optional[str]) -> Tuple[str, ConversationContext]:
+    """Get or create session context"""
+    if not session_id:
+        session_id = context_manager.create_session()
     
-    if context.address:
-        return f"Hi! I can help you with energy services at {context.address}. What would you like to know about switching or setting up a new connection?"
-    return "I can help you switch energy providers or set up a new connection. Could you provide your address so I can check service availability?"
+    context = context_manager.get_context(session_id)
+    if not context:
+        session_id = context_manager.create_session()
+        context = context_manager.get_context(session_id)
+    return session_id, context
+
+FALLBACK_RESPONSE = "Hello! I'm your Energy Assistant. How can I help you today?"
+
+def context_summary(context: ConversationContext) -> dict:
+    return {
+        "customer_number": context.customer_number,
+        "address": context.address,
+        "current_agent": context.current_agent
+    }
 
 @app.post("/chat")
 async def chat(request: ChatRequest):
     try:
-        # Get or create session context
-        if not request.session_id:
-            session_id = context_manager.create_session()
-        else:
-            session_id = request.session_id
-        
-        context = context_manager.get_context(session_id)
-        if not context:
-            session_id = context_manager.create_session()
-            context = context_manager.get_context(session_id)
+        session_id, context = resolve_session(request.session_id)
         
         # Add user message to context
         context.add_message('user', request.query)
         
         # Route through supervisor with context
-        routing = supervisor_agent(request.query, context)
+        routing = await supervisor_agent(request.query, context)
         context.set_current_agent(routing["agent"])
         
         # Process with appropriate agent
         if routing["agent"] == "CURRENT_CUSTOMER":
-            response = current_customer_agent(request.query, context)
+            response = await current_customer_agent(request.query, context)
         else:
-            response = new_customer_agent(request.query, context)
+            response = await new_customer_agent(request.query, context)
         
         # Add assistant response to context
         context.add_message('assistant', response, routing["agent"])
@@ -193,21 +348,79 @@ async def chat(request: ChatRequest):
             "agent_used": routing["agent"],
             "reasoning": routing["reasoning"],
             "session_id": session_id,
-            "context": {
-                "customer_number": context.customer_number,
-                "address": context.address,
-                "current_agent": context.current_agent
-            }
+            "context": context_summary(context)
         }
         
     except Exception as e:
-        print(f"Chat error: {e}")
+        logger.exception(f"Chat error: {e}")
         return {
-            "response": "Hello! I'm your Energy Assistant. How can I help you today?",
+            "response": FALLBACK_RESPONSE,
             "agent_used": "FALLBACK",
             "reasoning": "System fallback",
             "session_id": context_manager.create_session()
         }
 
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """Same as /chat, but streams routing metadata first and then the reply as it is generated"""
+    async def generate():
+        try:
+            session_id, context = resolve_session(request.session_id)
+            context.add_message('user', request.query)
+            routing = await supervisor_agent(request.query, context)
+            context.set_current_agent(routing["agent"])
+        except Exception as e:
+            logger.exception(f"Chat stream error: {e}")
+            session_id = context_manager.create_session()
+            yield sse_event({
+                "type": "routing",
+                "agent_used": "FALLBACK",
+                "reasoning": "System fallback",
+                "session_id": session_id
+            })
+            yield sse_event({"type": "error", "error": str(e)})
+            yield sse_event({"type": "token", "content": FALLBACK_RESPONSE})
+            yield sse_event({"type": "done", "response": FALLBACK_RESPONSE, "session_id": session_id})
+            yield "data: [DONE]\n\n"
+            return
+        
+        yield sse_event({
+            "type": "routing",
+            "agent_used": routing["agent"],
+            "reasoning": routing["reasoning"],
+            "session_id": session_id
+        })
+        parts = []
+        failed = False
+        try:
+            if routing["agent"] == "CURRENT_CUSTOMER":
+                messages, fallback = await current_customer_prompt(request.query, context)
+            else:
+                messages, fallback = await new_customer_prompt(request.query, context)
+            async for text in stream_completion(messages, fallback):
+                parts.append(text)
+                yield sse_event({"type": "token", "content": text})
+        except Exception as e:
+            failed = True
+            logger.exception(f"Chat stream error: {e}")
+            yield sse_event({"type": "error", "error": str(e), "truncated": bool(parts)})
+        
+        # The context only records the reply once it is complete; a cut-off reply is not a finished turn
+        response = "".join(parts)
+        if response and not failed:
+            context.add_message('assistant', response, routing["agent"])
+        yield sse_event({
+            "type": "done",
+            "response": response,
+            "truncated": failed and bool(parts),
+            "session_id": session_id,
+            "context": context_summary(context)
+        })
+        yield "data: [DONE]\n\n"
+    
+    return StreamingResponse(generate(), media_type="text/event-stream", headers=SSE_HEADERS)
+
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=2024)
+    # More than one worker needs a shared session store, e.g. SESSION_STORE=sqlite
+    workers = int(os.getenv('UVICORN_WORKERS', '1'))
+    uvicorn.run("app:app" if workers > 1 else app, host="0.0.0.0", port=2024, workers=workers)
@@ -0,0 +1,321 @@
+"""Offline stand-in for the Bedrock runtime API, for reproducible load tests.
+
+Serves Converse, ConverseStream, InvokeModel and InvokeModelWithResponseStream
+(Anthropic messages format) closely enough for boto3 and langchain-aws, with
+no network and no credentials. Replies are shaped by the prompt:
+
+  * route_to_* tools are answered with a tool call chosen by the graph's
+    intent classifier, as the energy supervisor expects
+  * "Respond with only: A or B" prompts get one of the listed labels
+  * prompts asking for a single JSON object get a canned bill analysis
+  * everything else gets filler text of --output-tokens words
+
+Time to first token is log-normal around --ttft-ms and each further token
+takes about --token-ms, streamed one event per token. Latencies are seeded
+from --seed and the request body, so the same run replays the same timings;
+faults follow their own seeded sequence, so retries can get through.
+--throttle-rate, --error-rate and --stream-error-rate inject ThrottlingException
+responses, 500s and mid-stream modelStreamErrorException events.
+
+Point the apps at it with BEDROCK_ENDPOINT_URL:
+
+    cd backend && python -m benchmarks.bedrock_standin --port 8900 --ttft-ms 400 --token-ms 20
+    cd backend && BEDROCK_ENDPOINT_URL=http://localhost:8900 python app.py
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import random
+import re
+import struct
+import uuid
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from utils.intent_classifier import graph_routing_classifier, routing_classifier
+
+EVENTSTREAM = "application/vnd.amazon.eventstream"
+FILLER = ("Thanks for getting in touch. Your most recent bill covers 91 days and comes to $325.09, "
+          "mostly from general usage at 28.6 cents per kWh plus a daily supply charge. Usage was "
+          "higher than the same quarter last year, which usually points to heating or cooling. "
+          "Moving to a time-of-use plan could save around $40 a quarter if you shift laundry and "
+          "dishwashing to off-peak hours. ").split()
+BILL_ANALYSIS = {
+    "retailer": "Origin Energy", "billing_period_start": "2024-04-01", "billing_period_end": "2024-07-02",
+    "usage_kwh": 2584, "tariffs": [{"name": "General usage", "rate": 0.2864, "unit": "kWh"}],
+    "supply_charge": 1.0516, "amount_due": 325.09, "due_date": "2024-07-23",
+    "summary": "This bill covers 93 days of electricity. You used 2584 kWh and owe $325.09 by 23 July.",
+}
+ONLY_RE = re.compile(r"Respond with only:\s*([A-Z_]+(?:\s*(?:,|or)\s*[A-Z_]+)+)")
+
+class Behaviour:
+    """Latency and failure model shared by every endpoint"""
+
+    def __init__(self, ttft_ms: float = 400, ttft_sigma: float = 0.35, token_ms: float = 20,
+                 output_tokens: int = 120, throttle_rate: float = 0.0, error_rate: float = 0.0,
+                 stream_error_rate: float = 0.0, seed: int = 0):
+        self.ttft_ms = ttft_ms
+        self.ttft_sigma = ttft_sigma
+        self.token_ms = token_ms
+        self.output_tokens = output_tokens
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.stream_error_rate = stream_error_rate
+        self.seed = seed
+        # Faults come from their own sequence so a retried request can succeed
+        self.faults = random.Random(seed)
+        self.counts = {"requests": 0, "streams": 0, "throttled": 0, "errors": 0, "stream_errors": 0,
+                       "tool_calls": 0}
+
+    def rng(self, body: bytes) -> random.Random:
+        return random.Random(hashlib.sha256(str(self.seed).encode() + body).digest())
+
+    def first_token_delay(self, rng: random.Random) -> float:
+        return self.ttft_ms * math.exp(rng.gauss(0, self.ttft_sigma)) / 1000 if self.ttft_ms > 0 else 0.0
+
+    def token_delays(self, rng: random.Random, n: int) -> List[float]:
+        return [self.token_ms * rng.uniform(0.5, 1.5) / 1000 for _ in range(n)]
+
+    def fault(self) -> Optional[JSONResponse]:
+        """An error response to send instead of a reply, or None"""
+        roll = self.faults.random()
+        if roll < self.throttle_rate:
+            self.counts["throttled"] += 1
+            return aws_error(429, "ThrottlingException", "Too many requests, please wait before trying again.")
+        if roll < self.throttle_rate + self.error_rate:
+            self.counts["errors"] += 1
+            return aws_error(500, "InternalServerException", "The stand-in failed this request on purpose.")
+        return None
+
+behaviour = Behaviour()
+app = FastAPI(title="Bedrock stand-in")
+
+def aws_error(status: int, code: str, message: str) -> JSONResponse:
+    return JSONResponse({"message": message}, status_code=status, headers={"x-amzn-ErrorType": code})
+
+def encode_event(headers: Dict[str, str], payload: bytes) -> bytes:
+    """One AWS event stream message: prelude, string headers, payload, CRC32s"""
+    encoded = b"".join(
+        bytes([len(name)]) + name.encode() + b"\x07" + struct.pack(">H", len(value.encode())) + value.encode()
+        for name, value in headers.items()
+    )
+    prelude = struct.pack(">II", 16 + len(encoded) + len(payload), len(encoded))
+    message = prelude + struct.pack(">I", zlib.crc32(prelude)) + encoded + payload
+    return message + struct.pack(">I", zlib.crc32(message))
+
+def event(event_type: str, body: Dict[str, Any]) -> bytes:
+    return encode_event({":event-type": event_type, ":content-type": "application/json", ":message-type": "event"},
+                        json.dumps(body).encode())
+
+def exception_event(exception_type: str, message: str) -> bytes:
+    return encode_event({":exception-type": exception_type, ":content-type": "application/json",
+                         ":message-type": "exception"}, json.dumps({"message": message}).encode())
+
+def count_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+def plan_reply(system: str, user: str, tools: List[str], max_tokens: Optional[int]) -> Tuple[str, str]:
+    """("tool", name) or ("text", reply) for a prompt"""
+    routes = [name for name in tools if name.startswith("route_to_")]
+    if routes:
+        intent = graph_routing_classifier.classify(user).intent
+        behaviour.counts["tool_calls"] += 1
+        return "tool", f"route_to_{intent}" if f"route_to_{intent}" in routes else routes[0]
+    only = ONLY_RE.search(system) or ONLY_RE.search(user)
+    if only:
+        labels = re.findall(r"[A-Z_]+", only.group(1))
+        intent = routing_classifier.classify(user).intent
+        return "text", intent if intent in labels else labels[-1]
+    if "single JSON object" in system or "single JSON object" in user:
+        return "text", json.dumps(BILL_ANALYSIS)
+    n = min(behaviour.output_tokens, max_tokens or behaviour.output_tokens)
+    return "text", " ".join(FILLER[i % len(FILLER)] for i in range(n))
+
+def reply_tokens(text: str) -> List[str]:
+    """Stream pieces: one word (with its trailing space) per token"""
+    return re.findall(r"\S+\s*", text) or [text]
+
+def texts(blocks: Any, key: str = "text") -> str:
+    if isinstance(blocks, str):
+        return blocks
+    return " ".join(b.get(key, "") for b in blocks or [] if isinstance(b, dict) and key in b)
+
+# Converse API
+
+def converse_prompt(body: Dict) -> Tuple[str, str, List[str], Optional[int]]:
+    user = next((m for m in reversed(body.get("messages", [])) if m.get("role") == "user"), {})
+    tools = [t["toolSpec"]["name"] for t in (body.get("toolConfig") or {}).get("tools", []) if "toolSpec" in t]
+    return (texts(body.get("system")), texts(user.get("content")), tools,
+            (body.get("inferenceConfig") or {}).get("maxTokens"))
+
+@app.post("/model/{model_id:path}/converse")
+async def converse(model_id: str, request: Request):
+    raw = await request.body()
+    rng = behaviour.rng(raw)
+    behaviour.counts["requests"] += 1
+    if error := behaviour.fault():
+        return error
+    system, user, tools, max_tokens = converse_prompt(json.loads(raw))
+    kind, reply = plan_reply(system, user, tools, max_tokens)
+    pieces = reply_tokens(reply) if kind == "text" else [reply]
+    delay = behaviour.first_token_delay(rng) + sum(behaviour.token_delays(rng, len(pieces) - 1))
+    await asyncio.sleep(delay)
+    if kind == "tool":
+        content, stop = [{"toolUse": {"toolUseId": f"tooluse_{uuid.uuid4().hex[:22]}", "name": reply, "input": {}}}], "tool_use"
+    else:
+        content, stop = [{"text": reply}], "end_turn"
+    usage = {"inputTokens": count_tokens(system + user), "outputTokens": len(pieces)}
+    usage["totalTokens"] = usage["inputTokens"] + usage["outputTokens"]
+    return {"output": {"message": {"role": "assistant", "content": content}}, "stopReason": stop,
+            "usage": usage, "metrics": {"latencyMs": int(delay * 1000)}}
+
+def converse_events(kind: str, reply: str, pieces: List[str], input_tokens: int) -> Iterator[Tuple[str, Dict]]:
+    yield "messageStart", {"role": "assistant"}
+    if kind == "tool":
+        tool_id = f"tooluse_{uuid.uuid4().hex[:22]}"
+        yield "contentBlockStart", {"contentBlockIndex": 0, "start": {"toolUse": {"toolUseId": tool_id, "name": reply}}}
+        yield "contentBlockDelta", {"contentBlockIndex": 0, "delta": {"toolUse": {"input": "{}"}}}
+    else:
+        for piece in pieces:
+            yield "contentBlockDelta", {"contentBlockIndex": 0, "delta": {"text": piece}}
+    yield "contentBlockStop", {"contentBlockIndex": 0}
+    yield "messageStop", {"stopReason": "tool_use" if kind == "tool" else "end_turn"}
+    yield "metadata", {"usage": {"inputTokens": input_tokens, "outputTokens": len(pieces),
+                                 "totalTokens": input_tokens + len(pieces)}, "metrics": {"latencyMs": 0}}
+
+@app.post("/model/{model_id:path}/converse-stream")
+async def converse_stream(model_id: str, request: Request):
+    raw = await request.body()
+    rng = behaviour.rng(raw)
+    behaviour.counts["requests"] += 1
+    behaviour.counts["streams"] += 1
+    if error := behaviour.fault():
+        return error
+    system, user, tools, max_tokens = converse_prompt(json.loads(raw))
+    kind, reply = plan_reply(system, user, tools, max_tokens)
+    pieces = reply_tokens(reply) if kind == "text" else [reply]
+    events = list(converse_events(kind, reply, pieces, count_tokens(system + user)))
+    messages = [(event(name, body), name == "contentBlockDelta") for name, body in events]
+    return StreamingResponse(paced(rng, messages), media_type=EVENTSTREAM)
+
+# InvokeModel API, Anthropic messages format
+
+def anthropic_prompt(body: Dict) -> Tuple[str, str, List[str], Optional[int]]:
+    user = next((m for m in reversed(body.get("messages", [])) if m.get("role") == "user"), {})
+    content = user.get("content")
+    user_text = content if isinstance(content, str) else " ".join(
+        b.get("text", "") for b in content or [] if isinstance(b, dict) and b.get("type") == "text"
+    )
+    return (texts(body.get("system")), user_text, [t.get("name", "") for t in body.get("tools", [])],
+            body.get("max_tokens"))
+
+def anthropic_content(kind: str, reply: str) -> Dict:
+    if kind == "tool":
+        return {"type": "tool_use", "id": f"toolu_{uuid.uuid4().hex[:24]}", "name": reply, "input": {}}
+    return {"type": "text", "text": reply}
+
+@app.post("/model/{model_id:path}/invoke")
+async def invoke_model(model_id: str, request: Request):
+    raw = await request.body()
+    rng = behaviour.rng(raw)
+    behaviour.counts["requests"] += 1
+    if error := behaviour.fault():
+        return error
+    system, user, tools, max_tokens = anthropic_prompt(json.loads(raw))
+    kind, reply = plan_reply(system, user, tools, max_tokens)
+    pieces = reply_tokens(reply) if kind == "text" else [reply]
+    await asyncio.sleep(behaviour.first_token_delay(rng) + sum(behaviour.token_delays(rng, len(pieces) - 1)))
+    input_tokens = count_tokens(system + user)
+    return JSONResponse({
+        "id": f"msg_{uuid.uuid4().hex[:24]}", "type": "message", "role": "assistant", "model": model_id,
+        "content": [anthropic_content(kind, reply)], "stop_reason": "tool_use" if kind == "tool" else "end_turn",
+        "stop_sequence": None, "usage": {"input_tokens": input_tokens, "output_tokens": len(pieces)}
+    }, headers={"x-amzn-bedrock-input-token-count": str(input_tokens),
+                "x-amzn-bedrock-output-token-count": str(len(pieces))})
+
+def anthropic_events(model_id: str, kind: str, reply: str, pieces: List[str], input_tokens: int) -> Iterator[Dict]:
+    yield {"type": "message_start", "message": {
+        "id": f"msg_{uuid.uuid4().hex[:24]}", "type": "message", "role": "assistant", "model": model_id,
+        "content": [], "stop_reason": None, "usage": {"input_tokens": input_tokens, "output_tokens": 1}}}
+    if kind == "tool":
+        yield {"type": "content_block_start", "index": 0, "content_block": {**anthropic_content(kind, reply)}}
+        yield {"type": "content_block_delta", "index": 0, "delta": {"type": "input_json_delta", "partial_json": "{}"}}
+    else:
+        yield {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}}
+        for piece in pieces:
+            yield {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": piece}}
+    yield {"type": "content_block_stop", "index": 0}
+    yield {"type": "message_delta", "delta": {"stop_reason": "tool_use" if kind == "tool" else "end_turn",
+                                              "stop_sequence": None}, "usage": {"output_tokens": len(pieces)}}
+    yield {"type": "message_stop", "amazon-bedrock-invocationMetrics": {
+        "inputTokenCount": input_tokens, "outputTokenCount": len(pieces)}}
+
+@app.post("/model/{model_id:path}/invoke-with-response-stream")
+async def invoke_model_stream(model_id: str, request: Request):
+    raw = await request.body()
+    rng = behaviour.rng(raw)
+    behaviour.counts["requests"] += 1
+    behaviour.counts["streams"] += 1
+    if error := behaviour.fault():
+        return error
+    system, user, tools, max_tokens = anthropic_prompt(json.loads(raw))
+    kind, reply = plan_reply(system, user, tools, max_tokens)
+    pieces = reply_tokens(reply) if kind == "text" else [reply]
+    chunks = [
+        (event("chunk", {"bytes": base64.b64encode(json.dumps(body).encode()).decode()}),
+         body["type"] == "content_block_delta")
+        for body in anthropic_events(model_id, kind, reply, pieces, count_tokens(system + user))
+    ]
+    return StreamingResponse(paced(rng, chunks), media_type=EVENTSTREAM)
+
+async def paced(rng: random.Random, messages: List[Tuple[bytes, bool]]):
+    """Send events at the modelled pace, failing part-way through if injected.
+
+    Framing events (start, stop, metadata) go straight out; the first token
+    waits the time-to-first-token delay and each later token a token delay.
+    """
+    faults = behaviour.faults
+    fail_at = faults.randrange(1, len(messages)) if faults.random() < behaviour.stream_error_rate else None
+    first = True
+    for i, (message, is_token) in enumerate(messages):
+        if is_token:
+            await asyncio.sleep(behaviour.first_token_delay(rng) if first else behaviour.token_delays(rng, 1)[0])
+            first = False
+        if i == fail_at:
+            behaviour.counts["stream_errors"] += 1
+            yield exception_event("modelStreamErrorException", "The stand-in interrupted this stream on purpose.")
+            return
+        yield message
+
+@app.get("/stats")
+async def stats():
+    return behaviour.counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--ttft-ms", type=float, default=400, help="Median time to first token")
+    parser.add_argument("--ttft-sigma", type=float, default=0.35, help="Log-normal spread of time to first token")
+    parser.add_argument("--token-ms", type=float, default=20, help="Mean delay between streamed tokens")
+    parser.add_argument("--output-tokens", type=int, default=120, help="Words in free-text replies")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of calls answered with 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of calls answered with 500")
+    parser.add_argument("--stream-error-rate", type=float, default=0.0, help="Share of streams cut off part-way")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    global behaviour
+    behaviour = Behaviour(args.ttft_ms, args.ttft_sigma, args.token_ms, args.output_tokens, args.throttle_rate,
+                          args.error_rate, args.stream_error_rate, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Checkpoint write/read latency as a conversation thread grows.
+
+Runs a minimal message graph turn by turn against MemorySaver and
+SQLiteCheckpointSaver, timing each checkpoint write (aput per super-step) and
+a latest-state read at each thread length. Also reports the checkpoint count
+and on-disk size, which should stay bounded by CHECKPOINT_KEEP_LAST.
+
+    cd backend && python -m benchmarks.checkpointer --turns 200 --report-every 25
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from typing import Annotated
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import END, START, StateGraph
+from langgraph.graph.message import add_messages
+from typing_extensions import TypedDict
+
+from utils.checkpointer import SQLiteCheckpointSaver
+
+REPLY = "Your last bill was $123.45 for 612 kWh over 91 days. " * 8
+
+class State(TypedDict):
+    messages: Annotated[list, add_messages]
+
+def build_graph(checkpointer):
+    workflow = StateGraph(State)
+    workflow.add_node("reply", lambda state: {"messages": [AIMessage(content=REPLY)]})
+    workflow.add_edge(START, "reply")
+    workflow.add_edge("reply", END)
+    return workflow.compile(checkpointer=checkpointer)
+
+class TimedPuts:
+    """Records the latency of every checkpoint write made through the saver"""
+
+    def __init__(self, saver):
+        self.saver = saver
+        self.samples = []
+        original = saver.put
+
+        def put(*args, **kwargs):
+            start = time.perf_counter()
+            result = original(*args, **kwargs)
+            self.samples.append((time.perf_counter() - start) * 1000)
+            return result
+
+        saver.put = put
+
+def run(name: str, saver, turns: int, report_every: int, db_path: str = None):
+    timed = TimedPuts(saver)
+    graph = build_graph(saver)
+    config = {"configurable": {"thread_id": "bench"}}
+    print(f"\n{name}")
+    print(f"{'turns':>6} {'put p50 ms':>11} {'put p95 ms':>11} {'get ms':>8} {'checkpoints':>12} {'db KB':>8}")
+    for turn in range(1, turns + 1):
+        graph.invoke({"messages": [HumanMessage(content=f"Question {turn} about my bill?")]}, config)
+        if turn % report_every:
+            continue
+        start = time.perf_counter()
+        for _ in range(20):
+            saver.get_tuple(config)
+        get_ms = (time.perf_counter() - start) * 1000 / 20
+        recent = timed.samples[-report_every * 3:]
+        quantiles = statistics.quantiles(recent, n=100)
+        checkpoints = sum(1 for _ in saver.list(config))
+        size_kb = sum(os.path.getsize(p) for p in (db_path, db_path + "-wal") if os.path.exists(p)) // 1024 \
+            if db_path else 0
+        print(f"{turn:>6} {quantiles[49]:>11.3f} {quantiles[94]:>11.3f} {get_ms:>8.3f} {checkpoints:>12} "
+              f"{size_kb if db_path else '-':>8}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--report-every", type=int, default=25)
+    parser.add_argument("--keep-last", type=int, default=5)
+    args = parser.parse_args()
+
+    run("MemorySaver", MemorySaver(), args.turns, args.report_every)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "checkpoints.db")
+        saver = SQLiteCheckpointSaver(db_path, keep_last=args.keep_last)
+        run(f"SQLiteCheckpointSaver (keep_last={args.keep_last})", saver, args.turns, args.report_every, db_path)
+        saver.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Latest-invoice lookup latency as the invoice table grows.
+
+Loads the schema from data/energy/energy_data_model.sql into a scratch Postgres
+schema, fills it with synthetic invoices at each size and times the same query
+EnergyDatabase uses. With invoice_entity_posted_idx the p50 should stay flat
+from thousands to millions of rows.
+
+    cd backend && python -m benchmarks.invoice_lookup --sizes 1000,100000,1000000
+"""
+import argparse
+import random
+import statistics
+import time
+from pathlib import Path
+
+import psycopg2
+
+from database import CUSTOMER_QUERY, EnergyDatabase
+
+SCHEMA_FILE = Path(__file__).resolve().parents[2] / "data" / "energy" / "energy_data_model.sql"
+BENCH_SCHEMA = "invoice_bench"
+
+def load_data(cur, entities: int, invoices: int):
+    cur.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+    cur.execute(f"CREATE SCHEMA {BENCH_SCHEMA}")
+    cur.execute(f"SET search_path TO {BENCH_SCHEMA}")
+    cur.execute(SCHEMA_FILE.read_text())
+    cur.execute("""
+        INSERT INTO entity (name, life_support, address)
+        SELECT 'Customer ' || g, 0, g || ' Example St, Sydney NSW 2000'
+        FROM generate_series(1, %s) g
+    """, (entities,))
+    cur.execute("""
+        INSERT INTO invoice (entity_id, accounting_period_id, net_amount, posted_date, due_date)
+        SELECT 1 + (random() * (%s - 1))::int, 1, (random() * 500)::numeric(16, 5),
+               now() - random() * interval '5 years', now() + interval '14 days'
+        FROM generate_series(1, %s)
+    """, (entities, invoices))
+    cur.execute("VACUUM ANALYZE entity")
+    cur.execute("VACUUM ANALYZE invoice")
+
+def time_lookups(cur, entities: int, lookups: int) -> list:
+    samples = []
+    for _ in range(lookups):
+        customer_id = random.randint(1, entities)
+        start = time.perf_counter()
+        cur.execute(CUSTOMER_QUERY, (customer_id,))
+        cur.fetchone()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+def uses_index_only_scan(cur) -> bool:
+    cur.execute("EXPLAIN " + CUSTOMER_QUERY, (1,))
+    return any("Index Only Scan" in row[0] for row in cur.fetchall())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000", help="Comma-separated invoice counts")
+    parser.add_argument("--entities", type=int, default=10000)
+    parser.add_argument("--lookups", type=int, default=1000)
+    parser.add_argument("--keep", action="store_true", help=f"Keep the {BENCH_SCHEMA} schema afterwards")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(**EnergyDatabase().connection_params)
+    conn.autocommit = True
+    print(f"{'invoices':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'index-only':>11}")
+    try:
+        with conn.cursor() as cur:
+            for size in (int(s) for s in args.sizes.split(",")):
+                load_data(cur, args.entities, size)
+                time_lookups(cur, args.entities, 50)  # warm the buffer cache
+                samples = time_lookups(cur, args.entities, args.lookups)
+                quantiles = statistics.quantiles(samples, n=100)
+                print(f"{size:>10} {quantiles[49]:>8.3f} {quantiles[94]:>8.3f} {quantiles[98]:>8.3f} "
+                      f"{str(uses_index_only_scan(cur)):>11}")
+            if not args.keep:
+                cur.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
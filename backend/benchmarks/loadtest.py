@@ -0,0 +1,359 @@
+"""End-to-end load test for the chat APIs.
+
+Simulated users run multi-turn session scripts (some with bill uploads)
+against each target in turn, back to back with optional think time, and the
+run reports throughput, per-turn latency and time-to-first-token
+percentiles, error rate and server RSS growth per target. Targets:
+
+    chat         POST /chat                          app.py (port 2024)
+    chat-stream  POST /chat/stream                   app.py (port 2024)
+    energy       POST /threads/{id}/chat             energy/energy_chatbot.py (port 8000)
+    generic      POST /threads/{id}/runs/stream      generic/generic_chatbot.py (port 2024)
+
+Time to first token is the first streamed token for streaming targets and
+the full response time otherwise. RSS is sampled from the process given with
+--pid (psutil if installed, else /proc). Results can be saved as a baseline
+and later runs compared against it; the exit status is 1 on a regression.
+Run the servers first, with BEDROCK_ENDPOINT_URL pointing at the stand-in for
+reproducible model latency (see benchmarks/bedrock_standin.py):
+
+    pip install -r benchmarks/requirements.txt
+    cd backend && python -m benchmarks.loadtest --targets energy --users 16 --duration 60 \\
+        --pid energy=$(pgrep -f energy_chatbot) --save-baseline baseline.json
+    cd backend && python -m benchmarks.loadtest --targets energy --users 16 --duration 60 --baseline baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import httpx
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data', 'energy')
+DEFAULT_URLS = {
+    "chat": "http://localhost:2024",
+    "chat-stream": "http://localhost:2024",
+    "energy": "http://localhost:8000",
+    "generic": "http://localhost:2024",
+}
+
+class Turn(NamedTuple):
+    message: str
+    upload: Optional[str] = None
+
+# Session scripts per target: each is one conversation, turn by turn.
+# Customer numbers must be 4-6 digits for app.py to pick them up and look them
+# up; both are entity ids of any database with at least 5000 customers.
+CHAT_SESSIONS = [
+    [Turn("Hi there"), Turn("I have a question about my bill"), Turn("My customer number is 1234"),
+     Turn("Why is my bill so much higher this quarter?")],
+    [Turn("I'm moving house and need a new connection"), Turn("The address is 12 George St, Sydney NSW 2000"),
+     Turn("What plans do you offer?")],
+    [Turn("Can I switch provider?"), Turn("I live at 5 Smith Road, Parramatta NSW 2150"),
+     Turn("Is there a cheaper plan for a family of four?")],
+    [Turn("When is my payment due?"), Turn("Customer number 4821"), Turn("Can I set up direct debit?")],
+]
+ENERGY_SESSIONS = [
+    [Turn("Can you explain my bill?", "TangoBill.pdf"), Turn("Why is my usage so high?")],
+    [Turn("Please review this bill", "Origin Standing Bill Example.pdf"),
+     Turn("Would I save money if I switch to a cheaper plan?")],
+    [Turn("I want to compare plans and switch to something cheaper"), Turn("What about time of use plans?")],
+    [Turn("I'm moving into a new home at 3 Collins St Melbourne VIC 3000 and need a connection"),
+     Turn("How long does a new connection take?")],
+]
+GENERIC_SESSIONS = [
+    [Turn("Summarise this electricity bill", "Origin Standing Bill Example.pdf"),
+     Turn("What is the daily supply charge?"), Turn("How does that compare with other retailers?")],
+    [Turn("Explain how time-of-use tariffs work"), Turn("When are off-peak hours usually?"),
+     Turn("How do I read a smart meter?")],
+    [Turn("What's on this bill?", "TangoBill.pdf"), Turn("Which charges could I reduce?")],
+]
+
+class Sample(NamedTuple):
+    latency_ms: float
+    ttft_ms: float
+    ok: bool
+
+def attachments(turn: Turn, uploads: Dict[str, bytes], field: str) -> Optional[List[Tuple]]:
+    if not turn.upload:
+        return None
+    return [(field, (turn.upload, uploads[turn.upload], "application/pdf"))]
+
+async def read_sse(response: httpx.Response, token_types: Tuple[str, ...]) -> Tuple[Optional[float], bool]:
+    """Consume an SSE body; (perf_counter of the first token event, whether it ended without an error)"""
+    first_token, ok = None, True
+    async for line in response.aiter_lines():
+        if not line.startswith("data: "):
+            continue
+        if line == "data: [DONE]":
+            break
+        event = json.loads(line[6:])
+        if "error" in event or event.get("type") == "error":
+            ok = False
+        elif first_token is None and event.get("type") in token_types:
+            first_token = time.perf_counter()
+    return first_token, ok
+
+async def chat_turn(client: httpx.AsyncClient, url: str, session: Dict, turn: Turn, uploads: Dict) -> Sample:
+    start = time.perf_counter()
+    response = await client.post(f"{url}/chat", json={"query": turn.message, "session_id": session.get("id")})
+    body = response.json()
+    session["id"] = body.get("session_id")
+    elapsed = (time.perf_counter() - start) * 1000
+    return Sample(elapsed, elapsed, response.status_code == 200 and body.get("agent_used") != "FALLBACK")
+
+async def chat_stream_turn(client: httpx.AsyncClient, url: str, session: Dict, turn: Turn, uploads: Dict) -> Sample:
+    start = time.perf_counter()
+    async with client.stream("POST", f"{url}/chat/stream",
+                             json={"query": turn.message, "session_id": session.get("id")}) as response:
+        if response.status_code != 200:
+            await response.aread()
+            return Sample((time.perf_counter() - start) * 1000, 0.0, False)
+        # The routing event carries the session id; the reply follows as token events
+        first_token, ok = None, True
+        async for line in response.aiter_lines():
+            if not line.startswith("data: ") or line == "data: [DONE]":
+                continue
+            event = json.loads(line[6:])
+            if event.get("type") == "routing":
+                session["id"] = event.get("session_id")
+            elif event.get("type") == "token" and first_token is None:
+                first_token = time.perf_counter()
+            elif event.get("type") == "error":
+                ok = False
+    end = time.perf_counter()
+    return Sample((end - start) * 1000, ((first_token or end) - start) * 1000, ok)
+
+async def energy_turn(client: httpx.AsyncClient, url: str, session: Dict, turn: Turn, uploads: Dict) -> Sample:
+    start = time.perf_counter()
+    response = await client.post(
+        f"{url}/threads/{session['thread']}/chat",
+        data={"message": turn.message, "customer_type": session["customer_type"]},
+        files=attachments(turn, uploads, "files")
+    )
+    elapsed = (time.perf_counter() - start) * 1000
+    return Sample(elapsed, elapsed, response.status_code == 200)
+
+async def generic_turn(client: httpx.AsyncClient, url: str, session: Dict, turn: Turn, uploads: Dict) -> Sample:
+    start = time.perf_counter()
+    async with client.stream("POST", f"{url}/threads/{session['thread']}/runs/stream",
+                             data={"message": turn.message, "stream_mode": "messages"},
+                             files=attachments(turn, uploads, "files")) as response:
+        if response.status_code != 200:
+            await response.aread()
+            return Sample((time.perf_counter() - start) * 1000, 0.0, False)
+        first_token, ok = await read_sse(response, ("delta",))
+    end = time.perf_counter()
+    return Sample((end - start) * 1000, ((first_token or end) - start) * 1000, ok)
+
+TARGETS = {
+    "chat": (chat_turn, CHAT_SESSIONS),
+    "chat-stream": (chat_stream_turn, CHAT_SESSIONS),
+    "energy": (energy_turn, ENERGY_SESSIONS),
+    "generic": (generic_turn, GENERIC_SESSIONS),
+}
+
+def rss_mb(pid: int) -> Optional[float]:
+    try:
+        if psutil:
+            return psutil.Process(pid).memory_info().rss / (1024 * 1024)
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except Exception:
+        # Process gone or not ours to inspect
+        return None
+    return None
+
+async def sample_rss(pid: int, readings: List[float], interval: float = 0.25):
+    while True:
+        reading = rss_mb(pid)
+        if reading is not None:
+            readings.append(reading)
+        await asyncio.sleep(interval)
+
+async def user(target: str, url: str, index: int, deadline: float, think_seconds: float, seed: int,
+               uploads: Dict[str, bytes], samples: List[Sample], client: httpx.AsyncClient):
+    turn_fn, sessions = TARGETS[target]
+    rng = random.Random(seed * 1000 + index)
+    while time.perf_counter() < deadline:
+        script = sessions[rng.randrange(len(sessions))]
+        session = {"thread": f"loadtest-{uuid.uuid4()}", "customer_type": rng.choice(["existing", "new"])}
+        for turn in script:
+            if time.perf_counter() >= deadline:
+                break
+            if turn.upload and turn.upload not in uploads:
+                turn = Turn(turn.message)
+            try:
+                samples.append(await turn_fn(client, url, session, turn, uploads))
+            except httpx.HTTPError:
+                # Transport failure or timeout; the rest of this conversation is moot
+                samples.append(Sample(0.0, 0.0, False))
+                break
+            if think_seconds:
+                await asyncio.sleep(rng.uniform(0.5, 1.5) * think_seconds)
+        if target in ("energy", "generic"):
+            try:
+                await client.delete(f"{url}/threads/{session['thread']}")
+            except httpx.HTTPError:
+                pass
+
+def percentile(values: List[float], q: int) -> float:
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100)[q - 1]
+
+async def run_target(target: str, url: str, users: int, duration: float, think_seconds: float, seed: int,
+                     uploads: Dict[str, bytes], pid: Optional[int], timeout: float) -> Dict:
+    samples: List[Sample] = []
+    readings: List[float] = []
+    sampler = asyncio.create_task(sample_rss(pid, readings)) if pid else None
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*(
+            user(target, url, i, deadline, think_seconds, seed, uploads, samples, client) for i in range(users)
+        ))
+        elapsed = time.perf_counter() - start
+    if sampler:
+        sampler.cancel()
+    latencies = [s.latency_ms for s in samples if s.ok]
+    ttfts = [s.ttft_ms for s in samples if s.ok]
+    return {
+        "users": users,
+        "requests": len(samples),
+        "error_rate": (len(samples) - len(latencies)) / len(samples) if samples else 0.0,
+        "rps": len(latencies) / elapsed,
+        "p50": percentile(latencies, 50), "p95": percentile(latencies, 95), "p99": percentile(latencies, 99),
+        "ttft_p50": percentile(ttfts, 50), "ttft_p95": percentile(ttfts, 95),
+        "rss_start_mb": readings[0] if readings else None,
+        "rss_peak_mb": max(readings) if readings else None,
+        "rss_growth_mb": readings[-1] - readings[0] if readings else None,
+    }
+
+# Metrics compared against a baseline, and whether a higher value is worse
+COMPARED = {"rps": False, "p50": True, "p95": True, "p99": True, "ttft_p50": True, "ttft_p95": True}
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> List[str]:
+    """Human-readable regressions beyond the threshold (a fraction, e.g. 0.1)"""
+    regressions = []
+    for target, result in results.items():
+        base = baseline.get(target)
+        if not base:
+            continue
+        for metric, higher_is_worse in COMPARED.items():
+            old, new = base.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (change > threshold) if higher_is_worse else (change < -threshold):
+                regressions.append(f"{target} {metric}: {old:.1f} -> {new:.1f} ({change:+.0%})")
+        if result["error_rate"] > base.get("error_rate", 0.0) + 0.01:
+            regressions.append(f"{target} error_rate: {base.get('error_rate', 0.0):.1%} -> {result['error_rate']:.1%}")
+        old_growth, new_growth = base.get("rss_growth_mb"), result.get("rss_growth_mb")
+        if old_growth is not None and new_growth is not None and \
+                new_growth > max(old_growth * (1 + threshold), old_growth + 1.0):
+            regressions.append(f"{target} rss_growth_mb: {old_growth:.1f} -> {new_growth:.1f}")
+    return regressions
+
+def print_results(results: Dict[str, Dict], baseline: Optional[Dict[str, Dict]]):
+    print(f"{'target':>12} {'users':>5} {'reqs':>6} {'err %':>6} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'ttft50':>8} {'ttft95':>8} {'rss MB':>8} {'+rss MB':>8}")
+    for target, r in results.items():
+        rss = f"{r['rss_start_mb']:>8.1f} {r['rss_growth_mb']:>+8.1f}" if r["rss_start_mb"] is not None else f"{'-':>8} {'-':>8}"
+        print(f"{target:>12} {r['users']:>5} {r['requests']:>6} {r['error_rate'] * 100:>6.1f} {r['rps']:>7.1f} "
+              f"{r['p50']:>8.1f} {r['p95']:>8.1f} {r['p99']:>8.1f} {r['ttft_p50']:>8.1f} {r['ttft_p95']:>8.1f} {rss}")
+        base = (baseline or {}).get(target)
+        if base:
+            deltas = " ".join(
+                f"{metric} {(r[metric] - base[metric]) / base[metric]:+.0%}" for metric in COMPARED if base.get(metric)
+            )
+            print(f"{'vs baseline':>12} {deltas}")
+
+def parse_pairs(values: List[str], cast=str) -> Dict[str, object]:
+    pairs = {}
+    for value in values:
+        name, _, setting = value.partition("=")
+        pairs[name] = cast(setting)
+    return pairs
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--targets", default="chat,energy,generic", help=f"Comma-separated, from {', '.join(TARGETS)}")
+    parser.add_argument("--url", action="append", default=[], metavar="TARGET=URL", help="Override a target's base URL")
+    parser.add_argument("--pid", action="append", default=[], metavar="TARGET=PID", help="Server process to sample RSS from")
+    parser.add_argument("--users", type=int, default=8, help="Concurrent simulated users per target")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run each target")
+    parser.add_argument("--think-seconds", type=float, default=0.0, help="Mean pause between a user's turns")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-uploads", action="store_true", help="Drop file attachments from the scripts")
+    parser.add_argument("--baseline", help="Compare against results saved with --save-baseline")
+    parser.add_argument("--save-baseline", help="Write this run's results as JSON")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Allowed relative regression before failing")
+    args = parser.parse_args()
+
+    targets = [t.strip() for t in args.targets.split(",") if t.strip()]
+    unknown = [t for t in targets if t not in TARGETS]
+    if unknown:
+        parser.error(f"Unknown targets: {', '.join(unknown)}")
+    urls = {**DEFAULT_URLS, **parse_pairs(args.url)}
+    pids = parse_pairs(args.pid, int)
+
+    uploads = {}
+    if not args.no_uploads:
+        for script in ENERGY_SESSIONS + GENERIC_SESSIONS:
+            for turn in script:
+                if turn.upload and turn.upload not in uploads:
+                    with open(os.path.join(DATA_DIR, turn.upload), "rb") as f:
+                        uploads[turn.upload] = f.read()
+
+    results = {}
+    for target in targets:
+        try:
+            httpx.get(urls[target], timeout=5)
+        except httpx.TransportError as e:
+            print(f"Skipping {target}: {urls[target]} is unreachable ({e})")
+            continue
+        results[target] = asyncio.run(run_target(
+            target, urls[target].rstrip("/"), args.users, args.duration, args.think_seconds, args.seed,
+            uploads, pids.get(target), args.timeout
+        ))
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            saved = json.load(f)
+        baseline = saved["results"]
+        if (saved["users"], saved["duration"]) != (args.users, args.duration):
+            print(f"Note: baseline ran {saved['users']} users for {saved['duration']}s; "
+                  f"this run is {args.users} users for {args.duration}s")
+    print_results(results, baseline)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump({"users": args.users, "duration": args.duration, "results": results}, f, indent=2)
+    if baseline:
+        regressions = compare(results, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Upload server throughput for N parallel uploads.
+
+Posts the same multipart form the frontend sends (file + domain) from a pool
+of client threads and reports aggregate MB/s and per-upload latency. Each
+response's sha256 is checked against the payload. Start the server first:
+
+    cd backend/uploads && python upload_server.py
+    cd backend && python -m benchmarks.upload_throughput --parallel 1,8,32 --size-mb 4
+"""
+import argparse
+import hashlib
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+DOMAIN = "upload-bench"
+
+def upload(session: requests.Session, url: str, payload: bytes, digest: str, i: int) -> float:
+    start = time.perf_counter()
+    response = session.post(f"{url}/upload", files={"file": (f"bench-{i}.bin", payload)}, data={"domain": DOMAIN})
+    response.raise_for_status()
+    if response.json().get("sha256") != digest:
+        raise RuntimeError(f"Hash mismatch for upload {i}")
+    return (time.perf_counter() - start) * 1000
+
+def run(url: str, parallel: int, uploads: int, payload: bytes) -> tuple:
+    digest = hashlib.sha256(payload).hexdigest()
+    sessions = [requests.Session() for _ in range(parallel)]
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        start = time.perf_counter()
+        samples = list(pool.map(lambda i: upload(sessions[i % parallel], url, payload, digest, i), range(uploads)))
+        elapsed = time.perf_counter() - start
+    return samples, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--parallel", default="1,4,16,32", help="Comma-separated client concurrency levels")
+    parser.add_argument("--uploads", type=int, default=64, help="Uploads per concurrency level")
+    parser.add_argument("--size-mb", type=float, default=4)
+    args = parser.parse_args()
+
+    payload = os.urandom(int(args.size_mb * 1024 * 1024))
+    print(f"{'parallel':>8} {'MB/s':>8} {'uploads/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    try:
+        for parallel in (int(p) for p in args.parallel.split(",")):
+            samples, elapsed = run(args.url, parallel, args.uploads, payload)
+            quantiles = statistics.quantiles(samples, n=100)
+            mb_per_second = len(payload) * len(samples) / elapsed / (1024 * 1024)
+            print(f"{parallel:>8} {mb_per_second:>8.1f} {len(samples) / elapsed:>10.1f} "
+                  f"{quantiles[49]:>8.1f} {quantiles[94]:>8.1f} {quantiles[98]:>8.1f}")
+    finally:
+        requests.delete(f"{args.url}/files/{DOMAIN}")
+
+if __name__ == "__main__":
+    main()
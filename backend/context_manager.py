@@ -1,34 +1,94 @@
+import asyncio
+import json
+import logging
+import os
+import time
 import uuid
-from typing import Dict, Optional, Any
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, Optional, Any
 from datetime import datetime, timedelta
+from session_store import SessionStore, create_session_store
+
+logger = logging.getLogger(__name__)
+
+MAX_SESSIONS = int(os.getenv('SESSION_MAX_COUNT', '10000'))
+MAX_HISTORY = int(os.getenv('SESSION_MAX_HISTORY', '50'))
+SESSION_TIMEOUT_MINUTES = int(os.getenv('SESSION_TIMEOUT_MINUTES', '120'))
+SWEEP_INTERVAL_SECONDS = float(os.getenv('SESSION_SWEEP_INTERVAL_SECONDS', '60'))
+FLUSH_INTERVAL_SECONDS = float(os.getenv('SESSION_FLUSH_INTERVAL_SECONDS', '0.5'))
+CACHE_TTL_SECONDS = float(os.getenv('SESSION_CACHE_TTL_SECONDS', '2'))
+
+# Bump when the serialised layout changes; payloads of other versions are ignored
+SESSION_FORMAT_VERSION = 1
 
 class ConversationContext:
-    def __init__(self, session_id: str):
+    __slots__ = (
+        'session_id', 'customer_number', 'address', 'customer_data', 'current_agent',
+        'conversation_history', 'created_at', 'last_updated', 'on_change', 'synced_at'
+    )
+
+    def __init__(self, session_id: str, max_history: int = MAX_HISTORY):
         self.session_id = session_id
         self.customer_number: Optional[str] = None
         self.address: Optional[str] = None
         self.customer_data: Optional[Dict] = None
         self.current_agent: Optional[str] = None
-        self.conversation_history: list = []
+        # Only the most recent turns are kept; older ones fall off the left
+        self.conversation_history: Deque[Dict[str, Any]] = deque(maxlen=max_history)
         self.created_at = datetime.now()
+        self.last_updated = self.created_at
+        # Set by ContextManager when changes must be written to a persistent store
+        self.on_change: Optional[Callable[[str], None]] = None
+        self.synced_at = 0.0
+
+    def touch(self):
         self.last_updated = datetime.now()
-    
+        if self.on_change:
+            self.on_change(self.session_id)
+
+    def to_bytes(self) -> bytes:
+        """Compact positional JSON encoding, prefixed with the format version"""
+        return json.dumps([
+            SESSION_FORMAT_VERSION, self.session_id, self.customer_number, self.address,
+            self.customer_data, self.current_agent,
+            [[m['type'], m['content'], m['agent'], m['timestamp']] for m in self.conversation_history],
+            self.created_at.timestamp(), self.last_updated.timestamp()
+        ], separators=(',', ':'), default=str).encode('utf-8')
+
+    @classmethod
+    def from_bytes(cls, payload: bytes, max_history: int = MAX_HISTORY) -> Optional["ConversationContext"]:
+        data = json.loads(payload)
+        if data[0] != SESSION_FORMAT_VERSION:
+            return None
+        _, session_id, customer_number, address, customer_data, current_agent, history, created, updated = data
+        context = cls(session_id, max_history)
+        context.customer_number = customer_number
+        context.address = address
+        context.customer_data = customer_data
+        context.current_agent = current_agent
+        context.conversation_history.extend(
+            {'type': t, 'content': c, 'agent': a, 'timestamp': ts} for t, c, a, ts in history
+        )
+        context.created_at = datetime.fromtimestamp(created)
+        context.last_updated = datetime.fromtimestamp(updated)
+        return context
+
     def update_customer_number(self, customer_number: str):
         self.customer_number = customer_number
-        self.last_updated = datetime.now()
-    
+        self.touch()
+
     def update_address(self, address: str):
         self.address = address
-        self.last_updated = datetime.now()
-    
+        self.touch()
+
     def update_customer_data(self, data: Dict):
         self.customer_data = data
-        self.last_updated = datetime.now()
-    
+        self.touch()
+
     def set_current_agent(self, agent: str):
         self.current_agent = agent
-        self.last_updated = datetime.now()
-    
+        self.touch()
+
     def add_message(self, message_type: str, content: str, agent: str = None):
         self.conversation_history.append({
             'type': message_type,
@@ -36,36 +96,162 @@ class ConversationContext:
             'agent': agent,
             'timestamp': datetime.now().isoformat()
         })
-        self.last_updated = datetime.now()
+        self.touch()
 
 class ContextManager:
-    def __init__(self):
-        self.contexts: Dict[str, ConversationContext] = {}
-        self.session_timeout = timedelta(hours=2)
-    
+    """Bounded session cache in front of a SessionStore.
+
+    Contexts are kept in least-recently-used order: every access moves a session
+    to the back, so the front always holds the stalest sessions. That lets both
+    the size cap and expiry pop from the front and stop at the first live one.
+
+    With a persistent store, changed sessions are written behind in batches by
+    run_flusher, and cached copies older than cache_ttl are re-read so a session
+    served by another worker is picked up.
+    """
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS, max_history: int = MAX_HISTORY,
+                 session_timeout: timedelta = timedelta(minutes=SESSION_TIMEOUT_MINUTES),
+                 store: Optional[SessionStore] = None, cache_ttl: float = CACHE_TTL_SECONDS):
+        self.contexts: "OrderedDict[str, ConversationContext]" = OrderedDict()
+        self.max_sessions = max_sessions
+        self.max_history = max_history
+        self.session_timeout = session_timeout
+        self.store = store or create_session_store()
+        self.cache_ttl = cache_ttl
+        self._dirty: set = set()
+        self.evicted_sessions = 0
+        self.expired_sessions = 0
+        self.persisted_writes = 0
+
+    def _mark_dirty(self, session_id: str):
+        self._dirty.add(session_id)
+
+    def _cache(self, context: ConversationContext):
+        if self.store.persistent:
+            context.on_change = self._mark_dirty
+            context.synced_at = time.monotonic()
+        self.contexts[context.session_id] = context
+        self.contexts.move_to_end(context.session_id)
+        overflow = {}
+        while len(self.contexts) > self.max_sessions:
+            session_id, evicted = self.contexts.popitem(last=False)
+            self.evicted_sessions += 1
+            if session_id in self._dirty:
+                self._dirty.discard(session_id)
+                overflow[session_id] = (evicted.last_updated.timestamp(), evicted.to_bytes())
+        # Evicted sessions with unsaved changes are written now rather than lost
+        if overflow:
+            self.store.save_many(overflow)
+            self.persisted_writes += len(overflow)
+
+    def _load(self, session_id: str) -> Optional[ConversationContext]:
+        payload = self.store.load(session_id)
+        return ConversationContext.from_bytes(payload, self.max_history) if payload else None
+
     def create_session(self) -> str:
         session_id = str(uuid.uuid4())
-        self.contexts[session_id] = ConversationContext(session_id)
+        self._cache(ConversationContext(session_id, self.max_history))
+        if self.store.persistent:
+            self._dirty.add(session_id)
         return session_id
-    
+
     def get_context(self, session_id: str) -> Optional[ConversationContext]:
-        if session_id in self.contexts:
-            context = self.contexts[session_id]
-            # Check if session expired
-            if datetime.now() - context.last_updated > self.session_timeout:
-                del self.contexts[session_id]
-                return None
-            return context
-        return None
-    
-    def cleanup_expired_sessions(self):
-        expired_sessions = []
-        for session_id, context in self.contexts.items():
-            if datetime.now() - context.last_updated > self.session_timeout:
-                expired_sessions.append(session_id)
-        
-        for session_id in expired_sessions:
+        context = self.contexts.get(session_id)
+        stale = context is None or (
+            session_id not in self._dirty and time.monotonic() - context.synced_at > self.cache_ttl
+        )
+        if self.store.persistent and stale:
+            stored = self._load(session_id)
+            if stored and (context is None or stored.last_updated > context.last_updated):
+                context = stored
+                self._cache(context)
+            elif context is not None:
+                context.synced_at = time.monotonic()
+        if context is None:
+            return None
+        # Check if session expired
+        if datetime.now() - context.last_updated > self.session_timeout:
+            self.contexts.pop(session_id, None)
+            self._dirty.discard(session_id)
+            self.store.delete(session_id)
+            self.expired_sessions += 1
+            return None
+        context.touch()
+        self.contexts.move_to_end(session_id)
+        return context
+
+    def _take_dirty(self) -> Dict[str, tuple]:
+        records = {}
+        for session_id in self._dirty:
+            context = self.contexts.get(session_id)
+            if context is not None:
+                records[session_id] = (context.last_updated.timestamp(), context.to_bytes())
+        self._dirty.clear()
+        return records
+
+    def flush(self):
+        """Write all pending session changes to the store in one batch"""
+        records = self._take_dirty()
+        self.store.save_many(records)
+        self.persisted_writes += len(records)
+
+    async def run_flusher(self, interval_seconds: float = FLUSH_INTERVAL_SECONDS):
+        """Write-behind loop for persistent stores; run as a background task"""
+        if not self.store.persistent:
+            return
+        while True:
+            await asyncio.sleep(interval_seconds)
+            # Snapshot on the event loop, write on a worker thread
+            records = self._take_dirty()
+            if not records:
+                continue
+            try:
+                await asyncio.to_thread(self.store.save_many, records)
+            except Exception as e:
+                # e.g. "database is locked" under other workers; retry the batch next round
+                logger.warning(f"Session flush of {len(records)} sessions failed, will retry: {e}")
+                self._dirty.update(records)
+                continue
+            self.persisted_writes += len(records)
+
+    def cleanup_expired_sessions(self) -> int:
+        """Drop expired sessions; costs O(expired) since the stalest come first"""
+        cutoff = datetime.now() - self.session_timeout
+        removed = 0
+        while self.contexts:
+            session_id, context = next(iter(self.contexts.items()))
+            if context.last_updated > cutoff:
+                break
             del self.contexts[session_id]
+            self._dirty.discard(session_id)
+            removed += 1
+        self.expired_sessions += removed
+        return removed
+
+    async def run_sweeper(self, interval_seconds: float = SWEEP_INTERVAL_SECONDS):
+        """Periodically expire idle sessions; run as a background task"""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                self.cleanup_expired_sessions()
+                if self.store.persistent:
+                    cutoff = (datetime.now() - self.session_timeout).timestamp()
+                    await asyncio.to_thread(self.store.purge_expired, cutoff)
+            except Exception as e:
+                logger.warning(f"Session sweep failed, will retry: {e}")
+
+    def close(self):
+        self.flush()
+        self.store.close()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "live_sessions": len(self.contexts),
+            "evicted_sessions": self.evicted_sessions,
+            "expired_sessions": self.expired_sessions,
+            "persisted_writes": self.persisted_writes
+        }
 
 # Global context manager instance
-context_manager = ContextManager()
\ No newline at end of file
+context_manager = ContextManager()
@@ -1,6 +1,113 @@
 import psycopg2
+import psycopg2.pool
+import asyncio
+import logging
 import os
-from typing import Dict, Optional
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+from utils.address_coverage import check_address
+from utils.cache import TTLCache
+from utils.metrics import Counter, Histogram, register_cache
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+_NOT_FOUND = object()
+
+# Latest posted invoice via a LATERAL probe of invoice_entity_posted_idx, so the
+# cost is one index descent no matter how many invoices the customer has
+CUSTOMER_QUERY = """
+    SELECT e.id, e.name, e.address, i.net_amount, i.due_date
+    FROM entity e
+    LEFT JOIN LATERAL (
+        SELECT net_amount, due_date
+        FROM invoice
+        WHERE entity_id = e.id
+        ORDER BY posted_date DESC NULLS LAST
+        LIMIT 1
+    ) i ON TRUE
+    WHERE e.id = %s
+"""
+
+# All register reads for a customer's meters in one round-trip, as plain numbers
+# ready to load straight into NumPy; served by meterreading_meter_date_idx
+METER_READINGS_QUERY = """
+    SELECT r.meter_id, EXTRACT(EPOCH FROM r.reading_date)::float8, r.reading::float8
+    FROM meter m
+    JOIN meterreading r ON r.meter_id = m.id
+    WHERE m.entity_id = %s
+      AND r.reading_date >= now() - %s * interval '1 day'
+      AND r.reading IS NOT NULL
+    ORDER BY r.meter_id, r.reading_date
+"""
+
+DB_QUERY_SECONDS = Histogram("db_query_seconds", "Postgres query time including connection checkout", ["query"])
+DB_ERRORS = Counter("db_errors_total", "Postgres queries that failed", ["query"])
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection frees up within the acquire timeout"""
+
+class ConnectionPool:
+    """Bounded psycopg2 pool with acquire timeouts and idle health checks"""
+
+    def __init__(self, min_size: int, max_size: int, acquire_timeout: float,
+                 healthcheck_interval: float, **connection_params):
+        self._pool = psycopg2.pool.ThreadedConnectionPool(min_size, max_size, **connection_params)
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._last_used: Dict[int, float] = {}
+        self.acquire_timeout = acquire_timeout
+        self.healthcheck_interval = healthcheck_interval
+
+    def _is_healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        # Only ping connections that sat idle long enough to have been dropped
+        last_used = self._last_used.get(id(conn))
+        if last_used is None or time.monotonic() - last_used < self.healthcheck_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _checkout(self):
+        conn = self._pool.getconn()
+        if not self._is_healthy(conn):
+            self._last_used.pop(id(conn), None)
+            self._pool.putconn(conn, close=True)
+            conn = self._pool.getconn()
+        return conn
+
+    @contextmanager
+    def connection(self):
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise PoolTimeoutError(f"No database connection available within {self.acquire_timeout}s")
+        conn = None
+        broken = False
+        try:
+            conn = self._checkout()
+            with conn:  # commit on success, rollback on error
+                yield conn
+        except psycopg2.OperationalError:
+            broken = True
+            raise
+        finally:
+            if conn is not None:
+                discard = broken or bool(conn.closed)
+                if discard:
+                    self._last_used.pop(id(conn), None)
+                else:
+                    self._last_used[id(conn)] = time.monotonic()
+                self._pool.putconn(conn, close=discard)
+            self._slots.release()
+
+    def close(self):
+        self._pool.closeall()
 
 class EnergyDatabase:
     def __init__(self):
@@ -9,41 +116,128 @@ class EnergyDatabase:
             'database': os.getenv('DB_NAME', 'energy_db'),
             'user': os.getenv('DB_USER', 'postgres'),
             'password': os.getenv('DB_PASSWORD', 'password'),
-            'port': os.getenv('DB_PORT', '5432')
+            'port': os.getenv('DB_PORT', '5432'),
+            'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', '5'))
+        }
+        self.pool_settings = {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '1')),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+            'acquire_timeout': float(os.getenv('DB_POOL_ACQUIRE_TIMEOUT', '5')),
+            'healthcheck_interval': float(os.getenv('DB_POOL_HEALTHCHECK_INTERVAL', '30'))
         }
-    
+        self._pool: Optional[ConnectionPool] = None
+        self._pool_lock = threading.Lock()
+        # Read-through cache so a multi-turn conversation hits Postgres once per customer
+        self.customer_cache = TTLCache(
+            max_size=int(os.getenv('CUSTOMER_CACHE_SIZE', '1024')),
+            ttl_seconds=float(os.getenv('CUSTOMER_CACHE_TTL_SECONDS', '300'))
+        )
+        register_cache("customer", self.customer_cache)
+        self.negative_cache_ttl = float(os.getenv('CUSTOMER_CACHE_NEGATIVE_TTL_SECONDS', '30'))
+        self._invalidation_listeners: List[Callable[[str], None]] = []
+
+    @property
+    def pool(self) -> ConnectionPool:
+        # Created on first use so the app still starts when Postgres is down
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ConnectionPool(**self.pool_settings, **self.connection_params)
+        return self._pool
+
     def get_connection(self):
-        return psycopg2.connect(**self.connection_params)
-    
+        """Borrow a pooled connection; use as a context manager"""
+        return self.pool.connection()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+
+    def _fetch_customer(self, customer_number: str) -> Optional[Dict]:
+        with DB_QUERY_SECONDS.time(query="customer"), self.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(CUSTOMER_QUERY, (customer_number,))
+
+                result = cur.fetchone()
+                if result:
+                    return {
+                        'customer_id': result[0],
+                        'name': result[1],
+                        'address': result[2],
+                        'current_bill': float(result[3]) if result[3] else 0,
+                        'due_date': result[4].isoformat() if result[4] else None
+                    }
+        return None
+
+    def _cached_customer(self, customer_number: str):
+        cached = self.customer_cache.get(customer_number, _MISSING)
+        if cached is _MISSING or cached is _NOT_FOUND:
+            return cached
+        return dict(cached)
+
+    def _cache_customer(self, customer_number: str, customer: Optional[Dict]):
+        if customer:
+            self.customer_cache.set(customer_number, customer)
+        else:
+            # Unknown numbers are cached briefly so repeated typos don't each cost a query
+            self.customer_cache.set(customer_number, _NOT_FOUND, ttl_seconds=self.negative_cache_ttl)
+
     def get_customer_by_number(self, customer_number: str) -> Optional[Dict]:
         """Retrieve customer data by customer number"""
+        customer_number = str(customer_number).strip()
+        cached = self._cached_customer(customer_number)
+        if cached is not _MISSING:
+            return None if cached is _NOT_FOUND else cached
+        return self._load_customer(customer_number)
+
+    def _load_customer(self, customer_number: str) -> Optional[Dict]:
+        """Query a customer the cache didn't have and cache the answer"""
         try:
-            with self.get_connection() as conn:
+            customer = self._fetch_customer(customer_number)
+        except Exception as e:
+            # Errors are not cached, the next turn retries
+            DB_ERRORS.inc(query="customer")
+            logger.error(f"Customer lookup failed: {e}")
+            return None
+        self._cache_customer(customer_number, customer)
+        return dict(customer) if customer else None
+
+    async def aget_customer_by_number(self, customer_number: str) -> Optional[Dict]:
+        """Async variant for FastAPI handlers; cache misses query on a worker thread"""
+        customer_number = str(customer_number).strip()
+        cached = self._cached_customer(customer_number)
+        if cached is not _MISSING:
+            return None if cached is _NOT_FOUND else cached
+        # Straight to the query; a second cache lookup would count the miss twice
+        return await asyncio.to_thread(self._load_customer, customer_number)
+
+    def get_meter_readings(self, customer_number: str, history_days: int = 730) -> List[Tuple[int, float, float]]:
+        """(meter_id, epoch_seconds, register_reading) rows for all of a customer's meters"""
+        try:
+            with DB_QUERY_SECONDS.time(query="meter_readings"), self.get_connection() as conn:
                 with conn.cursor() as cur:
-                    cur.execute("""
-                        SELECT e.id, e.name, e.address, i.net_amount, i.due_date
-                        FROM entity e
-                        LEFT JOIN invoice i ON e.id = i.entity_id
-                        WHERE e.id = %s
-                        ORDER BY i.posted_date DESC
-                        LIMIT 1
-                    """, (customer_number,))
-                    
-                    result = cur.fetchone()
-                    if result:
-                        return {
-                            'customer_id': result[0],
-                            'name': result[1],
-                            'address': result[2],
-                            'current_bill': float(result[3]) if result[3] else 0,
-                            'due_date': result[4].isoformat() if result[4] else None
-                        }
+                    cur.execute(METER_READINGS_QUERY, (str(customer_number).strip(), history_days))
+                    return cur.fetchall()
         except Exception as e:
-            print(f"Database error: {e}")
-        return None
-    
+            DB_ERRORS.inc(query="meter_readings")
+            logger.error(f"Meter readings query failed: {e}")
+        return []
+
+    def invalidate_customer(self, customer_number: str):
+        """Drop a cached customer after its entity or invoices change"""
+        customer_number = str(customer_number).strip()
+        self.customer_cache.invalidate(customer_number)
+        for listener in self._invalidation_listeners:
+            listener(customer_number)
+
+    def add_invalidation_listener(self, listener: Callable[[str], None]):
+        """Register a callback run whenever a customer is invalidated"""
+        self._invalidation_listeners.append(listener)
+
+    def clear_customer_cache(self):
+        self.customer_cache.clear()
+
     def check_address_coverage(self, address: str) -> bool:
         """Check if address is in service area"""
-        # Simplified check - in real implementation would have coverage database
-        coverage_areas = ['sydney', 'melbourne', 'brisbane', 'perth', 'adelaide']
-        return any(area in address.lower() for area in coverage_areas)
\ No newline at end of file
+        return check_address(address)['available']
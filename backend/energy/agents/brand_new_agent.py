@@ -1,20 +1,17 @@
 from typing import TYPE_CHECKING
-from langchain_aws import ChatBedrockConverse
+from utils.address_client import address_client
+from utils.llm_clients import get_chat_model
 
 if TYPE_CHECKING:
     from ..energy_chatbot import AgentState
 
-llm = ChatBedrockConverse(
-    model="us.anthropic.claude-sonnet-4-20250514-v1:0",
-    region_name="us-east-1",
-)
-
 def brand_new_agent(state: "AgentState") -> "AgentState":
     messages = state["messages"]
     files = state.get("uploaded_files", [])
     
     # Prepare context for LLM
-    user_message = messages[-1] if messages else "New connection request"
+    # The supervisor has already appended its routing note; use the customer's own words
+    user_message = next((m for m in reversed(messages) if m.startswith("User:")), "New connection request")
     file_context = f" with {len(files)} uploaded files" if files else ""
     
     # Check if additional user input is needed
@@ -28,17 +25,23 @@ def brand_new_agent(state: "AgentState") -> "AgentState":
         messages.append("Brand New Agent: I need your service address to proceed with the new connection.")
         resolution_status = "awaiting_input"
     else:
+        coverage = address_client.check_address_sync(user_message)
         prompt = f"""You are an energy company agent helping with new connection requests.
 Customer message: {user_message}{file_context}
+Service coverage: {coverage['message']}
 Provide a helpful response for setting up new energy service."""
         
         try:
-            response = llm.invoke(prompt)
+            response = get_chat_model().invoke(prompt)
             llm_response = response.content
             messages.append(f"Brand New Agent: {llm_response}")
             resolution_status = "connection_processed"
         except Exception as e:
-            messages.append(f"Brand New Agent: Processing new connection request... Connection approved. Welcome package will be sent.")
-            resolution_status = "connection_verified"
+            if coverage['available']:
+                messages.append(f"Brand New Agent: Processing new connection request... Connection approved. Welcome package will be sent.")
+                resolution_status = "connection_verified"
+            else:
+                messages.append(f"Brand New Agent: {coverage['message']}")
+                resolution_status = "coverage_unavailable"
     
     return {**state, "messages": messages, "resolution_status": resolution_status, "required_user_input": required_user_input, "input_needed": input_needed}
\ No newline at end of file
@@ -1,15 +1,16 @@
 from typing import TYPE_CHECKING
-from langchain_aws import ChatBedrockConverse
 from langchain_core.tools import tool
 from langchain_core.messages import HumanMessage
+from utils.llm_clients import get_chat_model
+from utils.metrics import register_cache
+from utils.routing import RoutingCache
+from utils.intent_classifier import graph_routing_classifier
 
 if TYPE_CHECKING:
     from ..energy_chatbot import AgentState
 
-llm = ChatBedrockConverse(
-    model="us.anthropic.claude-sonnet-4-20250514-v1:0",
-    region_name="us-east-1",
-)
+routing_cache = RoutingCache()
+register_cache("graph_routing", routing_cache)
 
 @tool
 def route_to_bill_explorer() -> str:
@@ -29,9 +30,18 @@ def route_to_brand_new_agent() -> str:
 def supervisor_agent(state: "AgentState") -> "AgentState":
     messages = state["messages"]
     user_message = messages[-1] if messages else "Customer inquiry"
+    customer_known = bool(state.get("customer_id"))
+    
+    intent = graph_routing_classifier.classify(user_message)
+    if intent.confident():
+        next_agent = intent.intent
+    else:
+        next_agent = routing_cache.lookup(user_message, customer_known=customer_known)
+    if next_agent:
+        messages.append(f"Supervisor: Routing to {next_agent.replace('_', ' ').title()} based on request analysis")
+        return {**state, "messages": messages, "next_agent": next_agent, "required_user_input": False, "input_needed": None}
     
     tools = [route_to_bill_explorer, route_to_switch_agent, route_to_brand_new_agent]
-    llm_with_tools = llm.bind_tools(tools)
     
     prompt = f"""You are a supervisor agent for an energy company. Based on the customer's message, decide which specialist agent should handle their request.
     
@@ -40,15 +50,17 @@ Customer message: {user_message}
 Choose the appropriate routing tool."""
     
     try:
+        llm_with_tools = get_chat_model().bind_tools(tools)
         response = llm_with_tools.invoke([HumanMessage(content=prompt)])
         if response.tool_calls:
             next_agent = response.tool_calls[0]["name"].replace("route_to_", "")
+            routing_cache.store(user_message, next_agent, customer_known=customer_known)
             messages.append(f"Supervisor: Routing to {next_agent.replace('_', ' ').title()} based on request analysis")
         else:
-            next_agent = "bill_explorer"
-            messages.append("Supervisor: Defaulting to Bill Explorer")
+            next_agent = intent.intent or "bill_explorer"
+            messages.append(f"Supervisor: Defaulting to {next_agent.replace('_', ' ').title()}")
     except Exception:
-        next_agent = "bill_explorer"
-        messages.append("Supervisor: Defaulting to Bill Explorer")
+        next_agent = intent.intent or "bill_explorer"
+        messages.append(f"Supervisor: Defaulting to {next_agent.replace('_', ' ').title()}")
     
     return {**state, "messages": messages, "next_agent": next_agent, "required_user_input": False, "input_needed": None}
\ No newline at end of file
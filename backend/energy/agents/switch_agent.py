@@ -1,4 +1,5 @@
 from typing import TYPE_CHECKING
+from utils.bill_analysis import analyse_bills
 
 if TYPE_CHECKING:
     from ..energy_chatbot import AgentState
@@ -8,6 +9,11 @@ def switch_agent(state: "AgentState") -> "AgentState":
     files = state.get("uploaded_files", [])
     if files:
         messages.append(f"Switch Agent: Received {len(files)} file(s) for plan comparison. Processing uploaded bills...")
+        for bill in analyse_bills(files):
+            retailer = bill.get("retailer") or "current retailer"
+            usage = f"{bill['usage_kwh']} kWh" if bill.get("usage_kwh") is not None else "usage not shown"
+            amount = f"${bill['amount_due']}" if bill.get("amount_due") is not None else "amount not shown"
+            messages.append(f"Switch Agent: Your {retailer} bill shows {usage}, {amount} due.")
     else:
         messages.append("Switch Agent: No files uploaded for plan comparison.")
     
@@ -1,13 +1,25 @@
 from typing import Annotated, Dict, List, Optional, Any
 from typing_extensions import TypedDict
 from langgraph.graph import StateGraph, END
+import asyncio
 import operator
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi.responses import Response
 from pydantic import BaseModel
 import uvicorn
-from langgraph.checkpoint.memory import MemorySaver
 from agents import supervisor_agent, switch_agent, brand_new_agent
-from utils.file_processor import process_files
+from utils import bill_extractor
+from utils.address_client import address_client
+from utils.bill_analysis import analyse_bills
+from utils.blob_store import store_attachments
+from utils.checkpointer import SQLiteCheckpointSaver
+from utils.file_processor import UploadLimitMiddleware, process_files
+from utils.llm_clients import warm_up
+from utils.metrics import METRICS_CONTENT_TYPE, render_metrics, timed_node
+from utils.usage_analytics import summarise_usage
+from database import EnergyDatabase
 
 class AgentState(TypedDict):
     messages: Annotated[List[str], operator.add]
@@ -18,10 +30,27 @@ class AgentState(TypedDict):
     energy_plan: Optional[str]
     next_agent: Optional[str]
     resolution_status: str
-    uploaded_files: Optional[List[Any]]
+    uploaded_files: Optional[List[Dict]]  # blob store references, see utils.blob_store
     required_user_input: bool
     input_needed: Optional[str]
 
+db = EnergyDatabase()
+USAGE_PERIOD_DAYS = int(os.getenv('USAGE_PERIOD_DAYS', '30'))
+
+def get_bill_data(customer_id: Optional[str]) -> Dict:
+    """Latest invoice plus usage analytics computed from the customer's meter readings"""
+    bill_data = {"account_id": customer_id, "usage_available": False}
+    if not customer_id:
+        return bill_data
+    customer = db.get_customer_by_number(customer_id)
+    if customer:
+        bill_data["current_charges"] = customer["current_bill"]
+        bill_data["payment_due"] = customer["due_date"]
+    usage = summarise_usage(db.get_meter_readings(customer_id), period_days=USAGE_PERIOD_DAYS)
+    if usage:
+        bill_data.update(usage, usage_available=True)
+    return bill_data
+
 def bill_explorer_agent(state: AgentState) -> AgentState:
     messages = state["messages"]
     files = state.get("uploaded_files", [])
@@ -29,17 +58,25 @@ def bill_explorer_agent(state: AgentState) -> AgentState:
     
     if files:
         messages.append(f"Bill Explorer: Processing {len(files)} uploaded file(s) for bill analysis...")
-        bill_data = {"parsed_from_file": True, "files_processed": len(files)}
+        bills = analyse_bills(files)
+        bill_data = {"parsed_from_file": True, "files_processed": len(files), "bills": bills}
+        for bill in bills:
+            if bill.get("summary"):
+                messages.append(f"Bill Explorer: {bill['summary']}")
     else:
-        bill_data = {
-            "account_id": state.get("customer_id"),
-            "current_charges": 245.67,
-            "usage_kwh": 892,
-            "plan_type": "Standard Residential",
-            "billing_period": "Sept 15 - Oct 15",
-            "previous_balance": 0.00,
-            "payment_due": "Nov 1, 2025"
-        }
+        bill_data = get_bill_data(state.get("customer_id"))
+        if bill_data["usage_available"]:
+            change = bill_data["usage_change_pct"]
+            if change:
+                trend = f", {'up' if change > 0 else 'down'} {abs(change)}% on the previous period"
+            else:
+                trend = "" if change is None else ", unchanged from the previous period"
+            messages.append(f"Bill Explorer: You used {bill_data['usage_kwh']} kWh over {bill_data['billing_period']}{trend}.")
+            if bill_data["anomalies"]:
+                days = ", ".join(a["date"] for a in bill_data["anomalies"])
+                messages.append(f"Bill Explorer: Unusually high or low usage on {days}.")
+        else:
+            messages.append("Bill Explorer: No meter readings found for this account.")
     messages.append("Bill Explorer: Bill analysis complete.")
     return {**state, "messages": messages, "bill_data": bill_data, "resolution_status": "bill_explained", "required_user_input": False, "input_needed": None}
 
@@ -48,10 +85,11 @@ def route_to_agent(state: AgentState) -> str:
 
 def create_customer_service_graph():
     workflow = StateGraph(AgentState)
-    workflow.add_node("supervisor", supervisor_agent)
-    workflow.add_node("bill_explorer", bill_explorer_agent)
-    workflow.add_node("switch_agent", switch_agent)
-    workflow.add_node("brand_new_agent", brand_new_agent)
+    # Each node is timed as agent_node_seconds{node="..."}
+    workflow.add_node("supervisor", timed_node("supervisor", supervisor_agent))
+    workflow.add_node("bill_explorer", timed_node("bill_explorer", bill_explorer_agent))
+    workflow.add_node("switch_agent", timed_node("switch_agent", switch_agent))
+    workflow.add_node("brand_new_agent", timed_node("brand_new_agent", brand_new_agent))
     workflow.set_entry_point("supervisor")
     workflow.add_conditional_edges(
         "supervisor",
@@ -73,8 +111,20 @@ class ChatRequest(BaseModel):
     customer_type: str = "existing"
     start_at: Optional[str] = None
 
-app = FastAPI(title="Energy Chatbot API")
-checkpointer = MemorySaver()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await address_client.start()
+    if os.getenv('LLM_WARM_UP', 'true').lower() == 'true':
+        # Load botocore's models off the first request's latency
+        asyncio.get_running_loop().run_in_executor(None, warm_up)
+    yield
+    await address_client.close()
+    bill_extractor.shutdown()
+    checkpointer.close()
+
+app = FastAPI(title="Energy Chatbot API", lifespan=lifespan)
+app.add_middleware(UploadLimitMiddleware)
+checkpointer = SQLiteCheckpointSaver()
 graph = create_customer_service_graph()
 
 @app.post("/threads/{thread_id}/chat")
@@ -86,8 +136,8 @@ async def chat_endpoint(
     files: List[UploadFile] = File(None),
     start_at: Optional[str] = Form(None)
 ):
-    # Process files using FileProcessor
-    processed_files = await process_files(files)
+    # Process files using FileProcessor; state only carries blob references
+    processed_files = await asyncio.to_thread(store_attachments, await process_files(files))
     
     config = {"configurable": {"thread_id": thread_id}}
     
@@ -128,9 +178,9 @@ async def chat_endpoint(
     
     # Direct invocation to specific agent if start_at is provided
     if start_at:
-        result = graph.invoke(current_state, config, start_at=start_at)
+        result = await graph.ainvoke(current_state, config, start_at=start_at)
     else:
-        result = graph.invoke(current_state, config)
+        result = await graph.ainvoke(current_state, config)
     
     return {
         "messages": result["messages"],
@@ -155,11 +205,16 @@ async def get_messages(thread_id: str):
 
 @app.delete("/threads/{thread_id}")
 async def delete_thread(thread_id: str):
+    await checkpointer.adelete_thread(thread_id)
     return {"status": "success", "message": f"Thread {thread_id} cleared"}
 
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics")
+async def metrics():
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
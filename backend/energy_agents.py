@@ -3,6 +3,8 @@ import re
 import os
 from typing import Dict, List, Optional
 from database import EnergyDatabase
+from utils.address_coverage import check_address
+from utils.intent_classifier import routing_classifier, mentions_address
 
 try:
     from langchain_aws import ChatBedrock
@@ -24,16 +26,10 @@ class EnergyAgentSystem:
         
     def check_address_availability(self, address: str) -> str:
         """Check if energy services are available at the given address"""
-        try:
-            is_available = self.db.check_address_coverage(address)
-            if is_available:
-                return f"Energy services are available at {address}"
-            return f"Energy services may not be available at {address}. Please contact support."
-        except Exception as e:
-            # Fallback check
-            if any(suburb in address.lower() for suburb in ['sydney', 'melbourne', 'brisbane', 'perth', 'adelaide']):
-                return f"Energy services are available at {address}"
-            return f"Energy services may not be available at {address}. Please contact support."
+        coverage = check_address(address)
+        if coverage['available']:
+            return f"Energy services are available at {address} ({coverage['distributor']} network)"
+        return f"Energy services may not be available at {address}. Please contact support."
     
     def get_customer_data(self, customer_number: str) -> str:
         """Retrieve customer data from energy database"""
@@ -61,6 +57,13 @@ class EnergyAgentSystem:
     def supervisor_agent(self, query: str) -> Dict:
         """Analyzes query and routes to appropriate agent"""
         try:
+            intent = routing_classifier.classify(query)
+            if intent.confident():
+                if intent.intent == "CURRENT_CUSTOMER":
+                    return {"agent": "CURRENT_CUSTOMER", "reasoning": "Query about billing/account"}
+                if intent.intent == "NEW_CUSTOMER":
+                    return {"agent": "NEW_CUSTOMER", "reasoning": "New customer inquiry"}
+            
             if self.use_bedrock:
                 try:
                     system_prompt = """You are a Supervisor Agent for an energy retailer. 
@@ -81,7 +84,7 @@ class EnergyAgentSystem:
                     print(f"Bedrock error: {e}")
             
             # Fallback routing logic
-            if any(word in query.lower() for word in ['bill', 'account', 'payment', 'usage', 'customer number']):
+            if routing_classifier.matches(query, "CURRENT_CUSTOMER"):
                 return {"agent": "CURRENT_CUSTOMER", "reasoning": "Query about billing/account"}
             return {"agent": "NEW_CUSTOMER", "reasoning": "New customer inquiry"}
         except Exception as e:
@@ -171,7 +174,7 @@ class EnergyAgentSystem:
                         customer_number = customer_match.group()
                 
                 # Look for address patterns
-                if any(word in content.lower() for word in ['street', 'st', 'road', 'rd', 'avenue', 'ave']):
+                if mentions_address(content):
                     address = content
         
         return {'customer_number': customer_number, 'address': address}
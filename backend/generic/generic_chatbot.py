@@ -1,13 +1,15 @@
-from langchain_aws import ChatBedrockConverse
 from langgraph.prebuilt import create_react_agent
-from langgraph.checkpoint.memory import MemorySaver
-from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.messages import HumanMessage, AIMessage, AIMessageChunk
 import uvicorn
 from fastapi import FastAPI, File, UploadFile, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response, StreamingResponse
+import asyncio
 import json
 import base64
+from contextlib import asynccontextmanager
+import os
+import time
 from typing import Dict, List, Optional, Any
 from enum import Enum
 import logging
@@ -16,22 +18,43 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-from utils.file_processor import process_files
+from utils.checkpointer import SQLiteCheckpointSaver
+from utils.file_processor import UploadLimitMiddleware, process_files
+from utils.history_manager import HistoryManager
+from utils.llm_clients import get_chat_model
+from utils.metrics import METRICS_CONTENT_TYPE, render_metrics
+from utils.sse import SSE_HEADERS, sse_event, chunk_text, with_heartbeats
 
+SSE_HEARTBEAT_SECONDS = float(os.getenv('SSE_HEARTBEAT_SECONDS', '15'))
 
-# Initialize LLM with ChatBedrockConverse
-llm = ChatBedrockConverse(
-    model="us.anthropic.claude-sonnet-4-20250514-v1:0",
-    region_name="us-east-1",
-)
 
-# Use LangGraph's built-in checkpointer for state persistence
-checkpointer = MemorySaver()
+# File-backed checkpointer: bounded per-thread history, idle threads pruned
+checkpointer = SQLiteCheckpointSaver()
+
+# Keep each turn's prompt within a token budget however long the thread runs
+history_manager = HistoryManager()
+
+_agent = None
+
+def get_agent():
+    """Agent with checkpointer, built on first use over the shared Bedrock clients"""
+    global _agent
+    if _agent is None:
+        _agent = create_react_agent(get_chat_model(), tools=[], checkpointer=checkpointer,
+                                    prompt=history_manager.prepare)
+    return _agent
 
-# Create agent with checkpointer
-agent = create_react_agent(llm, tools=[], checkpointer=checkpointer)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if os.getenv('LLM_WARM_UP', 'true').lower() == 'true':
+        # Build the agent and its Bedrock clients before the first request needs them
+        asyncio.get_running_loop().run_in_executor(None, get_agent)
+    yield
 
-app = FastAPI(title="LangGraph Chat API")
+app = FastAPI(title="LangGraph Chat API", lifespan=lifespan)
+
+# Registered before CORS so its rejections still carry CORS headers
+app.add_middleware(UploadLimitMiddleware)
 
 # Add CORS middleware
 app.add_middleware(
@@ -50,9 +73,16 @@ app.add_middleware(
 async def create_run_stream(
     thread_id: str, 
     message: str = Form(...),
-    files: Optional[List[UploadFile]] = File(None)
+    files: Optional[List[UploadFile]] = File(None),
+    stream_mode: str = Form("values")
 ):
-    """Stream agent response with file support"""
+    """Stream agent response with file support.
+    
+    stream_mode "values" sends each completed assistant message; "messages"
+    sends token deltas followed by a usage/latency summary event.
+    """
+    if stream_mode not in ("values", "messages"):
+        raise HTTPException(400, f"Unsupported stream_mode: {stream_mode}")
     try:
         # Build message content
         message_content = [{"type": "text", "text": message}]
@@ -67,27 +97,62 @@ async def create_run_stream(
         # Stream agent response using LangGraph checkpointer
         config = {"configurable": {"thread_id": thread_id}}
         
+        async def generate_values():
+            # Whole-message mode: one event per completed assistant message
+            async for event in get_agent().astream(
+                {"messages": [user_message]},
+                config=config,
+                stream_mode="values"
+            ):
+                # Get the latest message
+                if "messages" in event and event["messages"]:
+                    latest_message = event["messages"][-1]
+                    
+                    # Only stream assistant messages
+                    if isinstance(latest_message, AIMessage):
+                        response_data = {
+                            "type": "assistant",
+                            "content": latest_message.content,
+                            "content_type": "markdown",
+                            "message_type": "chunk"
+                        }
+                        yield f"data: {json.dumps(response_data)}\n\n"
+        
+        async def generate_deltas():
+            # Token mode: each event carries only the text generated since the last one
+            started = time.perf_counter()
+            first_token_at = None
+            usage = {"input_tokens": 0, "output_tokens": 0}
+            deltas = 0
+            async for chunk, _ in get_agent().astream(
+                {"messages": [user_message]},
+                config=config,
+                stream_mode="messages"
+            ):
+                if not isinstance(chunk, AIMessageChunk):
+                    continue
+                if chunk.usage_metadata:
+                    usage["input_tokens"] += chunk.usage_metadata.get("input_tokens", 0)
+                    usage["output_tokens"] += chunk.usage_metadata.get("output_tokens", 0)
+                text = chunk_text(chunk.content)
+                if text:
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    deltas += 1
+                    yield sse_event({"type": "delta", "content": text, "content_type": "markdown"})
+            yield sse_event({
+                "type": "summary",
+                "usage": usage,
+                "deltas": deltas,
+                "time_to_first_token_ms": round((first_token_at - started) * 1000, 1) if first_token_at else None,
+                "latency_ms": round((time.perf_counter() - started) * 1000, 1)
+            })
+        
         async def generate():
+            events = generate_deltas() if stream_mode == "messages" else generate_values()
             try:
-                # Use astream for true streaming
-                async for event in agent.astream(
-                    {"messages": [user_message]},
-                    config=config,
-                    stream_mode="values"
-                ):
-                    # Get the latest message
-                    if "messages" in event and event["messages"]:
-                        latest_message = event["messages"][-1]
-                        
-                        # Only stream assistant messages
-                        if isinstance(latest_message, AIMessage):
-                            response_data = {
-                                "type": "assistant",
-                                "content": latest_message.content,
-                                "content_type": "markdown",
-                                "message_type": "chunk"
-                            }
-                            yield f"data: {json.dumps(response_data)}\n\n"
+                async for event in with_heartbeats(events, SSE_HEARTBEAT_SECONDS):
+                    yield event
                 
                 yield "data: [DONE]\n\n"
                 
@@ -96,14 +161,7 @@ async def create_run_stream(
                 error_data = {"error": str(e)}
                 yield f"data: {json.dumps(error_data)}\n\n"
         
-        return StreamingResponse(
-            generate(),
-            media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-            }
-        )
+        return StreamingResponse(generate(), media_type="text/event-stream", headers=SSE_HEADERS)
         
     except HTTPException:
         raise
@@ -117,7 +175,7 @@ async def get_messages(thread_id: str):
     """Get conversation history from checkpointer"""
     try:
         config = {"configurable": {"thread_id": thread_id}}
-        state = agent.get_state(config)
+        state = get_agent().get_state(config)
         
         # Extract messages from state
         messages = []
@@ -140,7 +198,7 @@ async def get_thread_state(thread_id: str):
     """Get full thread state from checkpointer"""
     try:
         config = {"configurable": {"thread_id": thread_id}}
-        state = agent.get_state(config)
+        state = get_agent().get_state(config)
         
         return {"values": state.values if state else {}}
         
@@ -152,10 +210,13 @@ async def get_thread_state(thread_id: str):
 @app.delete("/threads/{thread_id}")
 async def delete_thread(thread_id: str):
     """Delete a thread (clear checkpointer state)"""
-    # Note: MemorySaver doesn't have built-in delete, but you can implement
-    # For production, use PostgresSaver or RedisSaver with delete support
+    await checkpointer.adelete_thread(thread_id)
     return {"status": "success", "message": f"Thread {thread_id} cleared"}
 
+@app.get("/metrics")
+async def metrics():
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
 
 
 
@@ -1,5 +1,6 @@
 import json
 from typing import Dict, Optional
+from utils.intent_classifier import routing_classifier, mentions_address
 
 class MockEnergyAgentSystem:
     def __init__(self):
@@ -7,7 +8,7 @@ class MockEnergyAgentSystem:
     
     def supervisor_agent(self, query: str) -> Dict:
         """Mock supervisor agent routing"""
-        if any(word in query.lower() for word in ['bill', 'account', 'payment', 'usage']):
+        if routing_classifier.matches(query, "CURRENT_CUSTOMER"):
             return {"agent": "CURRENT_CUSTOMER", "reasoning": "Query about billing/account"}
         return {"agent": "NEW_CUSTOMER", "reasoning": "New customer inquiry"}
     
@@ -41,7 +42,7 @@ class MockEnergyAgentSystem:
                         match = re.search(r'\b\d{4,6}\b', content)
                         if match:
                             customer_number = match.group()
-                    if any(word in content.lower() for word in ['street', 'st', 'road', 'rd']):
+                    if mentions_address(content):
                         address = content
         
         routing = self.supervisor_agent(query)
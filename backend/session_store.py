@@ -0,0 +1,89 @@
+import os
+import sqlite3
+import threading
+from typing import Dict, Optional, Tuple
+
+class SessionStore:
+    """Storage tier behind ContextManager.
+
+    Records are (last_updated_timestamp, serialised_context) pairs keyed by
+    session id. Non-persistent stores keep nothing beyond ContextManager's own
+    in-memory dict, so the manager skips serialisation for them entirely.
+    """
+    persistent = False
+
+    def load(self, session_id: str) -> Optional[bytes]:
+        return None
+
+    def save_many(self, records: Dict[str, Tuple[float, bytes]]):
+        pass
+
+    def delete(self, session_id: str):
+        pass
+
+    def purge_expired(self, cutoff: float) -> int:
+        return 0
+
+    def close(self):
+        pass
+
+class InMemorySessionStore(SessionStore):
+    """Sessions live only in the worker's ContextManager dict (single worker)"""
+
+class SQLiteSessionStore(SessionStore):
+    """Durable local store shared by every worker process on the host"""
+    persistent = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                last_updated REAL NOT NULL,
+                payload BLOB NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_last_updated_idx ON sessions (last_updated)")
+
+    def load(self, session_id: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute("SELECT payload FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return row[0] if row else None
+
+    def save_many(self, records: Dict[str, Tuple[float, bytes]]):
+        if not records:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            # Never let a worker overwrite a newer copy written by another worker
+            self._conn.executemany("""
+                INSERT INTO sessions (session_id, last_updated, payload) VALUES (?, ?, ?)
+                ON CONFLICT(session_id) DO UPDATE SET last_updated = excluded.last_updated, payload = excluded.payload
+                WHERE excluded.last_updated >= sessions.last_updated
+            """, [(session_id, updated, payload) for session_id, (updated, payload) in records.items()])
+            self._conn.execute("COMMIT")
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def purge_expired(self, cutoff: float) -> int:
+        with self._lock:
+            return self._conn.execute("DELETE FROM sessions WHERE last_updated < ?", (cutoff,)).rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def create_session_store() -> SessionStore:
+    """Pick the backend from SESSION_STORE ('memory' or 'sqlite')"""
+    backend = os.getenv('SESSION_STORE', 'memory').lower()
+    if backend == 'sqlite':
+        return SQLiteSessionStore(os.getenv('SESSION_DB_PATH', 'sessions.db'))
+    if backend != 'memory':
+        raise ValueError(f"Unknown SESSION_STORE: {backend}")
+    return InMemorySessionStore()
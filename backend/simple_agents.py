@@ -1,13 +1,14 @@
 from typing import Dict, Optional
+from utils.intent_classifier import routing_classifier
 
 class SimpleEnergyAgentSystem:
     def process_query(self, query: str, conversation_history: Optional[list] = None) -> Dict:
         """Simple agent system without external dependencies"""
         try:
-            query_lower = query.lower()
+            intent = routing_classifier.classify(query).intent
             
             # Simple greeting
-            if any(word in query_lower for word in ['hi', 'hello', 'hey']):
+            if intent == "GREETING":
                 return {
                     "response": "Hello! I'm your Energy Assistant. I can help with account questions, bills, and new connections. How can I assist you today?",
                     "agent_used": "GREETING",
@@ -15,7 +16,7 @@ class SimpleEnergyAgentSystem:
                 }
             
             # Current customer queries
-            if any(word in query_lower for word in ['bill', 'account', 'payment', 'usage']):
+            if intent == "CURRENT_CUSTOMER":
                 return {
                     "response": "I can help with your energy bill and account. Please provide your customer number so I can access your account information.",
                     "agent_used": "CURRENT_CUSTOMER", 
@@ -0,0 +1,79 @@
+import asyncio
+from pathlib import Path
+
+from utils.address_client import ADDRESS_SERVER_PATH, AddressClient
+from utils.address_coverage import check_address
+
+SYDNEY = "1 George St Sydney NSW 2000"
+MELBOURNE = "10 Collins St Melbourne VIC 3000"
+
+def run_with_client(scenario, **kwargs):
+    async def run():
+        client = AddressClient(**kwargs)
+        await client.start()
+        try:
+            return await scenario(client)
+        finally:
+            await client.close()
+    return asyncio.run(run())
+
+def test_server_answers_and_caches():
+    async def scenario(client):
+        first = await client.check_address(SYDNEY)
+        again = await client.check_address("1 george st, SYDNEY nsw 2000")
+        return first, again, client.stats()
+
+    first, again, stats = run_with_client(scenario, pool_size=1)
+    assert first == check_address(SYDNEY)
+    assert again is first
+    assert stats["local_fallbacks"] == 0
+    assert (stats["cache"]["hits"], stats["cache"]["misses"]) == (1, 1)
+
+def test_batch_only_sends_misses():
+    async def scenario(client):
+        await client.check_address(SYDNEY)
+        return await client.check_addresses([MELBOURNE, SYDNEY, "nowhere at all"]), client.stats()
+
+    results, stats = run_with_client(scenario, pool_size=1)
+    assert results == [check_address(a) for a in (MELBOURNE, SYDNEY, "nowhere at all")]
+    assert stats["local_fallbacks"] == 0
+    assert stats["cache"]["hits"] == 1
+
+def test_missing_server_falls_back_locally(tmp_path):
+    async def scenario(client):
+        return await client.check_addresses([SYDNEY, MELBOURNE]), client.stats()
+
+    broken = tmp_path / "server.py"
+    broken.write_text("import sys; sys.exit(1)\n")
+    results, stats = run_with_client(scenario, pool_size=1, server_path=str(broken), timeout=1)
+    assert results == [check_address(SYDNEY), check_address(MELBOURNE)]
+    assert stats["local_fallbacks"] == 2
+
+def test_no_server_script_means_no_workers(tmp_path):
+    async def scenario(client):
+        return client.workers, await client.check_address(SYDNEY), client.stats()
+
+    workers, result, stats = run_with_client(scenario, server_path=str(tmp_path / "missing.py"))
+    assert workers == []
+    assert result == check_address(SYDNEY)
+    assert (stats["restarts"], stats["local_fallbacks"]) == (0, 1)
+
+def test_dead_worker_is_restarted():
+    async def scenario(client):
+        client.workers[0].process.kill()
+        await client.workers[0].process.wait()
+        await asyncio.sleep(0.05)
+        result = await client.check_address(SYDNEY)
+        return result, client.stats()
+
+    result, stats = run_with_client(scenario, pool_size=1)
+    assert result == check_address(SYDNEY)
+    assert stats["restarts"] == 1
+    assert stats["alive"] == 1
+    assert stats["local_fallbacks"] == 0
+
+def test_sync_check_without_a_loop():
+    assert AddressClient().check_address_sync(SYDNEY) == check_address(SYDNEY)
+
+def test_default_server_path_exists():
+    assert Path(ADDRESS_SERVER_PATH).is_file()
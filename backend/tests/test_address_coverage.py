@@ -0,0 +1,41 @@
+import pytest
+
+from utils.address_coverage import check_address, get_engine, tokenize
+
+@pytest.mark.parametrize("address, suburb, state, postcode", [
+    ("12 George St, Sydney NSW 2000", "Sydney", "NSW", "2000"),
+    ("3 Collins St Melbourne VIC 3000", "Melbourne", "VIC", "3000"),
+    ("5 Smith Road Parramatta 2150", "Parramatta", "NSW", "2150"),
+    ("Perth 6000 WA", "Perth", "WA", "6000"),
+    ("Mt Colah new south wales", "Mount Colah", "NSW", "2079"),
+])
+def test_locates_suburb(address, suburb, state, postcode):
+    result = check_address(address)
+    assert result["available"]
+    assert (result["suburb"], result["state"], result["postcode"]) == (suburb, state, postcode)
+
+@pytest.mark.parametrize("address", ["1200 Main Rd, Perth", "4000 Stirling Hwy Perth"])
+def test_street_number_is_not_a_postcode(address):
+    result = check_address(address)
+    assert (result["suburb"], result["state"]) == ("Perth", "WA")
+
+def test_postcode_alone_resolves_locality():
+    result = check_address("2000")
+    assert (result["suburb"], result["state"]) == ("Sydney", "NSW")
+
+def test_uncovered_state_is_unavailable():
+    assert not check_address("Hobart TAS 7000")["available"]
+
+def test_unknown_address_is_unavailable():
+    assert not check_address("somewhere nobody has heard of")["available"]
+
+def test_complete_prefix():
+    names = [locality.suburb for locality in get_engine().complete("parra")]
+    assert "Parramatta" in names
+
+def test_postcode_range():
+    assert get_engine().postcode_range("2000")[0] == "NSW"
+    assert get_engine().postcode_range("0001") is None
+
+def test_tokenize():
+    assert tokenize("12 George St., Sydney") == ["12", "george", "st", "sydney"]
@@ -0,0 +1,97 @@
+import asyncio
+import importlib.util
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+SERVER_PATH = Path(__file__).resolve().parents[2] / "mcp-server" / "address_server.py"
+spec = importlib.util.spec_from_file_location("address_server", SERVER_PATH)
+address_server = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(address_server)
+
+@pytest.fixture(scope="module")
+def server():
+    return address_server.AddressServer()
+
+def handle(server, payload):
+    line = payload if isinstance(payload, str) else json.dumps(payload)
+    return asyncio.run(server.handle_line(line))
+
+def rpc(method, params=None, request_id=1):
+    request = {"jsonrpc": "2.0", "method": method, "id": request_id}
+    if params is not None:
+        request["params"] = params
+    return request
+
+def test_check_address(server):
+    response = handle(server, rpc("check_address", {"address": "1 George St Sydney NSW 2000"}))
+    assert response["id"] == 1
+    assert response["result"]["available"]
+
+def test_check_addresses_keeps_order(server):
+    addresses = ["1 George St Sydney", "10 Collins St Melbourne VIC 3000", "nowhere"]
+    response = handle(server, rpc("check_addresses", {"addresses": addresses}))
+    results = response["result"]["results"]
+    assert len(results) == 3
+    assert results[0] == server.check_address(addresses[0])
+    assert results[2] == server.check_address(addresses[2])
+
+@pytest.mark.parametrize("payload, code", [
+    ("{not json", address_server.PARSE_ERROR),
+    ([], address_server.INVALID_REQUEST),
+    ({"jsonrpc": "1.0", "method": "check_address", "id": 1}, address_server.INVALID_REQUEST),
+    ({"jsonrpc": "2.0", "id": 1}, address_server.INVALID_REQUEST),
+    (rpc("unknown"), address_server.METHOD_NOT_FOUND),
+    (rpc("check_address", {"address": 42}), address_server.INVALID_PARAMS),
+    (rpc("check_address", ["1 George St"]), address_server.INVALID_PARAMS),
+    (rpc("check_addresses", {"addresses": "1 George St"}), address_server.INVALID_PARAMS),
+    (rpc("suggest_suburbs", {"prefix": "par", "limit": "many"}), address_server.INVALID_PARAMS),
+    (rpc("suggest_suburbs", {"prefix": "par", "limit": None}), address_server.INVALID_PARAMS),
+    (rpc("suggest_suburbs", {"prefix": "par", "limit": 0}), address_server.INVALID_PARAMS),
+    (rpc("suggest_suburbs", {"prefix": "par", "limit": 2.5}), address_server.INVALID_PARAMS),
+])
+def test_error_codes(server, payload, code):
+    response = handle(server, payload)
+    assert response["jsonrpc"] == "2.0"
+    assert response["error"]["code"] == code
+
+def test_suggestion_limit_is_clamped(server, monkeypatch):
+    monkeypatch.setattr(address_server, "MAX_SUGGESTIONS", 2)
+    response = handle(server, rpc("suggest_suburbs", {"prefix": "s", "limit": 1000}))
+    assert len(response["result"]["suburbs"]) == 2
+
+def test_batch_too_large(server, monkeypatch):
+    monkeypatch.setattr(address_server, "MAX_BATCH_ADDRESSES", 2)
+    response = handle(server, rpc("check_addresses", {"addresses": ["a", "b", "c"]}))
+    assert response["error"]["code"] == address_server.INVALID_PARAMS
+
+def test_batch_drops_notifications(server):
+    batch = [
+        rpc("check_address", {"address": "1 George St Sydney"}, request_id="a"),
+        {"jsonrpc": "2.0", "method": "check_address", "params": {"address": "x"}},
+        rpc("unknown", request_id="b"),
+        "not a request",
+    ]
+    responses = handle(server, batch)
+    assert [r["id"] for r in responses] == ["a", "b", None]
+    assert "result" in responses[0]
+    assert responses[1]["error"]["code"] == address_server.METHOD_NOT_FOUND
+    assert responses[2]["error"]["code"] == address_server.INVALID_REQUEST
+
+def test_notification_only_batch_has_no_reply(server):
+    assert handle(server, [{"jsonrpc": "2.0", "method": "check_address", "params": {"address": "x"}}]) is None
+
+def test_legacy_requests(server):
+    response = handle(server, {"method": "suggest_suburbs", "params": {"prefix": "parra", "limit": 3}})
+    assert any(s["suburb"] == "Parramatta" for s in response["suburbs"])
+    assert handle(server, {"method": "nope"}) == {"error": "Unknown method"}
+
+def test_stdio_round_trip():
+    lines = [json.dumps(rpc("check_address", {"address": "1 George St Sydney"}, request_id=i)) for i in range(3)]
+    completed = subprocess.run([sys.executable, str(SERVER_PATH)], input="\n".join(lines) + "\n",
+                               capture_output=True, text=True, timeout=60)
+    replies = [json.loads(line) for line in completed.stdout.splitlines()]
+    assert sorted(r["id"] for r in replies) == [0, 1, 2]
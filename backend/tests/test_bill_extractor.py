@@ -0,0 +1,79 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+from utils import bill_extractor
+from utils.bill_extractor import extract_bill, parse_bill_text
+
+DATA_DIR = Path(__file__).resolve().parents[2] / "data" / "energy"
+
+@pytest.mark.parametrize("filename, retailer, start, end, usage, amount, days", [
+    ("Origin Standing Bill Example.pdf", "Origin Energy", "2015-07-14", "2015-10-14", 2584.0, 325.09, 93),
+    ("TangoBill.pdf", "Tango Energy", "2023-06-01", "2023-07-19", 1838.27, 169.46, 49),
+])
+def test_sample_bills(filename, retailer, start, end, usage, amount, days):
+    pytest.importorskip("pypdf")
+    bill = extract_bill((DATA_DIR / filename).read_bytes())
+    assert bill["retailer"] == retailer
+    assert (bill["billing_period_start"], bill["billing_period_end"]) == (start, end)
+    assert bill["usage_kwh"] == usage
+    assert bill["amount_due"] == amount
+    assert f"({days} days)" in bill["summary"]
+
+def test_tango_time_of_use_and_feed_in():
+    pytest.importorskip("pypdf")
+    bill = extract_bill((DATA_DIR / "TangoBill.pdf").read_bytes())
+    names = [tariff["name"] for tariff in bill["tariffs"]]
+    assert names == ["Peak", "Shoulder", "Off Peak", "Solar feed-in"]
+    assert bill["tariffs"][-1]["rate"] < 0
+
+def test_parse_text_layout():
+    text = "\n".join([
+        "AGL",
+        "Billing period: 01 Jan 2024 to 31 Mar 2024",
+        "Peak 1,200.5 kWh 30.25c/kWh $363.15",
+        "Off Peak 800 kWh 18c/kWh $144.00",
+        "Supply charge 95.7c/day",
+        "Solar 150 kWh -5c/kWh -$7.50",
+        "Total amount due $600.00",
+        "Due date: 21 Apr 24",
+    ])
+    record = parse_bill_text(text)
+    assert record.retailer == "AGL"
+    assert record.billing_period_start == date(2024, 1, 1)
+    assert record.billing_period_end == date(2024, 3, 31)
+    assert record.usage_kwh == 2000.5
+    assert [(t.name, t.rate) for t in record.tariffs] == [
+        ("Peak", 0.3025), ("Off Peak", 0.18), ("Solar feed-in", -0.05)]
+    assert record.supply_charge == 0.957
+    assert record.amount_due == 600.0
+    assert record.due_date == date(2024, 4, 21)
+    assert record.complete
+
+def test_incomplete_text_is_not_a_bill():
+    assert not parse_bill_text("Origin Energy\nTotal amount due $12.00").complete
+
+def test_unreadable_pdf():
+    assert extract_bill(b"not a pdf") is None
+
+def test_concurrent_first_calls_share_one_pool(monkeypatch):
+    created = []
+
+    class SlowPool:
+        def __init__(self, max_workers):
+            time.sleep(0.05)
+            created.append(self)
+
+        def shutdown(self, cancel_futures=False):
+            pass
+
+    monkeypatch.setattr(bill_extractor, "ProcessPoolExecutor", SlowPool)
+    monkeypatch.setattr(bill_extractor, "_executor", None)
+    with ThreadPoolExecutor(max_workers=8) as threads:
+        pools = list(threads.map(lambda _: bill_extractor.extractor_pool(), range(8)))
+    assert len(created) == 1
+    assert all(pool is created[0] for pool in pools)
+    bill_extractor.shutdown()
@@ -0,0 +1,64 @@
+import pytest
+
+from utils import cache as cache_module
+from utils.cache import TTLCache
+from utils.routing import RoutingCache, normalise_query
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    return now
+
+def test_hit_and_miss_counts():
+    cache = TTLCache()
+    assert cache.get("a", "default") == "default"
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.stats()["hit_rate"] == 0.5
+
+def test_lru_eviction_spares_recently_read():
+    cache = TTLCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.evictions == 1
+    assert len(cache) == 2
+
+def test_entries_expire(clock):
+    cache = TTLCache(ttl_seconds=10)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl_seconds=60)
+    clock[0] += 10
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert cache.expirations == 1
+    assert len(cache) == 1
+
+def test_invalidate_and_clear():
+    cache = TTLCache()
+    cache.set("a", 1)
+    assert cache.invalidate("a")
+    assert not cache.invalidate("a")
+    cache.set("b", 2)
+    cache.clear()
+    assert len(cache) == 0
+
+@pytest.mark.parametrize("query, expected", [
+    ("User: What's my BILL?", "what s my bill"),
+    ("  is 12 George St covered ", "is # george st covered"),
+    ("account 123!!", "account #"),
+])
+def test_normalise_query(query, expected):
+    assert normalise_query(query) == expected
+
+def test_routing_cache_keys_on_query_and_flags():
+    cache = RoutingCache(max_size=8, ttl_seconds=60)
+    cache.store("What's my bill?", "CURRENT", has_customer=True)
+    assert cache.lookup("what's my bill", has_customer=True) == "CURRENT"
+    assert cache.lookup("What's my bill?", has_customer=False) is None
+    assert cache.lookup("What's my bill?") is None
@@ -0,0 +1,90 @@
+import asyncio
+import json
+import types
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app
+
+class FakeModel:
+    def __init__(self, words, fail_after=None):
+        self.words = words
+        self.fail_after = fail_after
+        self.closed = False
+
+    def astream(self, messages):
+        async def chunks():
+            try:
+                for i, word in enumerate(self.words):
+                    if i == self.fail_after:
+                        raise RuntimeError("throttled")
+                    yield types.SimpleNamespace(content=word)
+            finally:
+                self.closed = True
+        return chunks()
+
+@pytest.fixture
+def model(monkeypatch):
+    def use(*args, **kwargs):
+        fake = FakeModel(*args, **kwargs)
+        monkeypatch.setattr(app, "llm_enabled", True)
+        monkeypatch.setattr(app, "LLM_WARM_UP", False)
+        monkeypatch.setattr(app, "chat_model", lambda: fake)
+        return fake
+    return use
+
+def events(body):
+    return [json.loads(line[len("data: "):]) for line in body.splitlines()
+            if line.startswith("data: {")]
+
+def collect(messages, fallback):
+    async def run():
+        return [text async for text in app.stream_completion(messages, fallback)]
+    return asyncio.run(run())
+
+def test_stream_releases_model_slot_before_the_reader_finishes(model):
+    fake = model(["Hel", "lo"])
+
+    async def run():
+        stream = app.stream_completion(["prompt"], "fallback")
+        first = await stream.__anext__()
+        await asyncio.sleep(0.01)
+        slot_free = app.llm_semaphore._value == app.LLM_MAX_CONCURRENCY
+        rest = [text async for text in stream]
+        return first, slot_free, rest
+
+    first, slot_free, rest = asyncio.run(run())
+    assert (first, rest) == ("Hel", ["lo"])
+    assert slot_free and fake.closed
+
+def test_failure_before_any_text_falls_back(model):
+    model(["Hel", "lo"], fail_after=0)
+    assert collect(["prompt"], "fallback") == ["fallback"]
+
+def test_failure_after_some_text_is_reported(model):
+    model(["Hel", "lo"], fail_after=1)
+    with pytest.raises(app.StreamTruncated):
+        collect(["prompt"], "fallback")
+
+def test_truncated_reply_is_flagged_and_not_saved(model):
+    model(["Your ", "bill ", "is"], fail_after=2)
+    with TestClient(app.app) as client:
+        body = client.post("/chat/stream", json={"query": "I want to switch providers"}).text
+    received = events(body)
+    error = next(e for e in received if e["type"] == "error")
+    done = received[-1]
+    assert error["truncated"]
+    assert done["type"] == "done" and done["truncated"]
+    assert done["response"] == "Your bill "
+    context = app.context_manager.get_context(done["session_id"])
+    assert [m["type"] for m in context.conversation_history] == ["user"]
+
+def test_complete_reply_is_saved(model):
+    model(["Happy ", "to help"])
+    with TestClient(app.app) as client:
+        body = client.post("/chat/stream", json={"query": "I want to switch providers"}).text
+    done = events(body)[-1]
+    assert done["response"] == "Happy to help" and not done["truncated"]
+    context = app.context_manager.get_context(done["session_id"])
+    assert context.conversation_history[-1]["content"] == "Happy to help"
@@ -0,0 +1,81 @@
+import asyncio
+import operator
+from typing import Annotated, List
+
+import pytest
+from typing_extensions import TypedDict
+from langgraph.graph import END, StateGraph
+
+from utils.checkpointer import SQLiteCheckpointSaver
+
+class State(TypedDict):
+    messages: Annotated[List[str], operator.add]
+
+def build_graph(checkpointer):
+    graph = StateGraph(State)
+    graph.add_node("echo", lambda state: {"messages": [f"echo {len(state['messages'])}"]})
+    graph.set_entry_point("echo")
+    graph.add_edge("echo", END)
+    return graph.compile(checkpointer=checkpointer)
+
+@pytest.fixture
+def saver(tmp_path):
+    saver = SQLiteCheckpointSaver(str(tmp_path / "checkpoints.db"), keep_last=3)
+    yield saver
+    saver.close()
+
+def config(thread_id):
+    return {"configurable": {"thread_id": thread_id}}
+
+def test_state_survives_reopening(tmp_path):
+    path = str(tmp_path / "checkpoints.db")
+    saver = SQLiteCheckpointSaver(path)
+    build_graph(saver).invoke({"messages": ["hi"]}, config("t1"))
+    saver.close()
+
+    reopened = SQLiteCheckpointSaver(path)
+    state = build_graph(reopened).get_state(config("t1"))
+    assert state.values["messages"] == ["hi", "echo 1"]
+    reopened.close()
+
+def test_only_last_checkpoints_are_kept(saver):
+    graph = build_graph(saver)
+    for i in range(5):
+        graph.invoke({"messages": [f"turn {i}"]}, config("t1"))
+    assert len(list(saver.list(config("t1")))) == 3
+    assert len(graph.get_state(config("t1")).values["messages"]) == 10
+
+def test_large_payloads_round_trip_compressed(saver):
+    graph = build_graph(saver)
+    graph.invoke({"messages": ["x" * 10000]}, config("t1"))
+    (type_,) = saver._conn.execute(
+        "SELECT type FROM checkpoints ORDER BY checkpoint_id DESC LIMIT 1").fetchone()
+    assert type_.endswith("+zlib")
+    assert graph.get_state(config("t1")).values["messages"][0] == "x" * 10000
+
+def test_delete_thread(saver):
+    graph = build_graph(saver)
+    graph.invoke({"messages": ["a"]}, config("t1"))
+    graph.invoke({"messages": ["b"]}, config("t2"))
+    saver.delete_thread("t1")
+    assert saver.get_tuple(config("t1")) is None
+    assert saver.get_tuple(config("t2")) is not None
+
+def test_idle_threads_are_pruned(saver):
+    graph = build_graph(saver)
+    graph.invoke({"messages": ["a"]}, config("idle"))
+    graph.invoke({"messages": ["b"]}, config("active"))
+    saver._conn.execute("UPDATE threads SET last_active = 0 WHERE thread_id = 'idle'")
+    assert saver.prune_idle_threads() == 1
+    assert saver.get_tuple(config("idle")) is None
+    assert saver.get_tuple(config("active")) is not None
+
+def test_async_api(saver):
+    async def run():
+        await build_graph(saver).ainvoke({"messages": ["hi"]}, config("t1"))
+        latest = await saver.aget_tuple(config("t1"))
+        return latest, [c async for c in saver.alist(config("t1"))]
+
+    latest, listed = asyncio.run(run())
+    assert latest.checkpoint["channel_values"]["messages"] == ["hi", "echo 1"]
+    assert listed[0].config == latest.config
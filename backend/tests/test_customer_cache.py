@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from database import EnergyDatabase
+
+CUSTOMER = {"customer_id": 1234, "name": "Jo Citizen", "address": "12 George St, Sydney NSW 2000",
+            "current_bill": 325.09, "due_date": "2024-07-23"}
+
+@pytest.fixture
+def db(monkeypatch):
+    db = EnergyDatabase()
+    calls = []
+
+    def fetch(customer_number):
+        calls.append(customer_number)
+        return dict(CUSTOMER) if customer_number == "1234" else None
+
+    monkeypatch.setattr(db, "_fetch_customer", fetch)
+    db.calls = calls
+    return db
+
+def test_read_through(db):
+    assert db.get_customer_by_number("1234") == CUSTOMER
+    assert db.get_customer_by_number(" 1234 ") == CUSTOMER
+    assert db.calls == ["1234"]
+    assert (db.customer_cache.hits, db.customer_cache.misses) == (1, 1)
+
+def test_returns_copies(db):
+    db.get_customer_by_number("1234")["name"] = "Changed"
+    assert db.get_customer_by_number("1234")["name"] == "Jo Citizen"
+
+def test_unknown_customer_is_negatively_cached(db):
+    assert db.get_customer_by_number("9999") is None
+    assert db.get_customer_by_number("9999") is None
+    assert db.calls == ["9999"]
+
+def test_errors_are_not_cached(db, monkeypatch):
+    monkeypatch.setattr(db, "_fetch_customer", lambda number: (_ for _ in ()).throw(RuntimeError("down")))
+    assert db.get_customer_by_number("1234") is None
+    assert len(db.customer_cache) == 0
+
+def test_invalidate_notifies_listeners(db):
+    invalidated = []
+    db.add_invalidation_listener(invalidated.append)
+    db.get_customer_by_number("1234")
+    db.invalidate_customer("1234")
+    db.get_customer_by_number("1234")
+    assert db.calls == ["1234", "1234"]
+    assert invalidated == ["1234"]
+
+def test_async_miss_is_counted_once(db):
+    assert asyncio.run(db.aget_customer_by_number("1234")) == CUSTOMER
+    assert asyncio.run(db.aget_customer_by_number("1234")) == CUSTOMER
+    assert db.calls == ["1234"]
+    assert (db.customer_cache.hits, db.customer_cache.misses) == (1, 1)
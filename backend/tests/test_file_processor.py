@@ -0,0 +1,39 @@
+from typing import List
+
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from utils.file_processor import UploadLimitMiddleware, process_files
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(UploadLimitMiddleware, max_size=1024)
+
+    @app.post("/upload")
+    async def upload(files: List[UploadFile] = File(...)):
+        return [block["type"] for block in await process_files(files)]
+
+    return TestClient(app)
+
+def test_small_upload_is_processed(client):
+    files = [("files", ("notes.txt", b"hello", "text/plain")),
+             ("files", ("snippet", b"hi", "application/octet-stream")),
+             ("files", ("photo.png", b"\x89PNG", "image/png"))]
+    response = client.post("/upload", files=files)
+    assert response.status_code == 200
+    assert response.json() == ["document", "text", "image"]
+
+def test_oversized_request_is_rejected_before_parsing(client):
+    response = client.post("/upload", files=[("files", ("big.txt", b"x" * 2048, "text/plain"))])
+    assert response.status_code == 413
+
+def test_multipart_without_length_is_rejected(client):
+    def body():
+        yield b"--b\r\nContent-Disposition: form-data; name=\"files\"; filename=\"a.txt\"\r\n\r\nhi\r\n--b--\r\n"
+    response = client.post("/upload", content=body(), headers={"content-type": "multipart/form-data; boundary=b"})
+    assert response.status_code == 411
+
+def test_other_bodies_pass_through(client):
+    assert client.post("/upload", json={"files": []}).status_code == 422
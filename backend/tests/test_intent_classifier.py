@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+import app
+from context_manager import ConversationContext
+from mock_agents import MockEnergyAgentSystem
+from utils.intent_classifier import (
+    IntentClassifier, graph_routing_classifier, mentions_address, routing_classifier
+)
+
+@pytest.mark.parametrize("query", ["What plan am I on?", "Is my account ok?", "Can I pay?", "Tell me about usage"])
+def test_single_keyword_is_not_confident(query):
+    match = routing_classifier.classify(query)
+    assert match.confidence == 0.5
+    assert not match.confident()
+
+def test_no_keywords():
+    match = routing_classifier.classify("What's the weather like?")
+    assert match.intent is None and match.confidence == 0.0
+    assert not match.confident()
+
+def test_agreeing_keywords_are_confident():
+    match = routing_classifier.classify("My bill has a charge I don't understand and the payment is overdue")
+    assert match.intent == "CURRENT_CUSTOMER"
+    assert match.confident()
+
+def test_conflicting_keywords_lower_confidence():
+    mixed = routing_classifier.classify("Should I switch plans or pay my bill?")
+    agreeing = routing_classifier.classify("Can I pay my bill and check my account?")
+    assert mixed.intent == agreeing.intent
+    assert mixed.confidence < agreeing.confidence
+
+def test_longest_phrase_wins():
+    match = graph_routing_classifier.classify("I need a new connection")
+    assert match.intent == "brand_new_agent"
+    assert match.matches == ("new connection",)
+
+def test_ties_go_to_first_intent():
+    classifier = IntentClassifier({"a": ["alpha"], "b": ["beta"]})
+    assert classifier.classify("beta alpha").intent == "a"
+
+def test_whole_words_only():
+    assert routing_classifier.classify("billabong").intent is None
+
+def test_mentions_address():
+    assert mentions_address("12 George St Sydney")
+    assert not mentions_address("my bill is high")
+
+@pytest.mark.parametrize("query", ["Hi, I need help with my account", "Hello, question about a payment",
+                                   "G'day, my bill is wrong"])
+def test_greeting_with_account_words_routes_to_current_customer(query, monkeypatch):
+    monkeypatch.setattr(app, "llm_enabled", False)
+    assert routing_classifier.matches(query, "CURRENT_CUSTOMER")
+    assert MockEnergyAgentSystem().supervisor_agent(query)["agent"] == "CURRENT_CUSTOMER"
+    routing = asyncio.run(app.supervisor_agent(query, ConversationContext("s1")))
+    assert routing["agent"] == "CURRENT_CUSTOMER"
+
+def test_greeting_alone_routes_to_new_customer():
+    assert MockEnergyAgentSystem().supervisor_agent("Hello there")["agent"] == "NEW_CUSTOMER"
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from utils.cache import TTLCache
+from utils.metrics import (
+    AGENT_NODE_ERRORS, AGENT_NODE_SECONDS, Counter, Gauge, Histogram, Registry, timed_node
+)
+
+@pytest.fixture
+def registry():
+    return Registry()
+
+def test_counter_and_gauge_render(registry):
+    requests = Counter("requests_total", "Requests served", ["path"], registry=registry)
+    requests.inc(path="/chat")
+    requests.inc(2, path='/say "hi"')
+    workers = Gauge("workers", "Live workers", registry=registry)
+    workers.set(4)
+    workers.dec()
+    assert registry.render().splitlines() == [
+        "# HELP requests_total Requests served",
+        "# TYPE requests_total counter",
+        'requests_total{path="/chat"} 1',
+        'requests_total{path="/say \\"hi\\""} 2',
+        "# HELP workers Live workers",
+        "# TYPE workers gauge",
+        "workers 3",
+    ]
+
+def test_histogram_buckets_are_cumulative(registry):
+    latency = Histogram("latency_seconds", "Latency", ["op"], buckets=(0.1, 1.0), registry=registry)
+    for value in (0.05, 0.1, 0.5, 2.0):
+        latency.observe(value, op="get")
+    lines = registry.render().splitlines()
+    assert lines[2:] == [
+        'latency_seconds_bucket{op="get",le="0.1"} 2',
+        'latency_seconds_bucket{op="get",le="1"} 3',
+        'latency_seconds_bucket{op="get",le="+Inf"} 4',
+        'latency_seconds_sum{op="get"} 2.65',
+        'latency_seconds_count{op="get"} 4',
+    ]
+    assert latency.count(op="get") == 4
+
+def test_duplicate_names_are_rejected(registry):
+    Counter("dup_total", "First", registry=registry)
+    with pytest.raises(ValueError):
+        Counter("dup_total", "Second", registry=registry)
+
+def test_cache_metrics(registry):
+    cache = TTLCache(max_size=1)
+    registry.caches.add("routing", cache)
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("b")
+    cache.set("b", 2)
+    text = registry.render()
+    assert 'cache_hits_total{cache="routing"} 1' in text
+    assert 'cache_misses_total{cache="routing"} 1' in text
+    assert 'cache_evictions_total{cache="routing"} 1' in text
+    assert 'cache_entries{cache="routing"} 1' in text
+    assert 'cache_hit_ratio{cache="routing"} 0.5' in text
+
+def test_timed_node_sync_and_async():
+    @timed_node("test_sync")
+    def add(a, b):
+        return a + b
+
+    async def fails():
+        raise RuntimeError("boom")
+
+    timed_fails = timed_node("test_async", fails)
+    assert add(1, 2) == 3
+    assert add.__name__ == "add"
+    with pytest.raises(RuntimeError):
+        asyncio.run(timed_fails())
+    assert AGENT_NODE_SECONDS.count(node="test_sync") == 1
+    assert AGENT_NODE_ERRORS.value(node="test_sync") == 0
+    assert AGENT_NODE_SECONDS.count(node="test_async") == 1
+    assert AGENT_NODE_ERRORS.value(node="test_async") == 1
@@ -0,0 +1,127 @@
+import asyncio
+import json
+import sqlite3
+
+import pytest
+
+from context_manager import ContextManager, ConversationContext
+from session_store import InMemorySessionStore, SQLiteSessionStore, create_session_store
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"))
+    yield store
+    store.close()
+
+def test_context_round_trips():
+    context = ConversationContext("s1", max_history=3)
+    context.update_customer_number("12345")
+    context.update_address("1 George St Sydney")
+    context.update_customer_data({"name": "Sam", "current_bill": 120.5})
+    context.set_current_agent("CURRENT_CUSTOMER")
+    for i in range(5):
+        context.add_message("user", f"message {i}")
+
+    restored = ConversationContext.from_bytes(context.to_bytes(), max_history=3)
+    assert restored.session_id == "s1"
+    assert restored.customer_number == "12345"
+    assert restored.address == "1 George St Sydney"
+    assert restored.customer_data == {"name": "Sam", "current_bill": 120.5}
+    assert restored.current_agent == "CURRENT_CUSTOMER"
+    assert [m["content"] for m in restored.conversation_history] == ["message 2", "message 3", "message 4"]
+    assert restored.created_at == context.created_at
+    assert restored.last_updated == context.last_updated
+
+def test_other_format_versions_are_ignored():
+    data = json.loads(ConversationContext("s1").to_bytes())
+    data[0] += 1
+    assert ConversationContext.from_bytes(json.dumps(data).encode()) is None
+
+def test_store_keeps_the_newest_copy(store):
+    store.save_many({"s1": (200.0, b"new")})
+    store.save_many({"s1": (100.0, b"old")})
+    assert store.load("s1") == b"new"
+    store.save_many({"s1": (300.0, b"newer")})
+    assert store.load("s1") == b"newer"
+
+def test_store_purges_and_deletes(store):
+    store.save_many({"old": (100.0, b"a"), "live": (500.0, b"b")})
+    assert store.purge_expired(200.0) == 1
+    assert store.load("old") is None
+    store.delete("live")
+    assert store.load("live") is None
+
+def test_sessions_are_shared_between_workers(store):
+    first = ContextManager(store=store, cache_ttl=0)
+    second = ContextManager(store=store, cache_ttl=0)
+    session_id = first.create_session()
+    first.get_context(session_id).update_customer_number("12345")
+    first.flush()
+
+    context = second.get_context(session_id)
+    assert context.customer_number == "12345"
+    context.update_address("1 George St Sydney")
+    second.flush()
+    assert first.get_context(session_id).address == "1 George St Sydney"
+
+def test_evicted_changes_are_written(store):
+    manager = ContextManager(max_sessions=1, store=store)
+    first = manager.create_session()
+    manager.get_context(first).update_customer_number("12345")
+    manager.create_session()
+    assert first not in manager.contexts
+    assert manager.get_context(first).customer_number == "12345"
+
+def test_memory_store_skips_serialisation(monkeypatch):
+    manager = ContextManager(store=InMemorySessionStore())
+    monkeypatch.setattr(ConversationContext, "to_bytes", lambda self: pytest.fail("serialised"))
+    session_id = manager.create_session()
+    manager.get_context(session_id).add_message("user", "hi")
+    manager.flush()
+
+def test_unknown_backend(monkeypatch):
+    monkeypatch.setenv("SESSION_STORE", "redis")
+    with pytest.raises(ValueError):
+        create_session_store()
+
+class FlakyStore(SQLiteSessionStore):
+    def __init__(self, path, failures):
+        super().__init__(path)
+        self.failures = failures
+
+    def save_many(self, records):
+        if records and self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError("database is locked")
+        super().save_many(records)
+
+    def purge_expired(self, cutoff):
+        if self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError("database is locked")
+        return super().purge_expired(cutoff)
+
+def run_loop_briefly(loop_coro, seconds=0.1):
+    async def run():
+        task = asyncio.create_task(loop_coro)
+        await asyncio.sleep(seconds)
+        assert not task.done()
+        task.cancel()
+    asyncio.run(run())
+
+def test_flusher_retries_failed_batches(tmp_path):
+    store = FlakyStore(str(tmp_path / "sessions.db"), failures=2)
+    manager = ContextManager(store=store)
+    session_id = manager.create_session()
+    manager.get_context(session_id).update_customer_number("12345")
+    run_loop_briefly(manager.run_flusher(interval_seconds=0.01))
+    assert store.failures == 0
+    assert ConversationContext.from_bytes(store.load(session_id)).customer_number == "12345"
+    store.close()
+
+def test_sweeper_survives_store_errors(tmp_path):
+    store = FlakyStore(str(tmp_path / "sessions.db"), failures=2)
+    manager = ContextManager(store=store)
+    run_loop_briefly(manager.run_sweeper(interval_seconds=0.01))
+    assert store.failures == 0
+    store.close()
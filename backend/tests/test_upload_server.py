@@ -0,0 +1,84 @@
+import hashlib
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from uploads import upload_server
+
+@pytest.fixture
+def folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_server, "UPLOAD_FOLDER", str(tmp_path))
+    return tmp_path
+
+@pytest.fixture
+def client(folder):
+    return TestClient(upload_server.app)
+
+def staged(folder):
+    staging = folder / ".staging"
+    return os.listdir(staging) if staging.exists() else []
+
+def test_upload_streams_to_domain_folder(client, folder, monkeypatch):
+    monkeypatch.setattr(upload_server, "WRITE_CHUNK_SIZE", 1024)
+    content = os.urandom(10000)
+    response = client.post("/upload", files={"file": ("bill.pdf", content, "application/pdf")},
+                           data={"domain": "energy"})
+    assert response.status_code == 200
+    assert response.json()["size"] == len(content)
+    assert response.json()["sha256"] == hashlib.sha256(content).hexdigest()
+    assert (folder / "energy" / "bill.pdf").read_bytes() == content
+    assert staged(folder) == []
+    assert client.get("/files/energy").json() == {"files": ["bill.pdf"]}
+
+@pytest.mark.parametrize("filename, stored", [
+    ("../../etc/passwd", "passwd"),
+    ("..\\..\\boot.ini", "boot.ini"),
+    ("/abs/path/notes.txt", "notes.txt"),
+])
+def test_file_names_are_sanitised(client, folder, filename, stored):
+    response = client.post("/upload", files={"file": (filename, b"data", "text/plain")})
+    assert response.json()["filename"] == stored
+    assert (folder / "default" / stored).read_bytes() == b"data"
+
+@pytest.mark.parametrize("filename", ["..", "."])
+def test_unusable_names_are_rejected(client, folder, filename):
+    response = client.post("/upload", files={"file": (filename, b"data", "text/plain")})
+    assert response.status_code == 400
+    assert staged(folder) == []
+
+def test_oversized_file_is_cut_off_and_cleaned_up(client, folder, monkeypatch):
+    monkeypatch.setattr(upload_server, "MAX_UPLOAD_BYTES", 1000)
+    response = client.post("/upload", files={"file": ("big.bin", b"x" * 5000, "application/octet-stream")})
+    assert response.status_code == 413
+    assert staged(folder) == []
+    assert not (folder / "default").exists()
+
+def test_declared_length_over_the_cap_is_rejected(client, folder, monkeypatch):
+    monkeypatch.setattr(upload_server, "MAX_UPLOAD_BYTES", 1000)
+    response = client.post("/upload", files={"file": ("big.bin", b"x" * 100000, "application/octet-stream")})
+    assert response.status_code == 413
+    assert staged(folder) == []
+
+def test_invalid_content_length(client):
+    response = client.post("/upload", content=b"--b--\r\n", headers={
+        "content-type": "multipart/form-data; boundary=b", "content-length": "abc"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid Content-Length"
+
+def test_invalid_domain_discards_the_file(client, folder):
+    response = client.post("/upload", files={"file": ("a.txt", b"data", "text/plain")},
+                           data={"domain": "../escape"})
+    assert response.status_code == 400
+    assert staged(folder) == []
+
+def test_missing_file(client):
+    assert client.post("/upload", data={"domain": "energy"}).status_code == 400
+
+def test_delete_only_inside_the_domain(client, folder):
+    client.post("/upload", files={"file": ("a.txt", b"data", "text/plain")}, data={"domain": "energy"})
+    (folder / "secret.txt").write_text("keep")
+    client.delete("/files/energy/..%2Fsecret.txt")
+    assert (folder / "secret.txt").exists()
+    assert client.delete("/files/energy/a.txt").status_code == 200
+    assert not (folder / "energy" / "a.txt").exists()
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from utils.usage_analytics import SECONDS_PER_DAY, UsageAnalytics
+
+START = 19000 * SECONDS_PER_DAY
+
+def hourly_readings(daily_kwh, meter_id=1, start_register=1000.0):
+    """Cumulative register reads every hour, spreading each day's kWh evenly"""
+    rows, register = [(meter_id, START, start_register)], start_register
+    for day, kwh in enumerate(daily_kwh):
+        for hour in range(1, 25):
+            register += kwh / 24
+            rows.append((meter_id, START + day * SECONDS_PER_DAY + hour * 3600 - 1, register))
+    return rows
+
+def test_daily_totals_from_register_deltas():
+    analytics = UsageAnalytics.from_rows(hourly_readings([10, 12, 14]))
+    days, totals = analytics.daily_totals()
+    assert days.tolist() == [19000, 19001, 19002]
+    assert totals == pytest.approx([10, 12, 14])
+
+def test_register_rollover_counts_from_zero():
+    rows = [(1, START, 99990.0), (1, START + 3600, 99995.0), (1, START + 7200, 3.0)]
+    analytics = UsageAnalytics.from_rows(rows)
+    assert analytics.interval_kwh.tolist() == [5.0, 3.0]
+
+def test_meters_are_not_mixed():
+    rows = hourly_readings([10, 10], meter_id=1) + hourly_readings([5, 5], meter_id=2, start_register=50000.0)
+    analytics = UsageAnalytics.from_rows(rows)
+    assert analytics.daily_totals()[1] == pytest.approx([15, 15])
+
+def test_anomalies_by_mad():
+    daily = [10, 11, 9, 10.5, 9.5, 10, 30, 10, 11, 9]
+    days, kwh, scores = UsageAnalytics.from_rows(hourly_readings(daily)).anomalies()
+    assert days.tolist() == [19006]
+    assert kwh == pytest.approx([30])
+    assert scores[0] > 3.5
+
+def test_spike_on_uniform_usage_is_flagged():
+    daily = [10.0] * 10
+    daily[5] = 15.0
+    days, kwh, _ = UsageAnalytics.from_rows(hourly_readings(daily)).anomalies()
+    assert days.tolist() == [19005]
+    assert kwh == pytest.approx([15])
+
+def test_identical_days_have_no_anomalies():
+    days, _, _ = UsageAnalytics.from_rows(hourly_readings([10.0] * 10)).anomalies()
+    assert days.size == 0
+
+def test_summary_shape():
+    summary = UsageAnalytics.from_rows(hourly_readings([10.0] * 60)).summary(period_days=30)
+    assert summary["usage_kwh"] == pytest.approx(300)
+    assert summary["previous_usage_kwh"] == pytest.approx(300)
+    assert summary["usage_change_pct"] == 0.0
+    assert summary["average_daily_kwh"] == pytest.approx(10)
+    assert sum(summary["weekday_profile"].values()) == pytest.approx(70)
+    assert summary["anomalies"] == []
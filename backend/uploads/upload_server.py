@@ -1,55 +1,208 @@
-from flask import Flask, request, jsonify
-from flask_cors import CORS
+import asyncio
+import hashlib
 import os
-
-app = Flask(__name__)
-CORS(app)
+import re
+import tempfile
+from typing import Dict, List, Optional
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.middleware.cors import CORSMiddleware
+from python_multipart.multipart import MultipartParser, parse_options_header
 
 UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads')
+MAX_UPLOAD_BYTES = int(os.getenv('UPLOAD_MAX_BYTES', str(25 * 1024 * 1024)))
+# Bytes are written to disk in blocks of this size, off the event loop
+WRITE_CHUNK_SIZE = int(os.getenv('UPLOAD_WRITE_CHUNK_BYTES', str(1024 * 1024)))
+MAX_FIELD_BYTES = 1024
+
+app = FastAPI(title="Upload Server")
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+
+def safe_name(name: Optional[str]) -> Optional[str]:
+    """Final path component only, so names can't escape their folder"""
+    name = os.path.basename((name or "").replace("\\", "/")).strip()
+    return None if name in ("", ".", "..") else name
+
+def safe_domain(domain: str) -> str:
+    if not re.fullmatch(r"[A-Za-z0-9_\-]{1,128}", domain):
+        raise HTTPException(400, "Invalid domain")
+    return domain
+
+class FilePart:
+    """One streamed file field: buffered into fixed-size blocks, hashed as it arrives"""
+
+    def __init__(self, filename: str, folder: str):
+        self.filename = filename
+        self.size = 0
+        self.sha256 = hashlib.sha256()
+        self.buffer = bytearray()
+        fd, self.tmp_path = tempfile.mkstemp(dir=folder, prefix=".upload-")
+        self.file = os.fdopen(fd, "wb")
+
+    def feed(self, data: bytes):
+        self.size += len(data)
+        if self.size > MAX_UPLOAD_BYTES:
+            raise HTTPException(413, f"File too large. Max: {MAX_UPLOAD_BYTES} bytes")
+        self.sha256.update(data)
+        self.buffer += data
+
+    def take_blocks(self, final: bool = False) -> bytes:
+        cut = len(self.buffer) if final else len(self.buffer) - len(self.buffer) % WRITE_CHUNK_SIZE
+        block = bytes(self.buffer[:cut])
+        del self.buffer[:cut]
+        return block
+
+    def discard(self):
+        self.file.close()
+        if os.path.exists(self.tmp_path):
+            os.unlink(self.tmp_path)
+
+class MultipartUpload:
+    """Callbacks for python-multipart's streaming parser.
+
+    Form fields are kept in memory (they're tiny); the file field goes to a
+    FilePart. Only the first file field is accepted, as before.
+    """
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        self.fields: Dict[str, str] = {}
+        self.file: Optional[FilePart] = None
+        self.error: Optional[HTTPException] = None
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._field_name: Optional[str] = None
+        self._field_value = bytearray()
+        self._in_file = False
+
+    def callbacks(self):
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": lambda data, start, end: self._append_header("_header_field", data[start:end]),
+            "on_header_value": lambda data, start, end: self._append_header("_header_value", data[start:end]),
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
 
-@app.route('/upload', methods=['POST'])
-def upload_file():
-    if 'file' not in request.files:
-        return jsonify({'error': 'No file provided'}), 400
-    
-    file = request.files['file']
-    if file.filename == '':
-        return jsonify({'error': 'No file selected'}), 400
-    
-    domain = request.form.get('domain', 'default')
-    domain_folder = os.path.join(UPLOAD_FOLDER, domain)
-    os.makedirs(domain_folder, exist_ok=True)
-    
-    file.save(os.path.join(domain_folder, file.filename))
-    return jsonify({'message': 'File uploaded successfully'})
-
-@app.route('/files/<domain>', methods=['GET'])
-def list_files(domain):
-    domain_folder = os.path.join(UPLOAD_FOLDER, domain)
+    def _append_header(self, attr: str, data: bytes):
+        setattr(self, attr, getattr(self, attr) + data)
+
+    def on_part_begin(self):
+        self._headers, self._field_name, self._field_value, self._in_file = {}, None, bytearray(), False
+
+    def on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._field_name = options.get(b"name", b"").decode("utf-8", "replace")
+        if b"filename" in options and self._field_name == "file" and self.file is None:
+            filename = safe_name(options[b"filename"].decode("utf-8", "replace"))
+            if filename is None:
+                self.error = HTTPException(400, "No file selected")
+                return
+            self.file = FilePart(filename, self.folder)
+            self._in_file = True
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self.error:
+            return
+        if self._in_file:
+            try:
+                self.file.feed(data[start:end])
+            except HTTPException as e:
+                self.error = e
+        elif len(self._field_value) + end - start <= MAX_FIELD_BYTES:
+            self._field_value += data[start:end]
+
+    def on_part_end(self):
+        if self._field_name and not self._in_file:
+            self.fields[self._field_name] = self._field_value.decode("utf-8", "replace")
+
+async def receive_upload(request: Request) -> MultipartUpload:
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(400, "No file provided")
+    content_length = request.headers.get("content-length")
+    if content_length is not None and not content_length.isdigit():
+        raise HTTPException(400, "Invalid Content-Length")
+    if content_length and int(content_length) > MAX_UPLOAD_BYTES + 64 * 1024:
+        raise HTTPException(413, f"File too large. Max: {MAX_UPLOAD_BYTES} bytes")
+
+    # Files land in a temp file beside their final folder so the rename is atomic;
+    # the domain field may only arrive after the file itself
+    staging = os.path.join(UPLOAD_FOLDER, ".staging")
+    os.makedirs(staging, exist_ok=True)
+    upload = MultipartUpload(staging)
+    parser = MultipartParser(params[b"boundary"], upload.callbacks())
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            if upload.error:
+                raise upload.error
+            if upload.file and len(upload.file.buffer) >= WRITE_CHUNK_SIZE:
+                await asyncio.to_thread(upload.file.file.write, upload.file.take_blocks())
+        parser.finalize()
+        if upload.file is None:
+            raise HTTPException(400, "No file provided")
+        await asyncio.to_thread(upload.file.file.write, upload.file.take_blocks(final=True))
+        upload.file.file.close()
+    except BaseException:
+        if upload.file:
+            upload.file.discard()
+        raise
+    return upload
+
+@app.post("/upload")
+async def upload_file(request: Request):
+    upload = await receive_upload(request)
+    part = upload.file
+    try:
+        domain = safe_domain(upload.fields.get("domain") or "default")
+        domain_folder = os.path.join(UPLOAD_FOLDER, domain)
+        os.makedirs(domain_folder, exist_ok=True)
+        os.replace(part.tmp_path, os.path.join(domain_folder, part.filename))
+    except BaseException:
+        part.discard()
+        raise
+    return {
+        "message": "File uploaded successfully",
+        "filename": part.filename,
+        "size": part.size,
+        "sha256": part.sha256.hexdigest()
+    }
+
+def _list_files(domain_folder: str) -> List[str]:
+    return [f for f in os.listdir(domain_folder) if os.path.isfile(os.path.join(domain_folder, f))]
+
+@app.get("/files/{domain}")
+async def list_files(domain: str):
+    domain_folder = os.path.join(UPLOAD_FOLDER, safe_domain(domain))
     if not os.path.exists(domain_folder):
-        return jsonify({'files': []})
-    
-    files = [f for f in os.listdir(domain_folder) if os.path.isfile(os.path.join(domain_folder, f))]
-    return jsonify({'files': files})
-
-@app.route('/files/<domain>/<filename>', methods=['DELETE'])
-def delete_file(domain, filename):
-    file_path = os.path.join(UPLOAD_FOLDER, domain, filename)
-    if os.path.exists(file_path):
+        return {"files": []}
+    return {"files": await asyncio.to_thread(_list_files, domain_folder)}
+
+@app.delete("/files/{domain}/{filename}")
+async def delete_file(domain: str, filename: str):
+    name = safe_name(filename)
+    file_path = os.path.join(UPLOAD_FOLDER, safe_domain(domain), name) if name else None
+    if file_path and os.path.isfile(file_path):
         os.remove(file_path)
-        return jsonify({'message': 'File deleted successfully'})
-    return jsonify({'error': 'File not found'}), 404
+        return {"message": "File deleted successfully"}
+    raise HTTPException(404, "File not found")
 
-@app.route('/files/<domain>', methods=['DELETE'])
-def clear_domain_files(domain):
-    domain_folder = os.path.join(UPLOAD_FOLDER, domain)
+@app.delete("/files/{domain}")
+async def clear_domain_files(domain: str):
+    domain_folder = os.path.join(UPLOAD_FOLDER, safe_domain(domain))
     if os.path.exists(domain_folder):
-        for filename in os.listdir(domain_folder):
-            file_path = os.path.join(domain_folder, filename)
-            if os.path.isfile(file_path):
-                os.remove(file_path)
-        return jsonify({'message': f'All files cleared for {domain}'})
-    return jsonify({'message': f'No files found for {domain}'}), 200
-
-if __name__ == '__main__':
-    app.run(debug=True, port=5000)
\ No newline at end of file
+        for filename in await asyncio.to_thread(_list_files, domain_folder):
+            os.remove(os.path.join(domain_folder, filename))
+        return {"message": f"All files cleared for {domain}"}
+    return {"message": f"No files found for {domain}"}
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="0.0.0.0", port=5000)
@@ -0,0 +1,229 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+from utils.address_coverage import check_address as check_address_locally, tokenize
+from utils.cache import TTLCache
+from utils.metrics import Histogram, register_cache
+
+logger = logging.getLogger(__name__)
+
+ADDRESS_SERVER_PATH = os.getenv('ADDRESS_SERVER_PATH', os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'mcp-server', 'address_server.py'
+))
+ADDRESS_CLIENT_POOL_SIZE = int(os.getenv('ADDRESS_CLIENT_POOL_SIZE', '2'))
+ADDRESS_CLIENT_TIMEOUT_SECONDS = float(os.getenv('ADDRESS_CLIENT_TIMEOUT_SECONDS', '2'))
+ADDRESS_CACHE_SIZE = int(os.getenv('ADDRESS_CACHE_SIZE', '10000'))
+ADDRESS_CACHE_TTL_SECONDS = float(os.getenv('ADDRESS_CACHE_TTL_SECONDS', '3600'))
+MAX_LINE_BYTES = 16 * 1024 * 1024
+# Don't respawn a worker that keeps failing more often than this
+RESTART_BACKOFF_SECONDS = 5.0
+
+ADDRESS_CHECK_SECONDS = Histogram("address_check_seconds", "Coverage check time by where the answer came from",
+                                  ["source"])
+
+class AddressServerWorker:
+    """One long-lived address server subprocess speaking JSON-RPC over stdio.
+
+    Requests are written as soon as they're made and matched to replies by id,
+    so many can be in flight on the same process.
+    """
+
+    def __init__(self, server_path: str):
+        self.server_path = server_path
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._reader: Optional[asyncio.Task] = None
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None and \
+            self._reader is not None and not self._reader.done()
+
+    async def start(self):
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable, self.server_path,
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, limit=MAX_LINE_BYTES
+        )
+        self._reader = asyncio.create_task(self._read_replies())
+
+    async def _read_replies(self):
+        try:
+            while line := await self.process.stdout.readline():
+                reply = json.loads(line)
+                future = self.pending.pop(reply.get("id"), None) if isinstance(reply, dict) else None
+                if future is None or future.done():
+                    continue
+                if "error" in reply:
+                    future.set_exception(RuntimeError(reply["error"].get("message", "Address server error")))
+                else:
+                    future.set_result(reply["result"])
+        finally:
+            # The process exited or its output broke; fail everything still waiting
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Address server exited"))
+            self.pending.clear()
+
+    async def call(self, method: str, params: Dict, timeout: float) -> Any:
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        self.process.stdin.write(
+            json.dumps({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}).encode() + b"\n"
+        )
+        try:
+            await self.process.stdin.drain()
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self.pending.pop(request_id, None)
+
+    async def close(self):
+        if self.process and self.process.returncode is None:
+            self.process.stdin.close()
+            try:
+                await asyncio.wait_for(self.process.wait(), 2)
+            except asyncio.TimeoutError:
+                self.process.kill()
+        if self._reader:
+            self._reader.cancel()
+
+class AddressClient:
+    """Coverage checks through a small pool of address server processes.
+
+    Results are cached by normalised address, so repeat checks never leave the
+    process. Dead workers are restarted on the next request that needs them,
+    and if the servers can't answer in time the in-process engine does.
+    """
+
+    def __init__(self, pool_size: int = ADDRESS_CLIENT_POOL_SIZE, server_path: str = ADDRESS_SERVER_PATH,
+                 timeout: float = ADDRESS_CLIENT_TIMEOUT_SECONDS):
+        self.pool_size = pool_size
+        self.server_path = server_path
+        self.timeout = timeout
+        self.cache = TTLCache(max_size=ADDRESS_CACHE_SIZE, ttl_seconds=ADDRESS_CACHE_TTL_SECONDS)
+        self.workers: List[AddressServerWorker] = []
+        self.restarts = 0
+        self.local_fallbacks = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._next = itertools.count()
+        self._restart_lock: Optional[asyncio.Lock] = None
+        self._last_restart = 0.0
+
+    async def start(self):
+        """Spawn the worker pool; call from the app's lifespan"""
+        self._loop = asyncio.get_running_loop()
+        self._restart_lock = asyncio.Lock()
+        if not os.path.isfile(self.server_path):
+            # e.g. the backend image, which doesn't ship mcp-server/; every check runs in-process
+            logger.info(f"No address server at {self.server_path}, checking addresses locally")
+            return
+        self.workers = [AddressServerWorker(self.server_path) for _ in range(self.pool_size)]
+        for worker in self.workers:
+            try:
+                await worker.start()
+            except OSError as e:
+                logger.warning(f"Address server failed to start: {e}")
+
+    async def _worker(self) -> AddressServerWorker:
+        worker = self.workers[next(self._next) % len(self.workers)]
+        if not worker.alive:
+            async with self._restart_lock:
+                if not worker.alive:
+                    now = self._loop.time()
+                    if now - self._last_restart < RESTART_BACKOFF_SECONDS:
+                        raise ConnectionError("Address server is restarting")
+                    self._last_restart = now
+                    await worker.close()
+                    await worker.start()
+                    self.restarts += 1
+        return worker
+
+    @staticmethod
+    def cache_key(address: str) -> str:
+        return " ".join(tokenize(address))
+
+    async def _call(self, method: str, params: Dict) -> Any:
+        worker = await self._worker()
+        return await worker.call(method, params, self.timeout)
+
+    async def check_address(self, address: str) -> Dict:
+        start = time.perf_counter()
+        key = self.cache_key(address)
+        result = self.cache.get(key)
+        if result is not None:
+            ADDRESS_CHECK_SECONDS.observe(time.perf_counter() - start, source="cache")
+            return result
+        result, source = None, "server"
+        if self.workers:
+            try:
+                result = await self._call("check_address", {"address": address})
+            except Exception as e:
+                logger.warning(f"Address server call failed, checking locally: {e}")
+        if result is None:
+            self.local_fallbacks += 1
+            result, source = check_address_locally(address), "local"
+        self.cache.set(key, result)
+        ADDRESS_CHECK_SECONDS.observe(time.perf_counter() - start, source=source)
+        return result
+
+    async def check_addresses(self, addresses: List[str]) -> List[Dict]:
+        """Coverage for many addresses; only cache misses go to a server, in one call"""
+        keys = [self.cache_key(address) for address in addresses]
+        results = [self.cache.get(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            fetched = None
+            if self.workers:
+                try:
+                    reply = await self._call("check_addresses", {"addresses": [addresses[i] for i in missing]})
+                    fetched = reply["results"]
+                except Exception as e:
+                    logger.warning(f"Address server batch failed, checking locally: {e}")
+            if fetched is None:
+                self.local_fallbacks += len(missing)
+                fetched = [check_address_locally(addresses[i]) for i in missing]
+            for i, result in zip(missing, fetched):
+                results[i] = result
+                self.cache.set(keys[i], result)
+        return results
+
+    def check_address_sync(self, address: str) -> Dict:
+        """Blocking check for code running on a worker thread, such as graph nodes"""
+        result = self.cache.get(self.cache_key(address))
+        if result is not None:
+            return result
+        if self._loop is None or not self._loop.is_running():
+            return check_address_locally(address)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            # Called on the client's own loop; blocking here would deadlock
+            return check_address_locally(address)
+        future = asyncio.run_coroutine_threadsafe(self.check_address(address), self._loop)
+        return future.result(self.timeout + 1)
+
+    async def close(self):
+        for worker in self.workers:
+            await worker.close()
+        self.workers = []
+        self._loop = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self.workers),
+            "alive": sum(worker.alive for worker in self.workers),
+            "restarts": self.restarts,
+            "local_fallbacks": self.local_fallbacks,
+            "cache": self.cache.stats()
+        }
+
+address_client = AddressClient()
+register_cache("address", address_client.cache)
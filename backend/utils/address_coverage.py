@@ -0,0 +1,183 @@
+import bisect
+import csv
+import os
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+GAZETTEER_PATH = os.getenv('GAZETTEER_PATH', os.path.join(DATA_DIR, 'au_gazetteer.csv'))
+POSTCODE_RANGES_PATH = os.getenv('POSTCODE_RANGES_PATH', os.path.join(DATA_DIR, 'au_postcode_ranges.csv'))
+COVERAGE_STATES = frozenset(
+    s.strip().upper() for s in os.getenv('COVERAGE_STATES', 'NSW,VIC,QLD,WA,SA').split(',') if s.strip()
+)
+
+STATES = {
+    "nsw": "NSW", "new south wales": "NSW", "vic": "VIC", "victoria": "VIC", "qld": "QLD",
+    "queensland": "QLD", "wa": "WA", "western australia": "WA", "sa": "SA", "south australia": "SA",
+    "tas": "TAS", "tasmania": "TAS", "act": "ACT", "australian capital territory": "ACT",
+    "nt": "NT", "northern territory": "NT",
+}
+# Common abbreviations in suburb names, expanded so "Mt Colah" finds "Mount Colah"
+ABBREVIATIONS = {"mt": "mount", "pt": "port", "st": "saint", "nth": "north", "sth": "south", "stn": "station"}
+
+class Locality(NamedTuple):
+    suburb: str
+    postcode: str
+    state: str
+    distributor: Optional[str]
+
+def tokenize(text: str) -> List[str]:
+    return re.sub(r"[^a-z0-9]+", " ", text.lower()).split()
+
+def normalise_name(name: str) -> Tuple[str, ...]:
+    return tuple(ABBREVIATIONS.get(t, t) for t in tokenize(name))
+
+class CoverageEngine:
+    """Address coverage lookups against a gazetteer of localities and postcode ranges.
+
+    Suburb names are indexed by their first normalised token, so matching an
+    address costs a dict probe per address token. Postcodes resolve to a state
+    and distribution network by bisecting sorted ranges, and a character trie
+    over suburb names serves prefix completion.
+    """
+
+    def __init__(self, gazetteer_path: str = GAZETTEER_PATH, ranges_path: str = POSTCODE_RANGES_PATH,
+                 coverage_states: frozenset = COVERAGE_STATES):
+        self.coverage_states = coverage_states
+        self._range_starts: List[int] = []
+        self._ranges: List[Tuple[int, str, str]] = []
+        with open(ranges_path, newline="") as f:
+            for row in sorted(csv.DictReader(f), key=lambda r: int(r["start"])):
+                self._range_starts.append(int(row["start"]))
+                self._ranges.append((int(row["end"]), row["state"], row["distributor"]))
+
+        self.localities: List[Locality] = []
+        self._by_first_token: Dict[str, List[Tuple[Tuple[str, ...], int]]] = {}
+        self._by_postcode: Dict[str, List[int]] = {}
+        self._trie: Dict = {}
+        with open(gazetteer_path, newline="") as f:
+            for row in csv.DictReader(f):
+                postcode = row["postcode"].zfill(4)
+                range_info = self.postcode_range(postcode)
+                distributor = row.get("distributor") or (range_info[1] if range_info else None)
+                self._add(Locality(row["suburb"], postcode, row["state"].upper(), distributor))
+        # Longest names first, so "North Sydney" wins over "Sydney" at the same position
+        for entries in self._by_first_token.values():
+            entries.sort(key=lambda entry: -len(entry[0]))
+
+    def _add(self, locality: Locality):
+        index = len(self.localities)
+        self.localities.append(locality)
+        name = normalise_name(locality.suburb)
+        self._by_first_token.setdefault(name[0], []).append((name, index))
+        self._by_postcode.setdefault(locality.postcode, []).append(index)
+        node = self._trie
+        for char in " ".join(name):
+            node = node.setdefault(char, {})
+            node.setdefault("", []).append(index)
+
+    def postcode_range(self, postcode: str) -> Optional[Tuple[str, str]]:
+        """(state, distributor) for a postcode, or None if it's outside every range"""
+        value = int(postcode)
+        i = bisect.bisect_right(self._range_starts, value) - 1
+        if i >= 0 and value <= self._ranges[i][0]:
+            return self._ranges[i][1], self._ranges[i][2]
+        return None
+
+    def complete(self, prefix: str, limit: int = 10) -> List[Locality]:
+        """Localities whose normalised name starts with prefix, in gazetteer order"""
+        node = self._trie
+        for char in " ".join(normalise_name(prefix)):
+            node = node.get(char)
+            if node is None:
+                return []
+        return [self.localities[i] for i in node.get("", [])[:limit]]
+
+    def _state_hints(self, tokens: List[str]) -> Tuple[Optional[str], Optional[int]]:
+        """Last state written in the address and the index just past it; the last one wins, as on envelopes"""
+        state = state_end = None
+        for i, token in enumerate(tokens):
+            for length in (3, 2, 1):
+                name = " ".join(tokens[i:i + length])
+                if i + length <= len(tokens) and name in STATES:
+                    state, state_end = STATES[name], i + length
+                    break
+        return state, state_end
+
+    def _postcode(self, tokens: List[str], after: Optional[int]) -> Optional[str]:
+        """The written postcode: a 4-digit token that ends the address or follows a suburb or state.
+
+        Anything earlier is taken to be a street or unit number, so "1200 Main Rd, Perth"
+        isn't read as NSW 1200.
+        """
+        postcode = None
+        for i, token in enumerate(tokens):
+            if len(token) == 4 and token.isdigit() and self.postcode_range(token) and \
+                    (i == len(tokens) - 1 or (after is not None and i >= after)):
+                postcode = token
+        return postcode
+
+    def locate(self, address: str) -> Optional[Locality]:
+        """Best matching locality for a free-text address"""
+        raw_tokens = tokenize(address)
+        tokens = [ABBREVIATIONS.get(t, t) for t in raw_tokens]
+        state, state_end = self._state_hints(raw_tokens)
+
+        matches = []
+        for position, token in enumerate(tokens):
+            for name, index in self._by_first_token.get(token, ()):
+                if tuple(tokens[position:position + len(name)]) == name:
+                    matches.append((position, len(name), self.localities[index]))
+        # A postcode may follow the earliest suburb name or the state
+        ends = [position + length for position, length, _ in matches]
+        if state_end is not None:
+            ends.append(state_end)
+        postcode = self._postcode(raw_tokens, min(ends) if ends else None)
+
+        best, best_score = None, None
+        for position, length, locality in matches:
+            # Agreement with the written postcode/state, then name length, then later in the address
+            score = (locality.postcode == postcode, locality.state == state, length, position)
+            if best_score is None or score > best_score:
+                best, best_score = locality, score
+        # Only a written state can overrule a named suburb; one inferred from the postcode can't
+        if best is not None and (not state or best.state == state):
+            return best
+        if postcode:
+            by_postcode = self._by_postcode.get(postcode)
+            if by_postcode:
+                return self.localities[by_postcode[0]]
+            range_state, distributor = self.postcode_range(postcode)
+            return Locality("", postcode, range_state, distributor)
+        return best
+
+    def check(self, address: str) -> Dict:
+        """Coverage answer in the shape the address server has always returned"""
+        locality = self.locate(address)
+        if locality is None or locality.state not in self.coverage_states:
+            return {
+                'available': False,
+                'message': 'Energy services may not be available at this address. Please contact support for verification.'
+            }
+        place = f"{locality.suburb}, {locality.state}" if locality.suburb else f"{locality.state} {locality.postcode}"
+        return {
+            'available': True,
+            'state': locality.state,
+            'city': locality.suburb,
+            'suburb': locality.suburb,
+            'postcode': locality.postcode,
+            'distributor': locality.distributor,
+            'message': f'Energy services available in {place}'
+        }
+
+_engine: Optional[CoverageEngine] = None
+
+def get_engine() -> CoverageEngine:
+    """Process-wide engine, loaded on first use"""
+    global _engine
+    if _engine is None:
+        _engine = CoverageEngine()
+    return _engine
+
+def check_address(address: str) -> Dict:
+    return get_engine().check(address)
@@ -0,0 +1,142 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from langchain_core.messages import HumanMessage
+from utils.bill_extractor import extract_bill_in_pool
+from utils.blob_store import blob_store, resolve_attachment
+from utils.cache import TTLCache
+from utils.llm_clients import get_chat_model
+from utils.metrics import Histogram, register_cache
+
+logger = logging.getLogger(__name__)
+
+BILL_ANALYSIS_DB_PATH = os.getenv('BILL_ANALYSIS_DB_PATH', 'bill_analysis.db')
+BILL_ANALYSIS_CACHE_SIZE = int(os.getenv('BILL_ANALYSIS_CACHE_SIZE', '5000'))
+# Part of every cache key; bump when the prompt or the field set changes
+BILL_ANALYSIS_VERSION = 1
+
+BILL_ANALYSIS_SECONDS = Histogram("bill_analysis_seconds", "Bill analysis time by where the result came from",
+                                  ["source"])
+
+BILL_FIELDS = ("retailer", "billing_period_start", "billing_period_end", "usage_kwh", "tariffs",
+               "supply_charge", "amount_due", "due_date")
+
+ANALYSIS_PROMPT = f"""You are reading an Australian electricity bill.
+Reply with a single JSON object and nothing else, with the keys {", ".join(BILL_FIELDS)} and summary.
+Use ISO dates, numbers without units or currency symbols, tariffs as a list of
+{{"name", "rate", "unit"}} objects, and null for anything the bill doesn't show.
+summary is two or three plain sentences explaining the bill to the customer."""
+
+class AnalysisCache:
+    """Persistent, size-bounded cache of bill analyses keyed by content hash.
+
+    Entries live in SQLite so they survive restarts and are shared by every
+    worker on the host; the least recently used rows are evicted once the table
+    passes max_entries. A small in-process cache sits in front for repeat hits.
+    """
+
+    def __init__(self, path: str = BILL_ANALYSIS_DB_PATH, max_entries: int = BILL_ANALYSIS_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._memory = TTLCache(max_size=256, ttl_seconds=3600)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS analyses (
+                key TEXT PRIMARY KEY,
+                last_used REAL NOT NULL,
+                result TEXT NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS analyses_last_used_idx ON analyses (last_used)")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        result = self._memory.get(key)
+        if result is not None:
+            return result
+        with self._lock:
+            row = self._conn.execute("SELECT result FROM analyses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE analyses SET last_used = ? WHERE key = ?", (time.time(), key))
+        result = json.loads(row[0])
+        self._memory.set(key, result)
+        return result
+
+    def set(self, key: str, result: Dict[str, Any]):
+        self._memory.set(key, result)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute("INSERT OR REPLACE INTO analyses VALUES (?, ?, ?)",
+                               (key, time.time(), json.dumps(result, default=str)))
+            self._conn.execute("""
+                DELETE FROM analyses WHERE key IN (
+                    SELECT key FROM analyses ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+            self._conn.execute("COMMIT")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM analyses").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self), "max_entries": self.max_entries, "memory": self._memory.stats()}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+analysis_cache = AnalysisCache()
+register_cache("bill_analysis", analysis_cache._memory)
+
+def _parse_reply(content: Any) -> Dict[str, Any]:
+    text = content if isinstance(content, str) else "".join(
+        block.get("text", "") for block in content if isinstance(block, dict)
+    )
+    start, end = text.find("{"), text.rfind("}")
+    data = json.loads(text[start:end + 1])
+    return {**{field: data.get(field) for field in BILL_FIELDS}, "summary": data.get("summary")}
+
+def _model_analysis(ref: Dict[str, Any]) -> Dict[str, Any]:
+    message = HumanMessage(content=[resolve_attachment(ref), {"type": "text", "text": ANALYSIS_PROMPT}])
+    return {**_parse_reply(get_chat_model().invoke([message]).content), "source": "model"}
+
+def analyse_bill(ref: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Structured fields and summary for an uploaded bill, or None if it can't be read.
+
+    ref is a blob store reference; its digest is the cache key, so an identical
+    upload in any thread or session is answered from the cache. PDFs are tried
+    with the local extractor first and fall back to the model.
+    """
+    if ref.get("type") not in ("document", "image"):
+        return None
+    start = time.perf_counter()
+    key = f"{ref['ref']}:{BILL_ANALYSIS_VERSION}"
+    result = analysis_cache.get(key)
+    if result is not None:
+        BILL_ANALYSIS_SECONDS.observe(time.perf_counter() - start, source="cache")
+        return result
+    # Known PDF layouts are parsed locally; the model only sees the rest
+    if ref["type"] == "document" and ref.get("format") == "pdf":
+        result = extract_bill_in_pool(blob_store.get(ref["ref"]))
+        if result is not None:
+            result["source"] = "local"
+    if result is None:
+        try:
+            result = _model_analysis(ref)
+        except Exception as e:
+            logger.warning(f"Bill analysis failed for {ref['ref'][:12]}: {e}")
+            BILL_ANALYSIS_SECONDS.observe(time.perf_counter() - start, source="failed")
+            return None
+    analysis_cache.set(key, result)
+    BILL_ANALYSIS_SECONDS.observe(time.perf_counter() - start, source=result["source"])
+    return result
+
+def analyse_bills(refs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [result for result in map(analyse_bill, refs or []) if result]
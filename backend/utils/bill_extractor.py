@@ -0,0 +1,177 @@
+import io
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+try:
+    from pypdf import PdfReader
+    PDF_AVAILABLE = True
+except ImportError:
+    PDF_AVAILABLE = False
+
+BILL_EXTRACTOR_WORKERS = int(os.getenv('BILL_EXTRACTOR_WORKERS', '2'))
+BILL_EXTRACT_TIMEOUT_SECONDS = float(os.getenv('BILL_EXTRACT_TIMEOUT_SECONDS', '10'))
+# Bills are a few pages; anything longer isn't one and isn't worth parsing
+MAX_PAGES = 8
+
+RETAILERS = (
+    "Origin Energy", "Tango Energy", "AGL", "EnergyAustralia", "Red Energy", "Alinta Energy",
+    "Simply Energy", "Lumo Energy", "Momentum Energy", "Powershop", "Dodo", "OVO Energy",
+    "Amber Electric", "GloBird Energy", "Sumo", "ActewAGL", "Aurora Energy", "Synergy",
+)
+
+DATE = r"(\d{1,2} [A-Z][a-z]{2} (?:\d{4}|\d{2}))"
+MONEY = r"\$\s?([\d,]+\.\d{2})"
+
+RETAILER_RE = re.compile("|".join(re.escape(name) for name in RETAILERS), re.I)
+PERIOD_RES = [
+    re.compile(rf"(?:Bill|Billing|Supply)?\s*period:?\s*{DATE}\s*(?:-|to)\s*{DATE}", re.I),
+    re.compile(rf"{DATE}\s*(?:-|to)\s*{DATE}"),
+]
+AMOUNT_DUE_RE = re.compile(rf"Total amount due:?\s*{MONEY}", re.I)
+DUE_DATE_RE = re.compile(rf"Due date\W*(?:\(New Charges only\))?\s*:?\s*{DATE}", re.I)
+SUPPLY_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(c|\$)/day", re.I)
+# quantity [kWh] [Actual|Estimated] rate c/kWh|$/kWh amount, across line breaks
+ENERGY_RE = re.compile(
+    r"(?:^(?P<name>[A-Za-z][A-Za-z \-]*?)\s+)?(?P<qty>\d[\d,]*(?:\.\d+)?)\s*(?:kWh)?\s*(?:Actual|Estimated)?\s*"
+    r"(?P<rate>-?\d+(?:\.\d+)?)\s*(?P<unit>c|\$)/kWh\s*-?\$(?P<amount>[\d,]+\.\d{2})",
+    re.M
+)
+# Time-of-use labels some retailers print in a column beside the charges table
+TOU_LABEL_RE = re.compile(r"^(Peak|Shoulder|Off[- ]Peak|Controlled Load(?: \d)?)\s*$", re.M)
+
+@dataclass
+class Tariff:
+    name: str
+    rate: float  # $/kWh, negative for feed-in credits
+    unit: str = "$/kWh"
+
+@dataclass
+class BillRecord:
+    retailer: Optional[str] = None
+    billing_period_start: Optional[date] = None
+    billing_period_end: Optional[date] = None
+    usage_kwh: Optional[float] = None
+    tariffs: List[Tariff] = field(default_factory=list)
+    supply_charge: Optional[float] = None  # $/day
+    amount_due: Optional[float] = None
+    due_date: Optional[date] = None
+
+    @property
+    def complete(self) -> bool:
+        """Enough was read to explain the bill without asking the model"""
+        return None not in (self.billing_period_start, self.usage_kwh, self.amount_due)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        for key in ("billing_period_start", "billing_period_end", "due_date"):
+            if data[key]:
+                data[key] = data[key].isoformat()
+        return data
+
+    def summary(self) -> str:
+        # Retailers count both ends of the billing period
+        days = (self.billing_period_end - self.billing_period_start).days + 1 if self.billing_period_end else None
+        period = f"{self.billing_period_start:%d %b %Y} to {self.billing_period_end:%d %b %Y} ({days} days)" \
+            if days else f"the period from {self.billing_period_start:%d %b %Y}"
+        text = f"This {self.retailer or 'electricity'} bill covers {period}: you used {self.usage_kwh:g} kWh"
+        if days:
+            text += f", about {self.usage_kwh / days:.1f} kWh a day"
+        text += f". The amount due is ${self.amount_due:,.2f}"
+        text += f", due {self.due_date:%d %b %Y}." if self.due_date else "."
+        if self.supply_charge is not None:
+            text += f" The daily supply charge is ${self.supply_charge:.2f}."
+        return text
+
+def _parse_date(text: str) -> Optional[date]:
+    for fmt in ("%d %b %Y", "%d %b %y"):
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+def _number(text: str) -> float:
+    return float(text.replace(",", ""))
+
+def parse_bill_text(text: str) -> BillRecord:
+    """Pull the bill fields out of extracted PDF text with layout-tolerant patterns"""
+    record = BillRecord()
+    if match := RETAILER_RE.search(text):
+        record.retailer = next(name for name in RETAILERS if name.lower() == match.group(0).lower())
+    for pattern in PERIOD_RES:
+        if match := pattern.search(text):
+            record.billing_period_start = _parse_date(match.group(1))
+            record.billing_period_end = _parse_date(match.group(2))
+            break
+    if match := AMOUNT_DUE_RE.search(text):
+        record.amount_due = _number(match.group(1))
+    if match := DUE_DATE_RE.search(text):
+        record.due_date = _parse_date(match.group(1))
+    if match := SUPPLY_RE.search(text):
+        rate = float(match.group(1))
+        record.supply_charge = round(rate / 100 if match.group(2) == "c" else rate, 5)
+
+    tou_labels = iter(TOU_LABEL_RE.findall(text))
+    usage = 0.0
+    for i, match in enumerate(ENERGY_RE.finditer(text), 1):
+        rate = float(match.group("rate"))
+        rate = rate / 100 if match.group("unit") == "c" else rate
+        if rate < 0:
+            name = "Solar feed-in"
+        else:
+            name = match.group("name") or next(tou_labels, f"Usage rate {i}")
+            usage += _number(match.group("qty"))
+        record.tariffs.append(Tariff(name=name.strip(), rate=round(rate, 5)))
+    if usage:
+        record.usage_kwh = round(usage, 2)
+    return record
+
+def extract_bill(pdf_bytes: bytes) -> Optional[Dict[str, Any]]:
+    """Structured fields from a PDF bill, or None when it can't be read locally.
+
+    Runs in a worker process; returns a plain dict plus the summary so results
+    pickle cheaply.
+    """
+    if not PDF_AVAILABLE:
+        return None
+    try:
+        reader = PdfReader(io.BytesIO(pdf_bytes))
+        text = "\n".join(page.extract_text() or "" for page in reader.pages[:MAX_PAGES])
+    except Exception:
+        return None
+    record = parse_bill_text(text)
+    if not record.complete:
+        return None
+    return {**record.to_dict(), "summary": record.summary()}
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def extractor_pool() -> ProcessPoolExecutor:
+    """Shared worker pool, started on first use so importing stays cheap"""
+    global _executor
+    # Callers run on worker threads; the lock stops two first calls each starting a pool
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(max_workers=BILL_EXTRACTOR_WORKERS)
+    return _executor
+
+def extract_bill_in_pool(pdf_bytes: bytes) -> Optional[Dict[str, Any]]:
+    """extract_bill on the process pool, so parsing never holds this process's GIL"""
+    try:
+        return extractor_pool().submit(extract_bill, pdf_bytes).result(timeout=BILL_EXTRACT_TIMEOUT_SECONDS)
+    except Exception:
+        return None
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(cancel_futures=True)
+            _executor = None
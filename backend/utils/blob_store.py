@@ -0,0 +1,90 @@
+import base64
+import hashlib
+import os
+import re
+import tempfile
+from typing import Any, Dict, List
+
+BLOB_STORE_PATH = os.getenv('BLOB_STORE_PATH', 'blobs')
+
+_DIGEST_RE = re.compile(r'^[0-9a-f]{64}$')
+
+class BlobStore:
+    """Content-addressed attachment store on local disk.
+
+    Blobs are keyed by their sha256 digest and sharded by its first two hex
+    characters, so an upload seen twice is only written once. Writes go to a
+    temp file in the same directory and are renamed into place, so readers
+    never see a partial blob.
+    """
+
+    def __init__(self, root: str = BLOB_STORE_PATH):
+        self.root = root
+
+    def path(self, digest: str) -> str:
+        if not _DIGEST_RE.match(digest):
+            raise ValueError(f"Invalid blob digest: {digest!r}")
+        return os.path.join(self.root, digest[:2], digest)
+
+    def exists(self, digest: str) -> bool:
+        return os.path.exists(self.path(digest))
+
+    def put(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path(digest)
+        if os.path.exists(path):
+            return digest
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return digest
+
+    def get(self, digest: str) -> bytes:
+        with open(self.path(digest), "rb") as f:
+            return f.read()
+
+blob_store = BlobStore()
+
+def store_attachments(blocks: List[Dict[str, Any]], store: BlobStore = blob_store) -> List[Dict[str, Any]]:
+    """Write image/document blocks to the store and return small references.
+
+    Text blocks are already truncated excerpts and stay inline.
+    """
+    refs = []
+    for block in blocks:
+        if block["type"] == "image":
+            data = base64.b64decode(block["source"]["data"])
+            refs.append({"type": "image", "ref": store.put(data), "size": len(data),
+                         "media_type": block["source"]["media_type"]})
+        elif block["type"] == "document":
+            document = block["document"]
+            data = document["source"]["bytes"]
+            refs.append({"type": "document", "ref": store.put(data), "size": len(data),
+                         "format": document["format"], "name": document["name"]})
+        else:
+            refs.append(block)
+    return refs
+
+def resolve_attachment(ref: Dict[str, Any], store: BlobStore = blob_store) -> Dict[str, Any]:
+    """Rebuild the model content block for a reference, reading its bytes from disk"""
+    if ref["type"] == "image":
+        return {
+            "type": "image",
+            "source": {
+                "type": "base64",
+                "media_type": ref["media_type"],
+                "data": base64.b64encode(store.get(ref["ref"])).decode("utf-8")
+            }
+        }
+    if ref["type"] == "document":
+        return {
+            "type": "document",
+            "document": {"format": ref["format"], "name": ref["name"], "source": {"bytes": store.get(ref["ref"])}}
+        }
+    return ref
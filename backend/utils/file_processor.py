@@ -1,14 +1,21 @@
+import asyncio
 import base64
+import os
 import re
 from enum import Enum
 from typing import Dict, List, Optional, Any
 from fastapi import UploadFile, HTTPException
+from fastapi.responses import JSONResponse
 
 # Constants
 MAX_IMAGE_SIZE = 3.75 * 1024 * 1024  # 3.75 MB
 MAX_DOCUMENT_SIZE = 4.5 * 1024 * 1024  # 4.5 MB
 MAX_IMAGES = 20
 MAX_DOCUMENTS = 5
+READ_CHUNK_SIZE = 256 * 1024
+# Largest multipart body accepted at all: every file at its cap, plus form overhead
+MAX_REQUEST_SIZE = int(os.getenv('UPLOAD_MAX_REQUEST_BYTES', str(int(
+    MAX_IMAGES * MAX_IMAGE_SIZE + MAX_DOCUMENTS * MAX_DOCUMENT_SIZE + 64 * 1024))))
 
 class ContentType(Enum):
     IMAGE_JPEG = "image/jpeg"
@@ -57,12 +64,25 @@ class FileProcessor:
         elif "html" in content_type: return "html"
         return "txt"
     
+    @classmethod
+    def classify(cls, file: UploadFile) -> str:
+        """'image', 'document' or 'text', decided from the upload's headers alone"""
+        content_type = file.content_type or ""
+        filename = (file.filename or "unknown").lower()
+        if any(img_type.value in content_type for img_type in cls.IMAGE_TYPES):
+            return "image"
+        if any(ext in filename for ext in cls.DOCUMENT_FORMAT_MAP.keys()) or \
+           "pdf" in content_type or "word" in content_type or "csv" in content_type:
+            return "document"
+        return "text"
+    
     @classmethod
     def create_content_block(cls, file: UploadFile, content: bytes) -> Dict[str, Any]:
         content_type = file.content_type or ""
         filename = file.filename or "unknown"
+        kind = cls.classify(file)
         
-        if any(img_type.value in content_type for img_type in cls.IMAGE_TYPES):
+        if kind == "image":
             cls.validate_file_size(content, is_image=True)
             return {
                 "type": "image",
@@ -72,8 +92,7 @@ class FileProcessor:
                     "data": base64.b64encode(content).decode("utf-8")
                 }
             }
-        elif any(ext in filename.lower() for ext in cls.DOCUMENT_FORMAT_MAP.keys()) or \
-             "pdf" in content_type or "word" in content_type or "csv" in content_type:
+        elif kind == "document":
             cls.validate_file_size(content, is_image=False)
             doc_format = cls.get_document_format(filename, content_type)
             return {
@@ -91,26 +110,62 @@ class FileProcessor:
             except UnicodeDecodeError:
                 raise HTTPException(400, f"Unsupported file type: {content_type}")
 
+class UploadLimitMiddleware:
+    """Reject multipart bodies over MAX_REQUEST_SIZE before they are read.
+
+    Starlette spools the whole form before the handler runs, so per-file limits
+    alone don't bound what a request can make the server buffer. This checks
+    Content-Length up front and refuses multipart requests that don't send one.
+    """
+
+    def __init__(self, app, max_size: int = MAX_REQUEST_SIZE):
+        self.app = app
+        self.max_size = max_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            headers = dict(scope["headers"])
+            if headers.get(b"content-type", b"").startswith(b"multipart/form-data"):
+                length = headers.get(b"content-length")
+                if length is None or not length.isdigit():
+                    response = JSONResponse({"detail": "Content-Length required"}, status_code=411)
+                    return await response(scope, receive, send)
+                if int(length) > self.max_size:
+                    response = JSONResponse(
+                        {"detail": f"Request too large: {int(length)} bytes. Max: {self.max_size} bytes"},
+                        status_code=413)
+                    return await response(scope, receive, send)
+        await self.app(scope, receive, send)
+
+async def read_limited(file: UploadFile, max_size: float) -> bytes:
+    """Read an upload in chunks, giving up as soon as it passes max_size.
+
+    This bounds what the handler holds in memory; the request body itself is
+    bounded earlier by UploadLimitMiddleware.
+    """
+    if file.size is not None and file.size > max_size:
+        raise HTTPException(400, f"File too large: {file.size} bytes. Max: {max_size} bytes")
+    content = bytearray()
+    while chunk := await file.read(READ_CHUNK_SIZE):
+        content += chunk
+        if len(content) > max_size:
+            raise HTTPException(400, f"File too large. Max: {max_size} bytes")
+    return bytes(content)
+
+async def process_file(file: UploadFile, kind: str) -> Dict[str, Any]:
+    content = await read_limited(file, MAX_IMAGE_SIZE if kind == "image" else MAX_DOCUMENT_SIZE)
+    # base64 encoding and decoding are CPU-bound; keep them off the event loop
+    return await asyncio.to_thread(FileProcessor.create_content_block, file, content)
+
 async def process_files(files: Optional[List[UploadFile]]) -> List[Dict[str, Any]]:
     if not files:
         return []
     
-    content_blocks = []
-    image_count = document_count = 0
-    
-    for file in files:
-        content = await file.read()
-        content_block = FileProcessor.create_content_block(file, content)
-        
-        if content_block["type"] == "image":
-            image_count += 1
-            if image_count > MAX_IMAGES:
-                raise HTTPException(400, f"Too many images. Max: {MAX_IMAGES}")
-        elif content_block["type"] == "document":
-            document_count += 1
-            if document_count > MAX_DOCUMENTS:
-                raise HTTPException(400, f"Too many documents. Max: {MAX_DOCUMENTS}")
-        
-        content_blocks.append(content_block)
+    kinds = [FileProcessor.classify(file) for file in files]
+    # Reject over-count requests before reading a single byte
+    if kinds.count("image") > MAX_IMAGES:
+        raise HTTPException(400, f"Too many images. Max: {MAX_IMAGES}")
+    if kinds.count("document") > MAX_DOCUMENTS:
+        raise HTTPException(400, f"Too many documents. Max: {MAX_DOCUMENTS}")
     
-    return content_blocks
\ No newline at end of file
+    return list(await asyncio.gather(*(process_file(file, kind) for file, kind in zip(files, kinds))))
@@ -0,0 +1,129 @@
+import os
+from typing import Any, Dict, List, Tuple
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from utils.cache import TTLCache
+
+HISTORY_TOKEN_BUDGET = int(os.getenv('HISTORY_TOKEN_BUDGET', '8000'))
+HISTORY_KEEP_RECENT_TURNS = int(os.getenv('HISTORY_KEEP_RECENT_TURNS', '2'))
+HISTORY_SUMMARY_TOKENS = int(os.getenv('HISTORY_SUMMARY_TOKENS', '500'))
+
+# Rough estimates; Bedrock bills images at up to ~1.6k tokens and binary
+# documents at well under a token per byte once their text is extracted
+CHARS_PER_TOKEN = 4
+IMAGE_TOKENS = 1600
+BINARY_DOCUMENT_BYTES_PER_TOKEN = 40
+SNIPPET_CHARS = 160
+
+ATTACHMENT_TYPES = ("image", "document")
+
+def _block_size(block: Dict[str, Any]) -> int:
+    if block.get("type") == "image":
+        return len(block.get("source", {}).get("data", "")) * 3 // 4
+    return len(block.get("document", {}).get("source", {}).get("bytes", b""))
+
+def _text_of(message: BaseMessage) -> str:
+    if isinstance(message.content, str):
+        return message.content
+    return " ".join(
+        block.get("text", "") if isinstance(block, dict) else str(block)
+        for block in message.content
+    )
+
+class HistoryManager:
+    """Builds the model input for each turn within a token budget.
+
+    The last few user turns are passed through verbatim. In older turns every
+    image/document block is replaced by a short text description (cached per
+    message block), and if the history is still over budget the oldest turns
+    are dropped and condensed into a brief extractive summary. The checkpointed
+    state itself is left untouched.
+    """
+
+    def __init__(self, token_budget: int = HISTORY_TOKEN_BUDGET, keep_recent_turns: int = HISTORY_KEEP_RECENT_TURNS,
+                 summary_tokens: int = HISTORY_SUMMARY_TOKENS):
+        self.token_budget = token_budget
+        self.keep_recent_turns = keep_recent_turns
+        self.summary_tokens = summary_tokens
+        self._descriptions = TTLCache(max_size=4096, ttl_seconds=24 * 3600)
+
+    def estimate_tokens(self, message: BaseMessage) -> int:
+        if isinstance(message.content, str):
+            return len(message.content) // CHARS_PER_TOKEN + 1
+        tokens = 1
+        for block in message.content:
+            kind = block.get("type") if isinstance(block, dict) else None
+            if kind == "image":
+                tokens += IMAGE_TOKENS
+            elif kind == "document":
+                doc_format = block.get("document", {}).get("format")
+                per_token = CHARS_PER_TOKEN if doc_format in ("txt", "csv", "md", "html") else BINARY_DOCUMENT_BYTES_PER_TOKEN
+                tokens += _block_size(block) // per_token
+            else:
+                tokens += len(block.get("text", "") if isinstance(block, dict) else str(block)) // CHARS_PER_TOKEN
+        return tokens
+
+    def describe_attachment(self, key: str, block: Dict[str, Any]) -> str:
+        description = self._descriptions.get(key)
+        if description is None:
+            size_kb = max(_block_size(block) // 1024, 1)
+            if block["type"] == "image":
+                media_type = block.get("source", {}).get("media_type", "image")
+                description = f"[Earlier attachment omitted: {media_type} image, {size_kb} KB]"
+            else:
+                document = block.get("document", {})
+                description = (f"[Earlier attachment omitted: {document.get('format', 'document').upper()} "
+                               f"document '{document.get('name', 'document')}', {size_kb} KB]")
+            self._descriptions.set(key, description)
+        return description
+
+    def elide_attachments(self, message: BaseMessage) -> BaseMessage:
+        if isinstance(message.content, str):
+            return message
+        if not any(isinstance(b, dict) and b.get("type") in ATTACHMENT_TYPES for b in message.content):
+            return message
+        content = [
+            {"type": "text", "text": self.describe_attachment(f"{message.id}:{i}", block)}
+            if isinstance(block, dict) and block.get("type") in ATTACHMENT_TYPES else block
+            for i, block in enumerate(message.content)
+        ]
+        return message.model_copy(update={"content": content})
+
+    def _summary(self, dropped: List[BaseMessage]) -> SystemMessage:
+        # Most recent dropped lines first, until the summary budget is used up
+        lines, used = [], 0
+        for message in reversed(dropped):
+            role = "User" if isinstance(message, HumanMessage) else "Assistant"
+            text = " ".join(_text_of(message).split())
+            line = f"- {role}: {text[:SNIPPET_CHARS]}{'...' if len(text) > SNIPPET_CHARS else ''}"
+            used += len(line) // CHARS_PER_TOKEN + 1
+            if used > self.summary_tokens:
+                break
+            lines.append(line)
+        lines.reverse()
+        return SystemMessage(content="Summary of earlier conversation:\n" + "\n".join(lines))
+
+    def _split_recent(self, messages: List[BaseMessage]) -> Tuple[List[BaseMessage], List[BaseMessage]]:
+        human_indices = [i for i, m in enumerate(messages) if isinstance(m, HumanMessage)]
+        if len(human_indices) <= self.keep_recent_turns:
+            return [], list(messages)
+        start = human_indices[-self.keep_recent_turns] if self.keep_recent_turns else len(messages)
+        return list(messages[:start]), list(messages[start:])
+
+    def prepare(self, state: Dict[str, Any]) -> List[BaseMessage]:
+        """Model input for this turn; usable as create_react_agent's prompt callable"""
+        older, recent = self._split_recent(state["messages"])
+        older = [self.elide_attachments(m) for m in older]
+        total = sum(self.estimate_tokens(m) for m in older + recent)
+
+        dropped: List[BaseMessage] = []
+        while older and total > self.token_budget:
+            # Drop whole turns so the history still starts with a user message
+            turn_end = next((i for i, m in enumerate(older[1:], 1) if isinstance(m, HumanMessage)), len(older))
+            for message in older[:turn_end]:
+                total -= self.estimate_tokens(message)
+                dropped.append(message)
+            older = older[turn_end:]
+
+        if dropped:
+            return [self._summary(dropped)] + older + recent
+        return older + recent
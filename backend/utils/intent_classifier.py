@@ -0,0 +1,111 @@
+import os
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# At or below this confidence the keyword match is only a hint and the LLM supervisor decides.
+# A lone keyword scores exactly 0.5, so one ambiguous word never skips the model.
+CONFIDENCE_THRESHOLD = float(os.getenv('INTENT_CONFIDENCE_THRESHOLD', '0.5'))
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+class IntentMatch(NamedTuple):
+    intent: Optional[str]
+    confidence: float
+    matches: Tuple[str, ...]
+
+    def confident(self, threshold: float = CONFIDENCE_THRESHOLD) -> bool:
+        """True when the match is strong enough to route without the model"""
+        return self.intent is not None and self.confidence > threshold
+
+class IntentClassifier:
+    """Single-pass keyword classifier over whole words and multi-word phrases.
+
+    The vocabulary is compiled once into a phrase -> intent table, so a query is
+    classified with a handful of dict lookups per token regardless of how many
+    keywords are configured. Intents listed first win ties.
+    """
+
+    def __init__(self, vocabulary: Dict[str, Iterable[str]]):
+        self.intents: List[str] = list(vocabulary)
+        self._phrases: Dict[Tuple[str, ...], str] = {}
+        for intent, phrases in vocabulary.items():
+            for phrase in phrases:
+                self._phrases.setdefault(tuple(_TOKEN_RE.findall(phrase.lower())), intent)
+        self._max_phrase_len = max((len(p) for p in self._phrases), default=1)
+
+    def _scan(self, text: str) -> Tuple[Dict[str, float], List[str]]:
+        tokens = _TOKEN_RE.findall(text.lower())
+        scores: Dict[str, float] = {}
+        matched: List[str] = []
+        i = 0
+        while i < len(tokens):
+            # Longest phrase starting here wins, so "new connection" isn't also counted as "connection"
+            for length in range(min(self._max_phrase_len, len(tokens) - i), 0, -1):
+                phrase = tuple(tokens[i:i + length])
+                intent = self._phrases.get(phrase)
+                if intent:
+                    scores[intent] = scores.get(intent, 0.0) + length
+                    matched.append(" ".join(phrase))
+                    i += length
+                    break
+            else:
+                i += 1
+        return scores, matched
+
+    def classify(self, text: str) -> IntentMatch:
+        """Return the best intent with a confidence in [0, 1]"""
+        scores, matched = self._scan(text)
+        if not scores:
+            return IntentMatch(None, 0.0, ())
+        best = max(self.intents, key=lambda intent: scores.get(intent, 0.0))
+        top = scores[best]
+        # Share of the evidence that agrees, damped when there is little of it
+        confidence = (top / sum(scores.values())) * (1 - 0.5 ** top)
+        return IntentMatch(best, confidence, tuple(matched))
+
+    def matches(self, text: str, intent: Optional[str] = None) -> bool:
+        """True when the text has any keyword of intent (of any intent when None), whatever wins overall"""
+        scores, _ = self._scan(text)
+        return bool(scores) if intent is None else intent in scores
+
+# Intents used by the /chat supervisor and the standalone agent systems
+routing_classifier = IntentClassifier({
+    "GREETING": ["hi", "hello", "hey", "g'day", "good morning", "good afternoon", "good evening"],
+    "CURRENT_CUSTOMER": [
+        "bill", "bills", "billing", "account", "accounts", "payment", "payments", "pay", "usage",
+        "invoice", "invoices", "charge", "charges", "balance", "overdue", "due date", "refund",
+        "direct debit", "customer number", "account number", "meter reading", "my bill"
+    ],
+    "NEW_CUSTOMER": [
+        "switch", "switching", "new connection", "connect", "connection", "move", "moving",
+        "move in", "sign up", "join", "new customer", "compare", "provider", "providers",
+        "retailer", "quote", "plan", "plans"
+    ]
+})
+
+# Specialist agents of the energy LangGraph workflow
+graph_routing_classifier = IntentClassifier({
+    "bill_explorer": [
+        "bill", "bills", "billing", "usage", "invoice", "charge", "charges", "payment", "balance",
+        "consumption", "kwh", "overdue", "high bill", "my bill", "explain"
+    ],
+    "switch_agent": [
+        "switch", "switching", "compare", "comparison", "plan", "plans", "cheaper", "better deal",
+        "change provider", "change retailer", "change plan", "another provider"
+    ],
+    "brand_new_agent": [
+        "new connection", "connect", "connection", "move in", "moving", "moving house", "new home",
+        "new property", "sign up", "set up", "new customer", "new service"
+    ]
+})
+
+address_classifier = IntentClassifier({
+    "ADDRESS": [
+        "street", "st", "road", "rd", "avenue", "ave", "drive", "court", "crescent", "cres",
+        "lane", "parade", "pde", "terrace", "tce", "highway", "hwy", "boulevard", "blvd"
+    ]
+})
+
+def mentions_address(text: str) -> bool:
+    """True when the text contains a street-type word such as 'St' or 'Road'"""
+    return address_classifier.matches(text)
@@ -0,0 +1,142 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+from uuid import UUID
+import boto3
+from botocore.config import Config
+from langchain_core.callbacks import BaseCallbackHandler
+from utils.metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+# Models used across the apps; callers pick by name rather than hard-coding ids
+SONNET = "us.anthropic.claude-sonnet-4-20250514-v1:0"
+HAIKU = "anthropic.claude-3-haiku-20240307-v1:0"
+DEFAULT_REGION = "us-east-1"
+
+BEDROCK_MAX_POOL_CONNECTIONS = int(os.getenv('BEDROCK_MAX_POOL_CONNECTIONS', '50'))
+BEDROCK_CONNECT_TIMEOUT_SECONDS = float(os.getenv('BEDROCK_CONNECT_TIMEOUT_SECONDS', '5'))
+BEDROCK_READ_TIMEOUT_SECONDS = float(os.getenv('BEDROCK_READ_TIMEOUT_SECONDS', '120'))
+BEDROCK_MAX_ATTEMPTS = int(os.getenv('BEDROCK_MAX_ATTEMPTS', '3'))
+# Send every Bedrock call here instead, e.g. the offline stand-in in benchmarks/bedrock_standin.py
+BEDROCK_ENDPOINT_URL = os.getenv('BEDROCK_ENDPOINT_URL') or None
+
+# One pool per region, shared by every model in the process; keep-alive lets
+# steady-state calls reuse TLS connections instead of handshaking each time
+BOTO_CONFIG = Config(
+    max_pool_connections=BEDROCK_MAX_POOL_CONNECTIONS,
+    tcp_keepalive=True,
+    connect_timeout=BEDROCK_CONNECT_TIMEOUT_SECONDS,
+    read_timeout=BEDROCK_READ_TIMEOUT_SECONDS,
+    retries={"max_attempts": BEDROCK_MAX_ATTEMPTS, "mode": "adaptive"},
+)
+
+LLM_CALL_SECONDS = Histogram("llm_call_seconds", "Model call latency, start to last token", ["model"])
+LLM_FIRST_TOKEN_SECONDS = Histogram("llm_first_token_seconds", "Time to the first streamed token", ["model"])
+LLM_TOKENS = Counter("llm_tokens_total", "Tokens billed per model", ["model", "direction"])
+LLM_ERRORS = Counter("llm_errors_total", "Model calls that failed", ["model"])
+
+class LLMMetrics(BaseCallbackHandler):
+    """Records latency, time to first token and token usage for every call on a model"""
+    # Bookkeeping only; don't hop to an executor for it on async calls
+    run_inline = True
+
+    def __init__(self, model: str):
+        self.model = model
+        self._runs: Dict[UUID, list] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs):
+        self._runs[run_id] = [time.perf_counter(), False]
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs):
+        self._runs[run_id] = [time.perf_counter(), False]
+
+    def on_llm_new_token(self, token, *, run_id: UUID, **kwargs):
+        run = self._runs.get(run_id)
+        # The opening chunk carries only the role; time to the first real text
+        if token and run and not run[1]:
+            run[1] = True
+            LLM_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - run[0], model=self.model)
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run:
+            LLM_CALL_SECONDS.observe(time.perf_counter() - run[0], model=self.model)
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    LLM_TOKENS.inc(usage.get("input_tokens", 0), model=self.model, direction="input")
+                    LLM_TOKENS.inc(usage.get("output_tokens", 0), model=self.model, direction="output")
+
+    def on_llm_error(self, error, *, run_id: UUID, **kwargs):
+        self._runs.pop(run_id, None)
+        LLM_ERRORS.inc(model=self.model)
+
+_lock = threading.Lock()
+_boto_clients: Dict[Tuple[str, str], Any] = {}
+_models: Dict[Tuple[str, str, str], Any] = {}
+
+def boto_client(service: str, region: str = DEFAULT_REGION):
+    """Shared boto3 client for a service and region, created on first use"""
+    key = (service, region)
+    client = _boto_clients.get(key)
+    if client is None:
+        with _lock:
+            client = _boto_clients.get(key)
+            if client is None:
+                # Sessions aren't thread-safe; give each client its own
+                session = boto3.session.Session()
+                kwargs = {}
+                if BEDROCK_ENDPOINT_URL:
+                    kwargs["endpoint_url"] = BEDROCK_ENDPOINT_URL
+                    if session.get_credentials() is None:
+                        # The stand-in ignores signatures, but botocore won't send unsigned requests
+                        kwargs.update(aws_access_key_id="standin", aws_secret_access_key="standin")
+                client = session.client(service, region_name=region, config=BOTO_CONFIG, **kwargs)
+                _boto_clients[key] = client
+    return client
+
+def get_chat_model(model: str = SONNET, region: str = DEFAULT_REGION, kind: str = "converse"):
+    """Shared LangChain chat model keyed by (model, region, kind).
+
+    kind is "converse" for ChatBedrockConverse or "invoke" for ChatBedrock.
+    Models are cheap wrappers; the boto clients underneath are shared per region.
+    """
+    key = (model, region, kind)
+    chat_model = _models.get(key)
+    if chat_model is not None:
+        return chat_model
+    runtime, control = boto_client("bedrock-runtime", region), boto_client("bedrock", region)
+    with _lock:
+        chat_model = _models.get(key)
+        if chat_model is None:
+            if kind == "converse":
+                from langchain_aws import ChatBedrockConverse
+                chat_model = ChatBedrockConverse(model=model, region_name=region, client=runtime,
+                                                 bedrock_client=control, callbacks=[LLMMetrics(model)])
+            elif kind == "invoke":
+                from langchain_aws import ChatBedrock
+                chat_model = ChatBedrock(model_id=model, region_name=region, client=runtime,
+                                         bedrock_client=control, callbacks=[LLMMetrics(model)])
+            else:
+                raise ValueError(f"Unknown chat model kind: {kind}")
+            _models[key] = chat_model
+    return chat_model
+
+def warm_up(specs: Optional[Iterable[Tuple[str, str, str]]] = None):
+    """Build clients and models ahead of the first request; run from a startup hook.
+
+    Loading botocore's service models dominates client creation, so doing it
+    here keeps it off the first user's latency.
+    """
+    for model, region, kind in specs or [(SONNET, DEFAULT_REGION, "converse")]:
+        try:
+            get_chat_model(model, region, kind)
+        except Exception as e:
+            logger.warning(f"Warm-up failed for {model} in {region}: {e}")
+
+def stats() -> Dict[str, Any]:
+    return {"boto_clients": len(_boto_clients), "models": sorted("/".join(key) for key in _models)}
@@ -0,0 +1,215 @@
+import asyncio
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Seconds; spans a cache hit through a slow model turn
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format(value: float) -> str:
+    value = float(value)
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if value.is_integer() else repr(value)
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+class Metric:
+    """Base for a metric family; series are keyed by label values in labelnames order"""
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 registry: Optional["Registry"] = None):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, key)} {_format(v)}" for key, v in items]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram(Metric):
+    """Cumulative-bucket histogram; observe() is a bisect and three additions under a lock"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry: Optional["Registry"] = None):
+        super().__init__(name, help_text, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts (last is +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(counts), total, n) for key, (counts, total, n) in self._series.items()]
+        lines = self.header()
+        names = self.labelnames + ("le",)
+        for key, counts, total, n in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(names, key + (_format(bound),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_format(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {n}")
+        return lines
+
+class CacheMetrics:
+    """Exports the counters every TTLCache already keeps, read only at scrape time"""
+
+    def __init__(self):
+        self._caches: Dict[str, object] = {}
+
+    def add(self, name: str, cache):
+        self._caches[name] = cache
+
+    def render(self) -> List[str]:
+        caches = list(self._caches.items())
+        if not caches:
+            return []
+        families = [
+            ("cache_hits_total", "counter", "Cache lookups that found a live entry", lambda c: c.hits),
+            ("cache_misses_total", "counter", "Cache lookups that missed or found an expired entry", lambda c: c.misses),
+            ("cache_evictions_total", "counter", "Entries evicted to stay within the size bound", lambda c: c.evictions),
+            ("cache_entries", "gauge", "Entries currently held", len),
+            ("cache_hit_ratio", "gauge", "Hits over lookups since start",
+             lambda c: c.hits / (c.hits + c.misses) if c.hits + c.misses else 0.0),
+        ]
+        lines = []
+        for name, kind, help_text, read in families:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            lines += [f'{name}{{cache="{_escape(cache_name)}"}} {_format(read(cache))}' for cache_name, cache in caches]
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self.caches = CacheMetrics()
+
+    def register(self, metric: Metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines += metric.render()
+        lines += self.caches.render()
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+def register_cache(name: str, cache):
+    """Export a TTLCache's hit, miss, eviction and size counts under cache="name" """
+    REGISTRY.caches.add(name, cache)
+
+def render_metrics() -> str:
+    """Everything registered in this process, in Prometheus text format"""
+    return REGISTRY.render()
+
+# Shared by the /chat agents and the energy graph
+AGENT_NODE_SECONDS = Histogram("agent_node_seconds", "Time spent in each agent or graph node", ["node"])
+AGENT_NODE_ERRORS = Counter("agent_node_errors_total", "Agent or graph node calls that raised", ["node"])
+
+def timed_node(node: str, fn: Optional[Callable] = None) -> Callable:
+    """Wrap an agent function, sync or async, so each call is timed under node="...".
+
+    Use as timed_node("supervisor", fn) or as a @timed_node("supervisor") decorator.
+    """
+    if fn is None:
+        return lambda f: timed_node(node, f)
+    if asyncio.iscoroutinefunction(fn):
+        @wraps(fn)
+        async def timed_async(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            except BaseException:
+                AGENT_NODE_ERRORS.inc(node=node)
+                raise
+            finally:
+                AGENT_NODE_SECONDS.observe(time.perf_counter() - start, node=node)
+        return timed_async
+
+    @wraps(fn)
+    def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except BaseException:
+            AGENT_NODE_ERRORS.inc(node=node)
+            raise
+        finally:
+            AGENT_NODE_SECONDS.observe(time.perf_counter() - start, node=node)
+    return timed
@@ -0,0 +1,35 @@
+import os
+import re
+from typing import Any, Optional
+from utils.cache import TTLCache
+
+_PREFIX_RE = re.compile(r'^\s*user:\s*', re.IGNORECASE)
+_NUMBER_RE = re.compile(r'\d+')
+_NON_WORD_RE = re.compile(r'[^a-z#\s]+')
+_SPACE_RE = re.compile(r'\s+')
+
+def normalise_query(query: str) -> str:
+    """Collapse near-duplicate queries onto one key: case, punctuation and numbers are dropped"""
+    text = _PREFIX_RE.sub('', query.lower())
+    text = _NUMBER_RE.sub('#', text)
+    text = _NON_WORD_RE.sub(' ', text)
+    return _SPACE_RE.sub(' ', text).strip()
+
+class RoutingCache(TTLCache):
+    """Caches supervisor routing decisions keyed on the normalised query plus context flags"""
+
+    def __init__(self, max_size: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        super().__init__(
+            max_size=max_size or int(os.getenv('ROUTING_CACHE_SIZE', '2048')),
+            ttl_seconds=ttl_seconds or float(os.getenv('ROUTING_CACHE_TTL_SECONDS', '3600'))
+        )
+
+    @staticmethod
+    def make_key(query: str, **flags: bool) -> tuple:
+        return (normalise_query(query),) + tuple(sorted((name, bool(value)) for name, value in flags.items()))
+
+    def lookup(self, query: str, **flags: bool) -> Optional[Any]:
+        return self.get(self.make_key(query, **flags))
+
+    def store(self, query: str, decision: Any, **flags: bool):
+        self.set(self.make_key(query, **flags), decision)
@@ -0,0 +1,44 @@
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    # Stop nginx-style proxies from buffering the stream
+    "X-Accel-Buffering": "no",
+}
+
+def sse_event(data: Dict[str, Any]) -> str:
+    return f"data: {json.dumps(data)}\n\n"
+
+def chunk_text(content: Any) -> str:
+    """Text of a streamed message chunk, whether plain or a list of content blocks"""
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block.get("text", "") for block in content
+        if isinstance(block, dict) and block.get("type", "text") == "text"
+    )
+
+# SSE comment line: keeps proxies and clients from timing out, ignored by parsers
+HEARTBEAT = ": heartbeat\n\n"
+
+async def with_heartbeats(events: AsyncIterator[str], interval_seconds: float) -> AsyncIterator[str]:
+    """Pass events through, emitting a heartbeat whenever none arrives within the interval"""
+    iterator = events.__aiter__()
+    pending = asyncio.ensure_future(iterator.__anext__())
+    try:
+        while True:
+            done, _ = await asyncio.wait({pending}, timeout=interval_seconds)
+            if not done:
+                yield HEARTBEAT
+                continue
+            try:
+                event = pending.result()
+            except StopAsyncIteration:
+                return
+            yield event
+            pending = asyncio.ensure_future(iterator.__anext__())
+    finally:
+        pending.cancel()
@@ -0,0 +1,131 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Sequence, Tuple
+import numpy as np
+
+SECONDS_PER_DAY = 86400
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+def _day_label(day: int) -> str:
+    return datetime.fromtimestamp(int(day) * SECONDS_PER_DAY, tz=timezone.utc).strftime("%b %d, %Y")
+
+class UsageAnalytics:
+    """Vectorised consumption analytics over cumulative meter register readings.
+
+    Readings are (meter_id, epoch_seconds, register_value) rows for one customer,
+    with epoch seconds taken from the local reading timestamp. Everything below
+    works on whole NumPy arrays; there is no per-reading Python loop.
+    """
+
+    def __init__(self, meter_ids: np.ndarray, timestamps: np.ndarray, readings: np.ndarray):
+        order = np.lexsort((timestamps, meter_ids))
+        meter_ids, timestamps, readings = meter_ids[order], timestamps[order], readings[order]
+
+        # Interval consumption is the register delta between consecutive reads of a meter
+        same_meter = meter_ids[1:] == meter_ids[:-1]
+        deltas = np.diff(readings)
+        # A register that went backwards was replaced or rolled over; count from zero
+        deltas = np.where(deltas < 0, readings[1:], deltas)
+        self.interval_end = timestamps[1:][same_meter].astype(np.int64)
+        self.interval_kwh = deltas[same_meter]
+        self._daily: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Tuple[Any, float, float]]) -> "UsageAnalytics":
+        data = np.asarray(rows, dtype=np.float64).reshape(-1, 3)
+        return cls(data[:, 0].astype(np.int64), data[:, 1], data[:, 2])
+
+    @property
+    def has_data(self) -> bool:
+        return self.interval_kwh.size > 0
+
+    def daily_totals(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Days (since epoch) that have consumption data, and kWh used on each"""
+        if self._daily is None:
+            days = self.interval_end // SECONDS_PER_DAY
+            first_day = days.min()
+            totals = np.bincount(days - first_day, weights=self.interval_kwh)
+            seen = np.bincount(days - first_day) > 0
+            self._daily = (np.flatnonzero(seen) + first_day, totals[seen])
+        return self._daily
+
+    def hourly_profile(self) -> np.ndarray:
+        """Average kWh per hour of the day"""
+        hours = (self.interval_end % SECONDS_PER_DAY) // 3600
+        day_count = max(np.unique(self.interval_end // SECONDS_PER_DAY).size, 1)
+        return np.bincount(hours, weights=self.interval_kwh, minlength=24) / day_count
+
+    def weekday_profile(self) -> np.ndarray:
+        """Average daily kWh for each weekday, Monday first"""
+        days, totals = self.daily_totals()
+        weekday = (days + 3) % 7  # the epoch fell on a Thursday
+        counts = np.bincount(weekday, minlength=7)
+        sums = np.bincount(weekday, weights=totals, minlength=7)
+        return np.divide(sums, counts, out=np.zeros(7), where=counts > 0)
+
+    def period_totals(self, period_days: int) -> Tuple[float, float, int]:
+        """kWh in the latest period, in the period before it, and the period's end time"""
+        end = int(self.interval_end.max())
+        period = period_days * SECONDS_PER_DAY
+        current = self.interval_end > end - period
+        previous = (self.interval_end > end - 2 * period) & ~current
+        return float(self.interval_kwh[current].sum()), float(self.interval_kwh[previous].sum()), end
+
+    def anomalies(self, threshold: float = 3.5) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Days whose usage is an outlier by robust (median/MAD) z-score.
+
+        When more than half the days share one value the MAD is zero, so the
+        scale falls back to the mean absolute deviation around the median. The
+        scale never drops below 1% of the median, so float noise on flat usage
+        is not reported.
+        """
+        days, totals = self.daily_totals()
+        # The first and last days are usually only partly covered by readings
+        days, totals = days[1:-1], totals[1:-1]
+        if totals.size == 0:
+            return days, totals, totals
+        median = np.median(totals)
+        deviation = np.abs(totals - median)
+        mad = np.median(deviation)
+        scale = mad / 0.6745 if mad > 0 else 1.253314 * np.mean(deviation)
+        scale = max(scale, 0.01 * abs(median))
+        if scale == 0:
+            return days[:0], totals[:0], totals[:0]
+        scores = (totals - median) / scale
+        flagged = np.abs(scores) > threshold
+        return days[flagged], totals[flagged], scores[flagged]
+
+    def summary(self, period_days: int = 30, anomaly_threshold: float = 3.5, max_anomalies: int = 5) -> Dict[str, Any]:
+        current, previous, end = self.period_totals(period_days)
+        end_day = end // SECONDS_PER_DAY
+        days, totals = self.daily_totals()
+        in_period = days > end_day - period_days
+        anomaly_days, anomaly_kwh, anomaly_scores = self.anomalies(anomaly_threshold)
+        recent = slice(-max_anomalies, None)
+        peak = int(np.argmax(totals[in_period])) if in_period.any() else None
+        return {
+            "usage_kwh": round(current, 2),
+            "previous_usage_kwh": round(previous, 2),
+            "usage_change_pct": round((current - previous) / previous * 100, 1) if previous else None,
+            "billing_period": f"{_day_label(end_day - period_days + 1)} - {_day_label(end_day)}",
+            "average_daily_kwh": round(float(totals[in_period].mean()), 2) if in_period.any() else 0.0,
+            "peak_day": {
+                "date": _day_label(days[in_period][peak]),
+                "kwh": round(float(totals[in_period][peak]), 2)
+            } if peak is not None else None,
+            "weekday_profile": dict(zip(WEEKDAYS, np.round(self.weekday_profile(), 2).tolist())),
+            "hourly_profile": np.round(self.hourly_profile(), 3).tolist(),
+            "anomalies": [
+                {"date": _day_label(day), "kwh": round(kwh, 2), "score": round(score, 1)}
+                for day, kwh, score in zip(anomaly_days[recent].tolist(), anomaly_kwh[recent].tolist(),
+                                           anomaly_scores[recent].tolist())
+            ]
+        }
+
+def summarise_usage(rows: Sequence[Tuple[Any, float, float]], period_days: int = 30) -> Optional[Dict[str, Any]]:
+    """Usage summary for a customer's readings, or None when there is nothing to analyse"""
+    if len(rows) < 2:
+        return None
+    analytics = UsageAnalytics.from_rows(rows)
+    if not analytics.has_data:
+        return None
+    return analytics.summary(period_days=period_days)
@@ -6,48 +6,59 @@ CREATE TABLE IF NOT EXISTS entity (
   last_name varchar(150) DEFAULT NULL,
   group_name varchar(255) DEFAULT NULL,
   initials varchar(20) DEFAULT NULL,
-  dob timestamp NULL DEFAULT NULL,
+  dob timestamp DEFAULT NULL,
   job_title varchar(255) DEFAULT NULL,
-  life_support int(11) NOT NULL,
+  life_support integer NOT NULL,
   credit_risk varchar(50) DEFAULT NULL,
   gender varchar(10) DEFAULT NULL,
   primary_language varchar(50) DEFAULT NULL,
-  primary_contact_method_id int(11) DEFAULT NULL,
+  primary_contact_method_id integer DEFAULT NULL,
   address varchar(100)
 );
 
-  
+
 CREATE TABLE IF NOT EXISTS invoice (
   id SERIAL PRIMARY KEY,
-  entity_id int(11) NOT NULL,
-  accounting_period_id int(11) NOT NULL,
+  entity_id integer NOT NULL,
+  accounting_period_id integer NOT NULL,
   type varchar(20) DEFAULT NULL,
   status varchar(255) DEFAULT NULL,
-  opening_balance decimal(16, 5) DEFAULT NULL,
-  net_amount decimal(16, 5) DEFAULT NULL,
-  tax_amount decimal(16, 5) DEFAULT NULL,
-  discount_amount decimal(16, 5) DEFAULT NULL,
-  delivered_to_entity int(11) DEFAULT NULL COMMENT 'id of the entity that received the invoice',
-  posted_date timestamp NULL DEFAULT NULL,
-  allocated_date timestamp NULL DEFAULT NULL,
-  due_date timestamp NULL DEFAULT NULL
+  opening_balance numeric(16, 5) DEFAULT NULL,
+  net_amount numeric(16, 5) DEFAULT NULL,
+  tax_amount numeric(16, 5) DEFAULT NULL,
+  discount_amount numeric(16, 5) DEFAULT NULL,
+  delivered_to_entity integer DEFAULT NULL,
+  posted_date timestamp DEFAULT NULL,
+  allocated_date timestamp DEFAULT NULL,
+  due_date timestamp DEFAULT NULL
 );
 
+COMMENT ON COLUMN invoice.delivered_to_entity IS 'id of the entity that received the invoice';
+
+-- Current invoice per customer: the newest posted invoice is the first index entry
+-- for the entity, and INCLUDE lets the lookup run as an index-only scan
+CREATE INDEX IF NOT EXISTS invoice_entity_posted_idx
+  ON invoice (entity_id, posted_date DESC NULLS LAST)
+  INCLUDE (net_amount, due_date);
+
 CREATE TABLE IF NOT EXISTS meter (
-  id int(11) NOT NULL AUTO_INCREMENT,
-  entity_id int(11) NOT NULL,
+  id SERIAL PRIMARY KEY,
+  entity_id integer NOT NULL,
   serial varchar(255) DEFAULT NULL,
   meter_type varchar(20) DEFAULT NULL,
-  meter_install_date timestamp NULL DEFAULT '0000-00-00 00:00:00',
-  PRIMARY KEY (id))
+  meter_install_date timestamp DEFAULT NULL
+);
 
-CREATE TABLE IF NOT EXISTS meterreading (
-  id int(11) NOT NULL AUTO_INCREMENT,
-  meter_id int(11) NOT NULL,
-  reading decimal(16, 5) DEFAULT NULL,
-  reading_date timestamp NULL DEFAULT NULL,
-  PRIMARY KEY (id))
+CREATE INDEX IF NOT EXISTS meter_entity_idx ON meter (entity_id);
 
+CREATE TABLE IF NOT EXISTS meterreading (
+  id SERIAL PRIMARY KEY,
+  meter_id integer NOT NULL,
+  reading numeric(16, 5) DEFAULT NULL,
+  reading_date timestamp DEFAULT NULL
+);
 
- 
- 
\ No newline at end of file
+-- Range scans of a meter's readings in date order, served from the index alone
+CREATE INDEX IF NOT EXISTS meterreading_meter_date_idx
+  ON meterreading (meter_id, reading_date)
+  INCLUDE (reading);
@@ -1,60 +1,180 @@
 #!/usr/bin/env python3
+import asyncio
 import json
+import os
 import sys
-from typing import Dict, List
+from typing import Any, Dict, List, Optional
+
+# Share the backend's coverage engine and gazetteer
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+from utils.address_coverage import get_engine
+
+MAX_CONCURRENT_REQUESTS = int(os.getenv('ADDRESS_SERVER_CONCURRENCY', '64'))
+MAX_BATCH_ADDRESSES = int(os.getenv('ADDRESS_SERVER_MAX_BATCH', '10000'))
+# Batches bigger than this are checked on a worker thread so small requests keep flowing
+THREAD_BATCH_THRESHOLD = 200
+MAX_LINE_BYTES = 16 * 1024 * 1024
+MAX_SUGGESTIONS = 50
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+class RPCError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
 
 class AddressServer:
     def __init__(self):
-        self.coverage_areas = {
-            'NSW': ['sydney', 'newcastle', 'wollongong'],
-            'VIC': ['melbourne', 'geelong', 'ballarat'],
-            'QLD': ['brisbane', 'gold coast', 'cairns'],
-            'WA': ['perth', 'fremantle'],
-            'SA': ['adelaide', 'mount gambier']
-        }
+        self.engine = get_engine()
     
     def check_address(self, address: str) -> Dict:
         """Check if address is in service coverage area"""
-        address_lower = address.lower()
-        
-        for state, cities in self.coverage_areas.items():
-            for city in cities:
-                if city in address_lower:
-                    return {
-                        'available': True,
-                        'state': state,
-                        'city': city.title(),
-                        'message': f'Energy services available in {city.title()}, {state}'
-                    }
-        
-        return {
-            'available': False,
-            'message': 'Energy services may not be available at this address. Please contact support for verification.'
-        }
+        return self.engine.check(address)
+    
+    def suggest_suburbs(self, prefix: str, limit: int = 10) -> Dict:
+        """Suburbs starting with prefix, for address autocomplete"""
+        return {'suburbs': [
+            {'suburb': l.suburb, 'state': l.state, 'postcode': l.postcode}
+            for l in self.engine.complete(prefix, limit)
+        ]}
+    
+    def check_addresses(self, addresses: List[str]) -> Dict:
+        """Coverage for many addresses at once, in request order"""
+        return {'results': [self.engine.check(address) for address in addresses]}
     
     def handle_request(self, request: Dict) -> Dict:
-        """Handle MCP server requests"""
+        """Handle legacy (pre JSON-RPC) requests"""
         method = request.get('method')
         params = request.get('params', {})
         
         if method == 'check_address':
             address = params.get('address', '')
             return self.check_address(address)
+        if method == 'suggest_suburbs':
+            return self.suggest_suburbs(params.get('prefix', ''), int(params.get('limit', 10)))
         
         return {'error': 'Unknown method'}
+    
+    async def call(self, method: str, params: Dict) -> Any:
+        """Dispatch one JSON-RPC method call"""
+        if method == 'check_address':
+            if not isinstance(params.get('address'), str):
+                raise RPCError(INVALID_PARAMS, "address must be a string")
+            return self.check_address(params['address'])
+        if method == 'check_addresses':
+            addresses = params.get('addresses')
+            if not isinstance(addresses, list) or not all(isinstance(a, str) for a in addresses):
+                raise RPCError(INVALID_PARAMS, "addresses must be a list of strings")
+            if len(addresses) > MAX_BATCH_ADDRESSES:
+                raise RPCError(INVALID_PARAMS, f"At most {MAX_BATCH_ADDRESSES} addresses per call")
+            if len(addresses) > THREAD_BATCH_THRESHOLD:
+                return await asyncio.to_thread(self.check_addresses, addresses)
+            return self.check_addresses(addresses)
+        if method == 'suggest_suburbs':
+            if not isinstance(params.get('prefix', ''), str):
+                raise RPCError(INVALID_PARAMS, "prefix must be a string")
+            limit = params.get('limit', 10)
+            # bool is an int subclass, but true/false is never a meaningful limit
+            if not isinstance(limit, int) or isinstance(limit, bool) or limit < 1:
+                raise RPCError(INVALID_PARAMS, "limit must be a positive integer")
+            return self.suggest_suburbs(params.get('prefix', ''), min(limit, MAX_SUGGESTIONS))
+        raise RPCError(METHOD_NOT_FOUND, f"Method not found: {method}")
+    
+    async def handle_rpc(self, request: Any) -> Optional[Dict]:
+        """One JSON-RPC 2.0 request; None for notifications"""
+        if not isinstance(request, dict) or request.get('jsonrpc') != '2.0' or \
+           not isinstance(request.get('method'), str):
+            return rpc_error(request.get('id') if isinstance(request, dict) else None,
+                             INVALID_REQUEST, "Invalid Request")
+        is_notification = 'id' not in request
+        params = request.get('params', {})
+        try:
+            if not isinstance(params, dict):
+                raise RPCError(INVALID_PARAMS, "params must be an object")
+            result = await self.call(request['method'], params)
+        except RPCError as e:
+            response = rpc_error(request.get('id'), e.code, e.message)
+        except Exception as e:
+            response = rpc_error(request.get('id'), INTERNAL_ERROR, str(e))
+        else:
+            response = {'jsonrpc': '2.0', 'result': result, 'id': request.get('id')}
+        return None if is_notification else response
+    
+    async def handle_line(self, line: str) -> Any:
+        """Response for one input line: a JSON-RPC reply, a batch of them, or a legacy reply"""
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return rpc_error(None, PARSE_ERROR, "Parse error")
+        if isinstance(request, list):
+            if not request:
+                return rpc_error(None, INVALID_REQUEST, "Invalid Request")
+            responses = await asyncio.gather(*(self.handle_rpc(r) for r in request))
+            return [r for r in responses if r is not None] or None
+        if isinstance(request, dict) and 'jsonrpc' not in request:
+            try:
+                return self.handle_request(request)
+            except Exception as e:
+                return {'error': str(e)}
+        return await self.handle_rpc(request)
 
-def main():
+def rpc_error(request_id: Any, code: int, message: str) -> Dict:
+    return {'jsonrpc': '2.0', 'error': {'code': code, 'message': message}, 'id': request_id}
+
+def write_line(response: Any):
+    sys.stdout.write(json.dumps(response) + "\n")
+    sys.stdout.flush()
+
+async def read_lines():
+    """stdin lines without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=MAX_LINE_BYTES)
+    try:
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    except ValueError:
+        # Regular files can't be watched by the event loop; read them on a thread
+        while line := await asyncio.to_thread(sys.stdin.readline):
+            yield line
+        return
+    while line := await reader.readline():
+        yield line.decode('utf-8')
+
+async def serve():
+    """Read requests line by line and answer each as soon as it completes.
+
+    Requests run concurrently, so replies can come back out of order; JSON-RPC
+    callers match them up by id.
+    """
     server = AddressServer()
+    slots = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    tasks = set()
     
-    for line in sys.stdin:
+    async def respond(line: str):
         try:
-            request = json.loads(line.strip())
-            response = server.handle_request(request)
-            print(json.dumps(response))
-            sys.stdout.flush()
-        except Exception as e:
-            print(json.dumps({'error': str(e)}))
-            sys.stdout.flush()
+            response = await server.handle_line(line)
+            if response is not None:
+                write_line(response)
+        finally:
+            slots.release()
+    
+    async for line in read_lines():
+        line = line.strip()
+        if not line:
+            continue
+        await slots.acquire()
+        task = asyncio.create_task(respond(line))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks)
+
+def main():
+    asyncio.run(serve())
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()